@@ -1,66 +1,237 @@
+from time import perf_counter
+IMPORT_STARTED = perf_counter()
+
 import sys
 import os
 import random
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Header
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.routing import APIRoute
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 import uvicorn
-from pydantic import BaseModel
-from typing import List, Dict, Union
+from pydantic import BaseModel, ValidationError
+from typing import List, Dict, Union, Optional
 from datetime import datetime
+from contextvars import ContextVar
 import json
+import inspect
+import functools
 
 # ==== Setup Paths ====
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 # Ensure these imports are correct based on your file structure
-from foodie_database.original_data import users_db, menu_db, branches_db
-data_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), 'foodie_database'))
-
-os.makedirs(data_dir, exist_ok=True)
+from foodie_database.original_data import users_db, menu_db as seed_menu_db, branches_db as seed_branches_db
+from components.combos import ComboIndex, CATEGORIES as COMBO_CATEGORIES
+from components.specials import SpecialsIndex, today
+from components.reservations import ReservationBook, ReservationError, HOLD_SECONDS, parse_slot
+from components.idempotency import IdempotencyStore, IdempotencyConflict, fingerprint
+from components.carts import CartBook, CartError
+from components.catalog import MenuCatalog, BranchCatalog, CatalogError
+from components.encoding import dumps, EncodedCache
+from components.store import JsonStore
+from components.metrics import Registry
+from components.tracing import SpanWriter, parse_traceparent
+data_dir = os.getenv("FOODIE_DATA_DIR") or os.path.abspath(os.path.join(os.path.dirname(__file__), 'foodie_database'))
+
+# ==== Metrics (exposed on /metrics) ====
+METRICS_ENABLED = os.getenv("FOODIE_METRICS", "1") != "0"
+TIMING_HEADERS = os.getenv("FOODIE_TIMING_HEADERS", "0") == "1"  # or send X-Foodie-Timing: 1 per request
+metrics = Registry(os.path.join(data_dir, "metrics"))
+request_timings = ContextVar("request_timings", default=None)
+
+def record_write(filename, seconds):
+    if METRICS_ENABLED:
+        metrics.observe("foodie_storage_write_duration_seconds", seconds, document=filename)
+    timings = request_timings.get()
+    if timings is not None:
+        timings["storage"] += seconds
+
+def record_lock_wait(scope, seconds, contended):
+    if METRICS_ENABLED:
+        metrics.observe("foodie_store_lock_wait_seconds", seconds, scope=scope)
+        if contended:
+            metrics.inc("foodie_store_lock_contended_total", scope=scope)
+    timings = request_timings.get()
+    if timings is not None:
+        timings["lock"] += seconds
+
+# ==== Tracing (joins the frontend's trace through the traceparent header) ====
+spans = SpanWriter(os.getenv("FOODIE_TRACE_FILE"))
+
+# Shared by every worker process; see components/store.py
+store = JsonStore(data_dir, dumps=dumps, on_write=record_write, on_lock_wait=record_lock_wait)
 
 # ==== Utility functions ====
 def save_json(filename, data):
-    with open(os.path.join(data_dir, filename), "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4)
+    store.write(filename, data)
 
 def load_json(filename):
     # Ensure file exists before trying to load
-    filepath = os.path.join(data_dir, filename)
-    if not os.path.exists(filepath):
-        # Handle case where file doesn't exist, maybe re-run run_once() or return default
-        print(f"Warning: {filepath} not found. Re-initializing data.")
-        run_once() # Re-initialize if missing
-        return load_json(filename) # Try loading again
-    with open(filepath, "r", encoding="utf-8") as f:
-        return json.load(f)
+    if not store.exists(filename):
+        print(f"Warning: {store.path(filename)} not found. Seeding missing data.")
+        seed_missing()
+    return store.read(filename)
+
+# ==== Seed data ====
+def seed_documents():
+    current_user_key = random.choice(list(users_db.keys()))
+    return {
+        "user.json": users_db[current_user_key],
+        "menu.json": seed_menu_db,
+        "branches.json": seed_branches_db,
+        "reservations.json": [],
+        "idempotency.json": [],
+        "carts.json": [],
+    }
+
+def seed_missing():
+    # Only writes documents that don't exist yet, so restarting a worker never wipes live data
+    with store.locked():
+        for filename, data in seed_documents().items():
+            if not store.exists(filename):
+                save_json(filename, data)
 
 # ==== Run-once initializer ====
 def run_once():
-    user_path = os.path.join(data_dir, "user.json")
-    menu_path = os.path.join(data_dir, "menu.json")
-    branches_path = os.path.join(data_dir, "branches.json")
+    # Overwrite every document with fresh seed data (used by /admin/reset)
+    with store.locked():
+        for filename, data in seed_documents().items():
+            save_json(filename, data)
+
+# ==== Session copies (kept in sync with the files other workers write) ====
+current_user = {}
+menu_catalog = MenuCatalog()     # built from menu.json; the nested document itself is not kept
+branches_db = {}
+branch_catalog = BranchCatalog()
+reservation_book = ReservationBook(lambda: branches_db, [])
+idempotency_store = IdempotencyStore()
+cart_book = CartBook(lambda: menu_catalog, lambda location: specials_index.discounts(location), today, [])
+
+def sync_state():
+    # Reload every document another worker rewrote since this worker last read or wrote it.
+    # Reloads run under the store lock, so they never land in the middle of a write, and fresh
+    # documents replace the shared ones whole, so a lock-free reader sees the old or the new one.
+    global current_user, menu_catalog, branches_db
+    if not store.changed(DOCUMENTS):
+        return
+    with store.locked("sync"):
+        for filename in store.changed(DOCUMENTS):
+            fresh = load_json(filename)
+            if filename == "user.json":
+                current_user = fresh
+            elif filename == "menu.json":
+                menu_catalog = MenuCatalog(fresh)
+                menu_updated()
+            elif filename == "branches.json":
+                branches_db = fresh
+                branches_updated()
+            elif filename == "reservations.json":
+                reservation_book.load(fresh)
+            elif filename == "idempotency.json":
+                idempotency_store.load(fresh)
+            elif filename == "carts.json":
+                cart_book.load(fresh)
+
+DOCUMENTS = ["user.json", "menu.json", "branches.json", "reservations.json", "idempotency.json", "carts.json"]
+
+# ==== Pricing indexes ====
+specials_index = SpecialsIndex(lambda: branches_db)
+combo_indexes = {}  # (branch, weekday) -> ComboIndex
+
+def vat_percentage():
+    return menu_catalog.settings.get("vat_percentage", 0)
+
+def get_combo_index(location=None, day=None):
+    key = (location, day)
+    if key not in combo_indexes:
+        discounts = specials_index.discounts(location, day) if location else {}
+        combo_indexes[key] = ComboIndex(menu_catalog, discounts)
+    return combo_indexes[key]
+
+def menu_updated():
+    combo_indexes.clear()
+    cart_book.invalidate()
+
+def branches_updated():
+    branch_catalog.load(branches_db, lambda branch: BranchInfo(**branch).model_dump(mode="json"))
+    specials_index.invalidate()
+    combo_indexes.clear()
+    cart_book.invalidate()
+
+def price_items(items, location=None):
+    # Look up each item once and apply today's branch discounts: O(items)
+    discounts = specials_index.discounts(location) if location else {}
 
-    # Delete old files if they exist to ensure fresh start
-    for path in [user_path, menu_path, branches_path]:
-        if os.path.exists(path):
-            os.remove(path)
-
-    # Write new fresh data
-    current_user_key = random.choice(list(users_db.keys()))
-    current_user = users_db[current_user_key]
-    save_json("user.json", current_user)
-    save_json("menu.json", menu_db)
-    save_json("branches.json", branches_db)
+    total = 0
+    savings = 0
+    unavailable_items = []
+    summary_items = []
+    for food_item in items:
+        name = food_item.name
+        quantity = food_item.quantity
 
-run_once()
+        price = menu_catalog.price(name)
+        if price is None:
+            unavailable_items.append(name)
+            continue
+
+        discount = discounts.get(name, 0)
+        unit_price = round(price * (1 - discount / 100), 2)
+        subtotal = unit_price * quantity
+        total += subtotal
+        savings += (price - unit_price) * quantity
+        summary_items.append({
+            "item": name,
+            "quantity": quantity,
+            "unit_price": unit_price,
+            "discount": discount,
+            "subtotal": round(subtotal, 2)
+        })
+
+    return summary_items, unavailable_items, total, savings
+
+# Documents are loaded lazily by the first request (see shared_state), and missing ones are seeded then.
+# Import never rewrites data; seed explicitly with `python backend.py seed` or reset via /admin/reset.
+startup_stats = {"import_ms": None, "first_request_ms": None}
+
+# ==== Responses ====
+# Endpoints return data the backend built itself, so results are encoded straight to bytes:
+# no jsonable_encoder pass and no response_model re-validation (response_model still documents
+# the route). Views of documents that did not change reuse their encoded bytes.
+class FastJSONResponse(JSONResponse):
+    def render(self, content):
+        return dumps(content, default=jsonable_encoder)
+
+class TrustedRoute(APIRoute):
+    def __init__(self, path, endpoint, **kwargs):
+        super().__init__(path, encoded(endpoint, kwargs.get("status_code") or 200), **kwargs)
+
+def encoded(endpoint, status_code):
+    def respond(result):
+        return result if isinstance(result, Response) else FastJSONResponse(result, status_code=status_code)
+
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def handler(*args, **kwargs):
+            return respond(await endpoint(*args, **kwargs))
+    else:
+        @functools.wraps(endpoint)
+        def handler(*args, **kwargs):
+            return respond(endpoint(*args, **kwargs))
+    return handler
 
-# ==== Load session copies ====
+encoded_views = EncodedCache(lambda data: dumps(data, default=jsonable_encoder))
 
-current_user = load_json("user.json")
-menu_db = load_json("menu.json")
-branches_db = load_json("branches.json") # Fixed: Ensure branches_db is loaded from branches.json
+def document_response(view, filenames, build):
+    # Rebuilt only after one of `filenames` is rewritten (by this worker or another)
+    revision = tuple(store.revisions.get(filename) for filename in filenames)
+    return Response(content=encoded_views.get(view, revision, build), media_type="application/json")
 
 # ==== FastAPI App ====
-app = FastAPI(title="FoodieBot Backend API")
+app = FastAPI(title="FoodieBot Backend API", default_response_class=FastJSONResponse)
+app.router.route_class = TrustedRoute
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -69,6 +240,75 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(ReservationError)
+@app.exception_handler(IdempotencyConflict)
+@app.exception_handler(CartError)
+@app.exception_handler(CatalogError)
+async def detail_error_handler(request: Request, exc: Union[ReservationError, IdempotencyConflict, CartError, CatalogError]):
+    if METRICS_ENABLED and isinstance(exc, ReservationError) and exc.status_code == 409:
+        metrics.inc("foodie_booking_conflicts_total")
+    return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail})
+
+@app.middleware("http")
+async def shared_state(request: Request, call_next):
+    started = perf_counter()
+    started_at = datetime.now().timestamp()
+    trace_id, parent_id = parse_traceparent(request.headers.get("traceparent"))
+    timings = {"storage": 0.0, "lock": 0.0}
+    request_timings.set(timings)
+
+    if store.changed(DOCUMENTS):
+        await run_in_threadpool(sync_state)  # waits on the store lock, so off the event loop
+    response = await call_next(request)
+    etag = response.headers.get("etag")
+    if etag and request.headers.get("if-none-match") == etag:
+        response = Response(status_code=304, headers={"ETag": etag})
+
+    elapsed = perf_counter() - started
+    route = request.scope.get("route")
+    path = route.path if route is not None else "unmatched"
+    if METRICS_ENABLED:
+        metrics.observe("foodie_http_request_duration_seconds", elapsed, route=path, method=request.method)
+        metrics.inc("foodie_http_requests_total", route=path, method=request.method, status=response.status_code)
+        metrics.maybe_write_snapshot()
+    if TIMING_HEADERS or request.headers.get("x-foodie-timing") == "1":
+        response.headers["Server-Timing"] = (
+            f"app;dur={elapsed * 1000:.2f}, storage;dur={timings['storage'] * 1000:.2f}, lock;dur={timings['lock'] * 1000:.2f}"
+        )
+    spans.write(
+        f"http {request.method} {path}", trace_id, parent_id, started_at, elapsed * 1000,
+        status=response.status_code, storage_ms=round(timings["storage"] * 1000, 2), lock_ms=round(timings["lock"] * 1000, 2),
+    )
+    response.headers["X-Trace-Id"] = trace_id
+
+    if startup_stats["first_request_ms"] is None:
+        startup_stats["first_request_ms"] = round((perf_counter() - IMPORT_STARTED) * 1000, 1)
+        print(f"[Cold start] import {startup_stats['import_ms']} ms, first request served {startup_stats['first_request_ms']} ms after import")
+    return response
+
+# ==== Idempotency (Idempotency-Key header on write endpoints) ====
+def run_idempotent(idempotency_key, scope, payload, handler):
+    # Writes run under the store lock on fresh state, so workers never double-spend the wallet.
+    # Without a key the request runs as before; with one, duplicates replay the first response.
+    with store.locked(scope):
+        sync_state()
+        if not idempotency_key:
+            return handler()
+        request_fingerprint = fingerprint(scope, payload)
+        replay = idempotency_store.begin(idempotency_key, request_fingerprint)
+        if replay is not None:
+            if METRICS_ENABLED:
+                metrics.inc("foodie_idempotent_replays_total", scope=scope)
+            return JSONResponse(content=replay, headers={"Idempotent-Replayed": "true"})
+        try:
+            result = handler()
+        except Exception:
+            idempotency_store.release(idempotency_key)
+            raise
+        idempotency_store.complete(idempotency_key, request_fingerprint, result)
+        save_json("idempotency.json", idempotency_store.dump())
+        return result
+
 # ==== Models ====
 class OrderItem(BaseModel):
     food: List[str]
@@ -109,14 +349,51 @@ class FoodItem(BaseModel):
 
 class OrderItemsRequest(BaseModel):
     items: List[FoodItem]
+    location: Optional[str] = None
 
 class PlaceOrderFullRequest(BaseModel):
-    items: List[FoodItem]
-    total_cost: float
+    items: List[FoodItem] = []
+    total_cost: Optional[float] = None
+    location: Optional[str] = None
+    cart_id: Optional[str] = None  # commit a server-side cart instead of listing items
+
+class CartRequest(BaseModel):
+    location: Optional[str] = None
+    items: List[FoodItem] = []
+
+class CartItemRequest(BaseModel):
+    name: str
+    quantity: int = 1
     
 class WalletDepositRequest(BaseModel):
     amount: float
 
+class MenuItemChange(BaseModel):
+    name: str
+    price: Optional[float] = None      # new price; required for a new item
+    category: Optional[str] = None     # move to (or create in) this category; required for a new item
+
+class MenuChanges(BaseModel):
+    upsert: List[MenuItemChange] = []
+    delete: List[str] = []
+
+class TableChange(BaseModel):
+    location: str
+    table_type: str
+    number: Optional[int] = None
+    unit_price: Optional[float] = None
+    remove: bool = False
+
+class TableChanges(BaseModel):
+    changes: List[TableChange]
+
+class BatchOperation(BaseModel):
+    op: str                 # a name from BATCH_READS or BATCH_WRITES
+    args: Dict = {}
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation]
+
 
 
 
@@ -124,6 +401,14 @@ class WalletDepositRequest(BaseModel):
 
 # ==== Endpoints ====
 
+@app.get("/health")
+def health():
+    return {"status": "ok", "cold_start": startup_stats}
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/")
 def root():
     return {
@@ -132,166 +417,322 @@ def root():
 
 @app.get("/user", response_model=User)
 def get_current_user():
-    return current_user
+    return document_response("user", ["user.json"], lambda: current_user)
 
 @app.get("/user/wallet")
 def get_wallet_balance():
-    return {"wallet_balance": current_user["wallet_balance"]}
+    return document_response("wallet", ["user.json"], lambda: {"wallet_balance": current_user["wallet_balance"]})
 
 @app.get("/user/orders")
 def get_last_orders():
-    return current_user["last_orders"]
+    return document_response("orders", ["user.json"], lambda: current_user["last_orders"])
+
+# Catalog reads send bodies serialized when the document was loaded or last changed
+# (components/catalog.py); their ETags let clients revalidate with If-None-Match
+def catalog_response(view):
+    body, etag = view
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
 
 @app.get("/menu")
 def get_full_menu():
-    return menu_db
+    return catalog_response(menu_catalog.view())
 
 @app.get("/menu/{category}")
 def get_menu_category(category: str):
-    if category in menu_db:
-        return menu_db[category]
+    view = menu_catalog.view(category)
+    if view is not None:
+        return catalog_response(view)
     raise HTTPException(status_code=404, detail="Category not found")
 
 @app.get("/branches")
 def list_all_branches():
-    return list(branches_db.keys())
+    return catalog_response(branch_catalog.view())
 
 @app.get("/branches/{location}", response_model=BranchInfo)
 def get_branch_details(location: str):
     location = location.lower()
-    if location in branches_db:
-        return branches_db[location]
+    view = branch_catalog.view(location)
+    if view is not None:
+        return catalog_response(view)
     raise HTTPException(status_code=404, detail=f"Foodie doesn't have a branch in {location}")
 
+@app.get("/specials/today")
+def get_todays_specials():
+    day = today()
+    return document_response(("specials", day), ["branches.json"], lambda: {
+        "day": day,
+        "specials": {
+            branches_db[location]["location"]: [
+                {"food": food, "discount": discount} for food, discount in discounts.items()
+            ]
+            for location, discounts in specials_index.for_day(day).items()
+        }
+    })
+
 
-@app.get("/pre_book/{location}/{table_type}")
-async def pre_booking(location: str, table_type: str):
-    location_lower = location.lower()
-    if location_lower not in branches_db:
-        raise HTTPException(status_code=404, detail=f"Foodie doesn't have a branch in {location}")
+@app.get("/combos")
+def get_combo_suggestions(budget: Optional[float] = None, location: Optional[str] = None, k: int = 3):
+    if budget is None:
+        budget = current_user["wallet_balance"]
+    if budget <= 0:
+        raise HTTPException(status_code=400, detail="Budget must be positive.")
+
+    day = None
+    if location:
+        location = location.lower()
+        if location not in branches_db:
+            raise HTTPException(status_code=404, detail=f"Foodie doesn't have a branch in {location}")
+        day = today()
+
+    # Budget covers the grand total, so search combos against the pre-VAT amount
+    vat = vat_percentage()
+    index = get_combo_index(location, day)
+    combos = index.top_k(budget / (1 + vat / 100), k=max(1, min(k, 10)))
+
+    if not combos:
+        cheapest = index.cheapest() or 0
+        raise HTTPException(
+            status_code=400,
+            detail=f"No combo fits a budget of ₦{budget:.2f}. The cheapest combo costs ₦{cheapest * (1 + vat / 100):.2f}."
+        )
+
+    for combo in combos:
+        vat_amount = (vat / 100) * combo["total"]
+        combo["vat_amount"] = round(vat_amount, 2)
+        combo["grand_total"] = round(combo["total"] + vat_amount, 2)
 
-    tables = branches_db[location_lower]["available_tables"]
-    if table_type not in tables:
-        raise HTTPException(status_code=404, detail="Table type not available at this branch.")
+    return {
+        "message": "Combo suggestions within budget:",
+        "budget": round(budget, 2),
+        "location": location.title() if location else None,
+        "day": day,
+        "vat_percentage": vat,
+        "combos": combos,
+        "currency": "Naira"
+    }
 
-    if tables[table_type]["number"] <= 0:
-        raise HTTPException(status_code=400, detail="No tables available for this type at this branch.")
-    
-    # Calculate estimated cost
-    price = tables[table_type]["unit_price"]
+
+@app.get("/availability/{location}")
+def table_availability(location: str, table_type: Optional[str] = None, date: Optional[str] = None, time: Optional[str] = None):
+    return reservation_book.availability(location.lower(), table_type, date, time)
+
+
+@app.get("/pre_book/{location}/{table_type}")
+def pre_booking(location: str, table_type: str, date: Optional[str] = None, time: Optional[str] = None):
+    location_lower = location.lower()
+    slot = reservation_book.availability(location_lower, table_type, date, time)
+    table_type, info = next(iter(slot["tables"].items()))
+
+    if info["available"] <= 0:
+        detail = f"No {table_type} tables available at {slot['time']} on {slot['date']} at this branch."
+        suggestions = reservation_book.next_available(
+            location_lower, table_type, slot["date"], parse_slot(slot["time"]), parse_slot(slot["until"])
+        )
+        if suggestions:
+            detail += f" Next free times: {', '.join(suggestions)}."
+        raise HTTPException(status_code=400, detail=detail)
 
     return {
         "message": f"Provisional summary for booking a '{table_type}' at {location.title()} branch:",
         "table_type": table_type,
         "location": location.title(),
-        "estimated_cost": price,
+        "date": slot["date"],
+        "time": slot["time"],
+        "until": slot["until"],
+        "estimated_cost": info["unit_price"],
         "currency": "Naira",
-        "availability": tables[table_type]["number"] > 0
+        "availability": True,
+        "tables_free": info["available"]
+    }
+
+
+@app.post("/reservations/hold")
+def hold_table(location: str, table_type: str, date: Optional[str] = None, time: Optional[str] = None,
+               idempotency_key: Optional[str] = Header(None)):
+    params = {"location": location, "table_type": table_type, "date": date, "time": time}
+    return run_idempotent(idempotency_key, "hold_table", params, lambda: commit_hold(**params))
+
+
+def commit_hold(location, table_type, date=None, time=None):
+    record = reservation_book.hold(location.lower(), table_type, date, time)
+    save_json("reservations.json", reservation_book.dump())
+    return {
+        "message": f"Table '{record['table_type']}' held for {HOLD_SECONDS // 60} minutes. Book it with this reservation_id before the hold expires.",
+        "reservation": record
     }
 
 
+@app.get("/reservations")
+def list_reservations():
+    return sorted(reservation_book.active(), key=lambda record: (record["date"], record["start_slot"]))
+
+
 @app.post("/book_table/")
-async def book_table(location: str, table_type: str):
-    location = location.lower()
-    if location not in branches_db:
-        raise HTTPException(status_code=404, detail="Branch not found")
+def book_table(location: str, table_type: str, date: Optional[str] = None, time: Optional[str] = None,
+                     reservation_id: Optional[str] = None, idempotency_key: Optional[str] = Header(None)):
+    params = {"location": location, "table_type": table_type, "date": date, "time": time, "reservation_id": reservation_id}
+    return run_idempotent(idempotency_key, "book_table", params, lambda: commit_booking(**params))
 
-    tables = branches_db[location]["available_tables"]
-    if table_type not in tables:
-        raise HTTPException(status_code=404, detail="Table type not available")
 
-    if tables[table_type]["number"] <= 0:
-        raise HTTPException(status_code=400, detail="No tables available for this type")
+def commit_booking(location, table_type, date=None, time=None, reservation_id=None):
+    location = location.lower()
+    if reservation_id:
+        record = reservation_book.get(reservation_id)
+        if record["status"] != "held":
+            raise HTTPException(status_code=400, detail="This reservation is already booked.")
+        price = record["unit_price"]
+    else:
+        slot = reservation_book.availability(location, table_type, date, time)
+        price = next(iter(slot["tables"].values()))["unit_price"]
 
-    price = tables[table_type]["unit_price"]
     if current_user["wallet_balance"] < price:
+        if METRICS_ENABLED:
+            metrics.inc("foodie_wallet_rejections_total", scope="book_table")
         raise HTTPException(status_code=400, detail="Insufficient wallet balance to book this table.")
 
-    tables[table_type]["number"] -= 1
+    if reservation_id:
+        record = reservation_book.confirm(reservation_id, paid=price)
+    else:
+        record = reservation_book.hold(location, table_type, date, time, status="confirmed")
+        record["paid"] = price
     current_user["wallet_balance"] -= price
 
     save_json("user.json", current_user)
-    save_json("branches.json", branches_db)
+    save_json("reservations.json", reservation_book.dump())
 
     return {
-        "message": f"Table '{table_type}' booked at {location.title()} branch.",
+        "message": f"Table '{record['table_type']}' booked at {record['location'].title()} branch for {record['date']} at {record['time']}.",
+        "reservation_id": record["id"],
+        "date": record["date"],
+        "time": record["time"],
         "paid": price,
-        "remaining_tables": tables[table_type]["number"],
+        "remaining_tables": reservation_book.remaining(record),
         "new_wallet_balance": round(current_user["wallet_balance"], 2)
     }
 
 
-@app.post("/pre_order/")
-async def pre_order(request: OrderItemsRequest):
-    total = 0
-    price_lookup = {
-        item["name"]: item["price"]
-        for section in menu_db.values() if isinstance(section, list)
-        for item in section
+@app.delete("/reservations/{reservation_id}")
+def cancel_reservation(reservation_id: str, idempotency_key: Optional[str] = Header(None)):
+    # A retried cancel replays the refund instead of failing with 404
+    return run_idempotent(idempotency_key, "cancel_reservation", {"reservation_id": reservation_id},
+                          lambda: commit_cancel(reservation_id))
+
+
+def commit_cancel(reservation_id):
+    record = reservation_book.cancel(reservation_id)
+    refund = record.get("paid", 0)
+    current_user["wallet_balance"] += refund
+
+    save_json("user.json", current_user)
+    save_json("reservations.json", reservation_book.dump())
+
+    return {
+        "message": f"Reservation {reservation_id} for a '{record['table_type']}' at {record['location'].title()} on {record['date']} at {record['time']} has been cancelled.",
+        "refunded": refund,
+        "new_wallet_balance": round(current_user["wallet_balance"], 2)
     }
 
-    unavailable_items = []
-    summary_items = []
 
-    for food_item in request.items:
-        name = food_item.name
-        quantity = food_item.quantity
+def resolve_location(location):
+    if location is None:
+        return None
+    location = location.lower()
+    if location not in branches_db:
+        raise HTTPException(status_code=404, detail=f"Foodie doesn't have a branch in {location}")
+    return location
 
-        if name not in price_lookup:
-            unavailable_items.append(name)
-        else:
-            unit_price = price_lookup[name]
-            subtotal = unit_price * quantity
-            total += subtotal
-            summary_items.append({
-                "item": name,
-                "quantity": quantity,
-                "unit_price": unit_price,
-                "subtotal": round(subtotal, 2)
-            })
+
+@app.post("/pre_order/")
+async def pre_order(request: OrderItemsRequest):
+    summary_items, unavailable_items, total, savings = price_items(request.items, resolve_location(request.location))
 
     if unavailable_items:
         raise HTTPException(status_code=400, detail=f"The following food items are not found in the menu: {', '.join(unavailable_items)}")
 
-    vat_percentage = menu_db.get("settings", {}).get("vat_percentage", 0)
-    vat_amount = (vat_percentage / 100) * total
+    vat_amount = (vat_percentage() / 100) * total
     grand_total = total + vat_amount
 
     return {
         "message": "Provisional order summary:",
         "ordered_items": summary_items,
         "sub_total": round(total, 2),
-        "vat_percentage": vat_percentage,
+        "special_savings": round(savings, 2),
+        "vat_percentage": vat_percentage(),
         "vat_amount": round(vat_amount, 2),
         "grand_total": round(grand_total, 2),
         "currency": "Naira"
     }
 
 
+# ==== Carts (the order being built, priced server-side) ====
+def update_cart(idempotency_key, scope, payload, change):
+    # Same discipline as charges: mutate fresh state under the store lock, then persist.
+    # A retried call with the same Idempotency-Key replays the first summary instead of
+    # adding the items (or creating the cart) a second time.
+    def commit():
+        cart = change()
+        save_json("carts.json", cart_book.dump())
+        return cart_book.summary(cart, vat_percentage())
+    return run_idempotent(idempotency_key, scope, payload, commit)
+
+
+@app.post("/carts")
+def create_cart(request: CartRequest, idempotency_key: Optional[str] = Header(None)):
+    location = resolve_location(request.location)
+    return update_cart(idempotency_key, "create_cart", request.model_dump(),
+                       lambda: cart_book.create(location, [(item.name, item.quantity) for item in request.items]))
+
+
+@app.get("/carts/{cart_id}")
+def view_cart(cart_id: str):
+    return cart_book.summary(cart_book.get(cart_id), vat_percentage())
+
+
+@app.post("/carts/{cart_id}/items")
+def add_to_cart(cart_id: str, request: CartItemRequest, idempotency_key: Optional[str] = Header(None)):
+    if request.quantity < 1:
+        raise HTTPException(status_code=400, detail="Quantity must be at least 1.")
+    return update_cart(idempotency_key, "add_to_cart", {"cart_id": cart_id, **request.model_dump()},
+                       lambda: cart_book.add(cart_id, request.name, request.quantity))
+
+
+@app.put("/carts/{cart_id}/items/{name}")
+def set_cart_quantity(cart_id: str, name: str, quantity: int, idempotency_key: Optional[str] = Header(None)):
+    # quantity=0 removes the item
+    return update_cart(idempotency_key, "set_cart_quantity", {"cart_id": cart_id, "name": name, "quantity": quantity},
+                       lambda: cart_book.set_quantity(cart_id, name, quantity))
+
+
+@app.delete("/carts/{cart_id}/items/{name}")
+def remove_from_cart(cart_id: str, name: str, idempotency_key: Optional[str] = Header(None)):
+    return update_cart(idempotency_key, "remove_from_cart", {"cart_id": cart_id, "name": name},
+                       lambda: cart_book.remove(cart_id, name))
+
+
+@app.put("/carts/{cart_id}/location")
+def set_cart_location(cart_id: str, location: str, idempotency_key: Optional[str] = Header(None)):
+    location = resolve_location(location)
+    return update_cart(idempotency_key, "set_cart_location", {"cart_id": cart_id, "location": location},
+                       lambda: cart_book.set_location(cart_id, location))
+
+
 @app.post("/place_order/")
-async def place_order(request:PlaceOrderFullRequest):
-    total = 0
-    price_lookup = {
-        item["name"]: item["price"]
-        for section in menu_db.values() if isinstance(section, list)
-        for item in section
-    }
+def place_order(request:PlaceOrderFullRequest, idempotency_key: Optional[str] = Header(None)):
+    return run_idempotent(idempotency_key, "place_order", request.model_dump(), lambda: commit_order(request))
 
-    unavailable_items = []
-    for food_item in request.items:
-        name = food_item.name
-        quantity = food_item.quantity
 
-        if name not in price_lookup:
-            unavailable_items.append(name)
-        else:
-            total += price_lookup[name] * quantity
+def commit_order(request):
+    if request.cart_id:
+        return commit_cart(request.cart_id, resolve_location(request.location))
+    if not request.items:
+        raise HTTPException(status_code=400, detail="Provide the items to order or a cart_id.")
+
+    _, unavailable_items, total, savings = price_items(request.items, resolve_location(request.location))
 
     if unavailable_items:
         raise HTTPException(status_code=400, detail=f"Unavailable items: {', '.join(unavailable_items)}")
 
-    vat_percentage = menu_db.get("settings", {}).get("vat_percentage", 0)
-    vat = (vat_percentage / 100) * total
+    vat = (vat_percentage() / 100) * total
     grand_total = total + vat
 
     # ⚠️ Validate frontend total
@@ -299,6 +740,8 @@ async def place_order(request:PlaceOrderFullRequest):
     #    raise HTTPException(status_code=400, detail="Mismatch in total cost submitted.")
 
     if current_user["wallet_balance"] < grand_total:
+        if METRICS_ENABLED:
+            metrics.inc("foodie_wallet_rejections_total", scope="place_order")
         raise HTTPException(status_code=400, detail="Insufficient wallet balance.")
 
     current_user["wallet_balance"] -= grand_total
@@ -316,15 +759,59 @@ async def place_order(request:PlaceOrderFullRequest):
         "message": "Order placed successfully",
         "ordered_items": [item.dict() for item in request.items],
         "sub_total": round(total, 2),
+        "special_savings": round(savings, 2),
         "vat": round(vat, 2),
         "grand_total": round(grand_total, 2),
         "new_wallet_balance": round(current_user["wallet_balance"], 2)
     }
 
 
+def commit_cart(cart_id, location=None):
+    # One call turns a cart into an order, at the totals the cart already shows
+    # Priced at the order's branch without touching the cart, so a rejected order leaves it as saved
+    cart = cart_book.get(cart_id)
+    summary = cart_book.summary(cart, vat_percentage(), location)
+    if not summary["items"]:
+        raise HTTPException(status_code=400, detail="This cart is empty.")
+
+    if current_user["wallet_balance"] < summary["grand_total"]:
+        if METRICS_ENABLED:
+            metrics.inc("foodie_wallet_rejections_total", scope="place_order")
+        raise HTTPException(status_code=400, detail="Insufficient wallet balance.")
+
+    current_user["wallet_balance"] -= summary["grand_total"]
+
+    now = datetime.now()
+    ordered_items = [{"name": item["item"], "quantity": item["quantity"]} for item in summary["items"]]
+    current_user["last_orders"].insert(0, {
+        "food": ordered_items,
+        "date": now.strftime("%Y-%m-%d"),
+        "time": now.strftime("%H:%M")
+    })
+    cart_book.close(cart_id)
+
+    save_json("user.json", current_user)
+    save_json("carts.json", cart_book.dump())
+
+    return {
+        "message": "Order placed successfully",
+        "cart_id": cart_id,
+        "ordered_items": ordered_items,
+        "sub_total": summary["sub_total"],
+        "special_savings": summary["special_savings"],
+        "vat": summary["vat_amount"],
+        "grand_total": summary["grand_total"],
+        "new_wallet_balance": round(current_user["wallet_balance"], 2)
+    }
+
+
 # NEW: wallet_deposit Endpoint
 @app.post("/wallet_deposit/")
-async def wallet_deposit(request: WalletDepositRequest):
+def wallet_deposit(request: WalletDepositRequest, idempotency_key: Optional[str] = Header(None)):
+    return run_idempotent(idempotency_key, "wallet_deposit", request.model_dump(), lambda: commit_deposit(request))
+
+
+def commit_deposit(request):
     if request.amount <= 0:
         raise HTTPException(status_code=400, detail="Deposit amount must be positive.")
     
@@ -336,20 +823,189 @@ async def wallet_deposit(request: WalletDepositRequest):
         "new_wallet_balance": round(current_user["wallet_balance"], 2)
     }
 
+# ==== Batch (one round trip for all the tool calls of a chat turn) ====
+MAX_BATCH_OPERATIONS = 10
+
+BATCH_READS = {handler.__name__: handler for handler in (
+    get_current_user, get_wallet_balance, get_last_orders, get_full_menu, get_menu_category,
+    list_all_branches, get_branch_details, get_todays_specials, get_combo_suggestions,
+    table_availability, pre_booking, list_reservations, view_cart,
+)}
+
+# At most one per batch; every write reuses the batch's Idempotency-Key
+BATCH_WRITES = {
+    "place_order": lambda args, key: place_order(PlaceOrderFullRequest(**args), key),
+    "wallet_deposit": lambda args, key: wallet_deposit(WalletDepositRequest(**args), key),
+    "book_table": lambda args, key: book_table(idempotency_key=key, **args),
+    "hold_table": lambda args, key: hold_table(idempotency_key=key, **args),
+    "cancel_reservation": lambda args, key: cancel_reservation(idempotency_key=key, **args),
+    "create_cart": lambda args, key: create_cart(CartRequest(**args), key),
+    "add_to_cart": lambda args, key: add_to_cart(args["cart_id"], CartItemRequest(**{
+        name: value for name, value in args.items() if name != "cart_id"
+    }), key),
+    "set_cart_quantity": lambda args, key: set_cart_quantity(idempotency_key=key, **args),
+    "remove_from_cart": lambda args, key: remove_from_cart(idempotency_key=key, **args),
+    "set_cart_location": lambda args, key: set_cart_location(idempotency_key=key, **args),
+}
+
+
+async def run_operation(operation, idempotency_key):
+    started = perf_counter()
+    outcome = {"op": operation.op, "status": 200}
+    try:
+        # Writes (and some reads) wait on store.locked(), so they run in the threadpool
+        if operation.op in BATCH_WRITES:
+            result = await run_in_threadpool(BATCH_WRITES[operation.op], operation.args, idempotency_key)
+        else:
+            result = await run_in_threadpool(BATCH_READS[operation.op], **operation.args)
+        if inspect.isawaitable(result):
+            result = await result
+        if isinstance(result, JSONResponse):  # idempotent replay
+            outcome["replayed"] = True
+            result = json.loads(result.body)
+        elif isinstance(result, Response):  # pre-serialized catalog view
+            result = json.loads(bytes(result.body))
+        outcome["result"] = result
+    except (HTTPException, ReservationError, CartError, IdempotencyConflict) as e:
+        outcome.update(status=e.status_code, detail=e.detail)
+    except (ValidationError, TypeError, KeyError) as e:
+        outcome.update(status=422, detail=f"Invalid arguments for {operation.op}: {e}")
+    if METRICS_ENABLED:
+        metrics.observe("foodie_batch_operation_duration_seconds", perf_counter() - started, op=operation.op, status=outcome["status"])
+    return outcome
+
+
+@app.post("/batch")
+async def batch(request: BatchRequest, idempotency_key: Optional[str] = Header(None)):
+    """
+    Run several operations in order and return one result per operation. A failing
+    operation is reported in its own result and does not stop the others.
+    """
+    operations = request.operations
+    if not operations or len(operations) > MAX_BATCH_OPERATIONS:
+        raise HTTPException(status_code=400, detail=f"A batch takes 1 to {MAX_BATCH_OPERATIONS} operations.")
+    unknown = [operation.op for operation in operations if operation.op not in BATCH_READS and operation.op not in BATCH_WRITES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown operations: {', '.join(unknown)}")
+    if sum(operation.op in BATCH_WRITES for operation in operations) > 1:
+        raise HTTPException(status_code=400, detail="A batch may contain at most one write operation.")
+
+    return {"results": [await run_operation(operation, idempotency_key) for operation in operations]}
+
+
+# ==== Catalog admin (changes are applied in place; wallets, bookings and carts are kept) ====
+def remove_from_specials(foods):
+    # Deleted items leave every branch's specials, in the document and the index
+    foods = set(foods)
+    touched = set()
+    for location, branch in branches_db.items():
+        for special in branch.get("specials", []):
+            kept = [food for food in special["food"] if food not in foods]
+            if len(kept) != len(special["food"]):
+                special["food"] = kept
+                touched.add(location)
+    specials_index.remove_foods(foods)
+    for location in touched:
+        branch_catalog.update(location, branches_db[location])
+    return touched
+
+@app.post("/admin/menu")
+def update_menu(request: MenuChanges):
+    """
+    Bulk upsert and delete of menu items: new items, price changes and category moves.
+    Only the changed items are re-indexed and only their categories re-encoded.
+    """
+    upserts = [(item.name, item.price, item.category) for item in request.upsert]
+    with store.locked("catalog"):
+        sync_state()
+        changed = menu_catalog.apply(upserts, request.delete)
+        store.write_encoded("menu.json", menu_catalog.body)
+
+        names = [name for name, _, _ in upserts]
+        if cart_book.reprice(names, request.delete):
+            save_json("carts.json", cart_book.dump())
+        if request.delete and remove_from_specials(request.delete):
+            save_json("branches.json", branches_db)
+        if changed.intersection(COMBO_CATEGORIES):
+            combo_indexes.clear()
+    if METRICS_ENABLED:
+        metrics.inc("foodie_catalog_changes_total", len(upserts) + len(request.delete), document="menu")
+    return {
+        "message": "Menu updated",
+        "changed_categories": sorted(changed),
+        "menu_items": len(menu_catalog),
+        "etag": menu_catalog.etag,
+    }
+
+@app.post("/admin/tables")
+def update_tables(request: TableChanges):
+    """Bulk change of branch table inventory: counts, prices, new table types and removals."""
+    with store.locked("catalog"):
+        sync_state()
+        for change in request.changes:
+            location = change.location.lower()
+            if location not in branches_db:
+                raise HTTPException(status_code=404, detail=f"Foodie doesn't have a branch in {location}")
+            tables = branches_db[location]["available_tables"]
+            if change.remove:
+                if change.table_type not in tables:
+                    raise HTTPException(status_code=404, detail=f"{location.title()} has no '{change.table_type}' tables.")
+                if reservation_book.upcoming(location, change.table_type):
+                    raise HTTPException(status_code=409, detail=f"'{change.table_type}' at {location.title()} has upcoming reservations.")
+            elif change.table_type not in tables and (change.number is None or change.unit_price is None):
+                raise HTTPException(status_code=400, detail=f"New table type '{change.table_type}' needs a number and a unit_price.")
+            if (change.number is not None and change.number < 0) or (change.unit_price is not None and change.unit_price <= 0):
+                raise HTTPException(status_code=400, detail="Table numbers cannot be negative and prices must be positive.")
+
+        touched = set()
+        for change in request.changes:
+            location = change.location.lower()
+            tables = branches_db[location]["available_tables"]
+            if change.remove:
+                del tables[change.table_type]
+            else:
+                table = tables.setdefault(change.table_type, {})
+                if change.number is not None:
+                    table["number"] = change.number
+                if change.unit_price is not None:
+                    table["unit_price"] = change.unit_price
+            touched.add(location)
+        for location in touched:
+            branch_catalog.update(location, branches_db[location])
+        save_json("branches.json", branches_db)
+    if METRICS_ENABLED:
+        metrics.inc("foodie_catalog_changes_total", len(request.changes), document="branches")
+    return {
+        "message": "Table inventory updated",
+        "branches": {location: branches_db[location]["available_tables"] for location in sorted(touched)},
+    }
+
 # restart_server Endpoint
 @app.post("/admin/reset")
 def manual_reset():
-    global current_user, menu_db, branches_db
-    run_once()
-    current_user = load_json("user.json")
-    menu_db = load_json("menu.json")
-    branches_db = load_json("branches.json")
+    with store.locked():
+        run_once()
+        store.forget()
+        sync_state()
+    idempotency_store.clear()
     return {"message": "Data has been reset"}
 
 
 
+startup_stats["import_ms"] = round((perf_counter() - IMPORT_STARTED) * 1000, 1)
+
+
 # ==== Dev Server ====
-if __name__ == "__main__":
+if __name__ == "__main__" and sys.argv[1:2] == ["seed"]:
+    # python backend.py seed          -> write only the documents that are missing
+    # python backend.py seed --force  -> overwrite everything with fresh seed data
+    if "--force" in sys.argv:
+        run_once()
+    else:
+        seed_missing()
+    print(f"[Seeded data in {data_dir}]")
+
+elif __name__ == "__main__":
     def is_port_in_use(host="127.0.0.1", port=8000):
         import socket
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
@@ -357,6 +1013,6 @@ if __name__ == "__main__":
 
     if not is_port_in_use():
         print("[Starting FastAPI Backend on port 8000]")
-        uvicorn.run("components.backend:app", host="127.0.0.1", port=8000, reload=False)
+        uvicorn.run("backend:app", host="127.0.0.1", port=8000, reload=False)
     else:
         print("[Backend already running on port 8000]")
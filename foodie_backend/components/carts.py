@@ -0,0 +1,189 @@
+# carts.py
+# Server-side carts: the order being built lives here instead of in the chat transcript.
+import time
+import uuid
+
+CART_TTL_SECONDS = 24 * 60 * 60
+MAX_QUANTITY = 100
+
+
+class CartError(Exception):
+    def __init__(self, status_code, detail):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class CartBook:
+    """
+    Carts for every session, backed by a list of plain records that is persisted as-is:
+    {"id", "location", "items": {menu name: quantity}, "updated_at"}.
+    Each cart's running (sub_total, savings) is kept next to the records and adjusted by
+    the price of the changed line only, so add/remove/set are O(1) whatever the cart size.
+    The running totals are rebuilt lazily after load() or invalidate() (menu or specials
+    changed, or the day rolled over), the same way reservation trees are.
+    """
+
+    def __init__(self, get_menu, get_discounts, get_day, records):
+        self.get_menu = get_menu              # the current MenuCatalog (components/catalog.py)
+        self.get_discounts = get_discounts    # location -> {menu name: discount %}
+        self.get_day = get_day                # today's weekday name; specials change with it
+        self.load(records)
+
+    def load(self, records):
+        self.carts = {record["id"]: record for record in records}
+        self.invalidate()
+
+    def dump(self):
+        return list(self.carts.values())
+
+    def invalidate(self):
+        self.totals = {}
+        self.priced_on = self.get_day()
+
+    def reprice(self, names, removed=()):
+        """
+        Menu prices of `names` changed, or the `removed` ones left the menu: drop deleted lines,
+        and the running totals of the carts holding any of them. Returns True if a cart's
+        items changed.
+        """
+        names = set(names) | set(removed)
+        edited = False
+        for cart in self.carts.values():
+            held = names.intersection(cart["items"])
+            if not held:
+                continue
+            for name in held.intersection(removed):
+                del cart["items"][name]
+                edited = True
+            self.totals.pop(cart["id"], None)
+        return edited
+
+    def purge_expired(self, now=None):
+        now = now or time.time()
+        expired = [cart_id for cart_id, cart in self.carts.items() if cart["updated_at"] + CART_TTL_SECONDS <= now]
+        for cart_id in expired:
+            del self.carts[cart_id]
+            self.totals.pop(cart_id, None)
+        return bool(expired)
+
+    # ---- Pricing ----
+    def resolve_item(self, name):
+        menu = self.get_menu()
+        item_id = menu.resolve(name)
+        if item_id is None:
+            raise CartError(400, f"'{name}' is not on the menu.")
+        return menu.names[item_id]
+
+    def _line(self, cart, name, quantity):
+        # (cost, savings) of `quantity` of one item at this cart's branch today
+        price = self.get_menu().price(name)
+        discount = self.get_discounts(cart["location"]).get(name, 0) if cart["location"] else 0
+        unit_price = round(price * (1 - discount / 100), 2)
+        return unit_price * quantity, (price - unit_price) * quantity
+
+    def _price(self, cart):
+        totals = [0.0, 0.0]
+        for name, quantity in cart["items"].items():
+            cost, savings = self._line(cart, name, quantity)
+            totals[0] += cost
+            totals[1] += savings
+        return totals
+
+    def _totals(self, cart):
+        if self.priced_on != self.get_day():
+            self.invalidate()
+        totals = self.totals.get(cart["id"])
+        if totals is None:
+            totals = self.totals[cart["id"]] = self._price(cart)
+        return totals
+
+    def _change(self, cart, name, quantity):
+        if not 0 <= quantity <= MAX_QUANTITY:
+            raise CartError(400, f"Quantity must be between 0 and {MAX_QUANTITY}.")
+        totals = self._totals(cart)  # settle the running totals before the line changes
+        delta = quantity - cart["items"].get(name, 0)
+        cost, savings = self._line(cart, name, delta)
+        totals[0] += cost
+        totals[1] += savings
+        if quantity:
+            cart["items"][name] = quantity
+        else:
+            cart["items"].pop(name, None)
+        cart["updated_at"] = time.time()
+        return cart
+
+    # ---- Carts ----
+    def create(self, location=None, items=()):
+        self.purge_expired()
+        cart = {"id": uuid.uuid4().hex[:10], "location": location, "items": {}, "updated_at": time.time()}
+        self.carts[cart["id"]] = cart
+        for name, quantity in items:
+            self.add(cart["id"], name, quantity)
+        return cart
+
+    def get(self, cart_id):
+        cart = self.carts.get(cart_id)
+        if cart is None or cart["updated_at"] + CART_TTL_SECONDS <= time.time():
+            raise CartError(404, "Cart not found or it has expired; start a new cart.")
+        return cart
+
+    def add(self, cart_id, name, quantity=1):
+        cart = self.get(cart_id)
+        name = self.resolve_item(name)
+        return self._change(cart, name, cart["items"].get(name, 0) + quantity)
+
+    def set_quantity(self, cart_id, name, quantity):
+        cart = self.get(cart_id)
+        return self._change(cart, self.resolve_item(name), quantity)
+
+    def remove(self, cart_id, name):
+        cart = self.get(cart_id)
+        name = self.resolve_item(name)
+        if name not in cart["items"]:
+            raise CartError(404, f"{name} is not in this cart.")
+        return self._change(cart, name, 0)
+
+    def set_location(self, cart_id, location):
+        cart = self.get(cart_id)
+        cart["location"] = location
+        cart["updated_at"] = time.time()
+        self.totals.pop(cart_id, None)  # branch specials differ, so re-price once
+        return cart
+
+    def close(self, cart_id):
+        self.totals.pop(cart_id, None)
+        return self.carts.pop(cart_id)
+
+    def summary(self, cart, vat_percentage, location=None):
+        """Priced cart; `location` prices it at another branch without changing the cart."""
+        if location is not None and location != cart["location"]:
+            cart = {**cart, "location": location}
+            sub_total, savings = self._price(cart)
+        else:
+            sub_total, savings = self._totals(cart)
+        items = []
+        for name, quantity in cart["items"].items():
+            cost, line_savings = self._line(cart, name, quantity)
+            items.append({
+                "item": name,
+                "quantity": quantity,
+                "unit_price": round(cost / quantity, 2),
+                "subtotal": round(cost, 2),
+                "savings": round(line_savings, 2),
+            })
+        vat_amount = vat_percentage / 100 * sub_total
+        return {
+            "cart_id": cart["id"],
+            "location": cart["location"],
+            "items": items,
+            "sub_total": round(sub_total, 2),
+            "special_savings": round(savings, 2),
+            "vat_percentage": vat_percentage,
+            "vat_amount": round(vat_amount, 2),
+            "grand_total": round(sub_total + vat_amount, 2),
+            "currency": "Naira",
+        }
+
+
+__all__ = ["CartBook", "CartError"]
@@ -0,0 +1,259 @@
+# catalog.py
+# Compact catalog, built once per menu/branches document: interned item names with integer ids,
+# prices in one contiguous array, and every GET view pre-serialized to JSON bytes with an ETag.
+# Admin changes are applied in place and re-encode only the sections they touch.
+import hashlib
+import sys
+from array import array
+
+from components.encoding import dumps as dump_json
+
+
+class CatalogError(Exception):
+    def __init__(self, status_code, detail):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def etag(body):
+    # Derived from the bytes, so every worker serving the same content sends the same tag
+    return '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+
+
+def _price_json(price):
+    # Whole prices stay ints, as in the seed menu
+    return int(price) if price.is_integer() else price
+
+
+def _index(lower_ids, exact, names, name, item_id):
+    key = name.lower()
+    first = lower_ids.setdefault(key, item_id)
+    if first != item_id and names[first] != name:
+        exact[name] = item_id
+    else:
+        lower_ids[key] = item_id  # a repeated name prices as its last entry
+
+
+class MenuCatalog:
+    """
+    Items are numbered in menu order; `members` holds each category's ids and `section_of`
+    each item's category. Names are found through a single lowercase index; the rare name
+    that differs from another only by case goes in `exact`. The nested document is not kept:
+    only the serialized /menu body, and each /menu/{category} body as a zero-copy slice of it.
+    Deleted items leave a None name behind until the next load().
+    """
+
+    __slots__ = (
+        "names", "prices", "section_of", "sections", "members", "lower_ids", "exact", "settings",
+        "count", "body", "section_bodies", "etag", "section_etags",
+    )
+
+    def __init__(self, document=None):
+        self.load(document or {})
+
+    def load(self, document):
+        names = []
+        prices = array("d")
+        section_of = array("H")
+        members = {}
+        lower_ids = {}
+        exact = {}
+        for position, (section, value) in enumerate(document.items()):
+            if isinstance(value, list):
+                ids = members[section] = array("I")
+                for item in value:
+                    item_id = len(names)
+                    name = sys.intern(item["name"])
+                    _index(lower_ids, exact, names, name, item_id)
+                    names.append(name)
+                    prices.append(item["price"])
+                    section_of.append(position)
+                    ids.append(item_id)
+
+        self.names = names
+        self.prices = prices
+        self.section_of = section_of
+        self.sections = list(document.keys())
+        self.members = members
+        self.lower_ids = lower_ids
+        self.exact = exact
+        self.settings = document.get("settings", {})
+        self.count = len(names)
+        self.section_bodies = {}
+        self.section_etags = {}
+        self._publish({section: dump_json(value) for section, value in document.items()})
+
+    def _publish(self, fresh):
+        # `fresh` holds the re-encoded sections; the others are copied from the current body
+        parts = [b"{"]
+        spans = {}
+        size = 1
+        for position, section in enumerate(self.sections):
+            key = (b"," if position else b"") + dump_json(section) + b":"
+            body = fresh[section] if section in fresh else self.section_bodies[section]
+            spans[section] = (size + len(key), size + len(key) + len(body))
+            parts += [key, body]
+            size += len(key) + len(body)
+        parts.append(b"}")
+
+        body = b"".join(parts)
+        view = memoryview(body)
+        section_bodies = {section: view[start:stop] for section, (start, stop) in spans.items()}
+        section_etags = {
+            section: etag(section_bodies[section]) if section in fresh else self.section_etags[section]
+            for section in self.sections
+        }
+        self.body = body
+        self.section_bodies = section_bodies
+        self.section_etags = section_etags
+        self.etag = etag(",".join(f"{section}={section_etags[section]}" for section in self.sections).encode("utf-8"))
+
+    def __len__(self):
+        return self.count
+
+    # ---- Lookups ----
+    def find(self, name):
+        """Item id for an exact menu name, else None."""
+        item_id = self.lower_ids.get(name.lower())
+        if item_id is not None and self.names[item_id] == name:
+            return item_id
+        return self.exact.get(name)
+
+    def resolve(self, name):
+        """Item id for a name typed by a user or the model (case and spacing forgiven), else None."""
+        return self.lower_ids.get(name.strip().lower())
+
+    def price(self, name):
+        item_id = self.find(name)
+        return None if item_id is None else self.prices[item_id]
+
+    def category_items(self, category):
+        return [(self.names[item_id], self.prices[item_id]) for item_id in self.members.get(category, ())]
+
+    # ---- Pre-serialized views ----
+    def view(self, section=None):
+        """(body, etag) of the whole menu or one section, or None for an unknown section."""
+        if section is None:
+            return self.body, self.etag
+        if section not in self.section_bodies:
+            return None
+        return self.section_bodies[section], self.section_etags[section]
+
+    # ---- Admin changes ----
+    def apply(self, upserts=(), deletes=()):
+        """
+        Bulk change. `upserts` are (name, price or None, category or None): an existing item
+        takes the new price and/or moves category, a new one needs both. `deletes` are names.
+        Everything is checked before anything changes; the indexes are updated per changed
+        item and only the touched sections are re-encoded. Returns the changed sections.
+        """
+        for name in deletes:
+            if self.find(name) is None:
+                raise CatalogError(404, f"'{name}' is not on the menu.")
+        for name, price, category in upserts:
+            if price is not None and price <= 0:
+                raise CatalogError(400, f"The price of '{name}' must be positive.")
+            if category is not None and category in self.sections and category not in self.members:
+                raise CatalogError(400, f"'{category}' is not a menu category.")
+            if self.find(name) is None and (price is None or category is None):
+                raise CatalogError(400, f"New item '{name}' needs a price and a category.")
+
+        changed = set()
+        for name, price, category in upserts:
+            item_id = self.find(name)
+            if item_id is None:
+                item_id = len(self.names)
+                name = sys.intern(name)
+                self.names.append(name)
+                self.prices.append(price)
+                self.section_of.append(self._section(category))
+                _index(self.lower_ids, self.exact, self.names, name, item_id)
+                self.members[category].append(item_id)
+                self.count += 1
+                changed.add(category)
+                continue
+            section = self.sections[self.section_of[item_id]]
+            if price is not None and price != self.prices[item_id]:
+                self.prices[item_id] = price
+                changed.add(section)
+            if category is not None and category != section:
+                self.members[section].remove(item_id)
+                self.section_of[item_id] = self._section(category)
+                self.members[category].append(item_id)
+                changed.update((section, category))
+
+        for name in deletes:
+            item_id = self.find(name)
+            if item_id is None:  # listed twice
+                continue
+            section = self.sections[self.section_of[item_id]]
+            self.members[section].remove(item_id)
+            self._unindex(name, item_id)
+            self.names[item_id] = None
+            self.count -= 1
+            changed.add(section)
+
+        if changed:
+            self._publish({section: dump_json(self._section_items(section)) for section in changed})
+        return changed
+
+    def _section(self, category):
+        if category not in self.members:
+            self.sections.append(category)
+            self.members[category] = array("I")
+        return self.sections.index(category)
+
+    def _unindex(self, name, item_id):
+        if self.exact.get(name) == item_id:
+            del self.exact[name]
+            return
+        key = name.lower()
+        del self.lower_ids[key]
+        # A name that differed only by case takes over the lowercase entry
+        for other, other_id in list(self.exact.items()):
+            if other.lower() == key:
+                del self.exact[other]
+                self.lower_ids[key] = other_id
+                break
+
+    def _section_items(self, section):
+        return [{"name": self.names[item_id], "price": _price_json(self.prices[item_id])} for item_id in self.members[section]]
+
+
+class BranchCatalog:
+    """
+    Pre-serialized /branches and /branches/{location} bodies with their ETags. The branches
+    document itself stays a plain dict: reservations and specials read their own parts of it.
+    `shape` turns one branch record into its public form (the BranchInfo model).
+    """
+
+    __slots__ = ("shape", "list_view", "views")
+
+    def __init__(self, document=None, shape=None):
+        self.load(document or {}, shape)
+
+    def load(self, document, shape=None):
+        self.shape = shape
+        self.list_view = self._encode(list(document.keys()))
+        self.views = {location: self._encode(self._public(branch)) for location, branch in document.items()}
+
+    def update(self, location, branch):
+        """Re-encode one existing branch after its record changed."""
+        self.views[location] = self._encode(self._public(branch))
+
+    def _public(self, branch):
+        return self.shape(branch) if self.shape else branch
+
+    def _encode(self, data):
+        body = dump_json(data)
+        return body, etag(body)
+
+    def view(self, location=None):
+        """(body, etag) of the branch list or one branch, or None for an unknown branch."""
+        if location is None:
+            return self.list_view
+        return self.views.get(location)
+
+
+__all__ = ["MenuCatalog", "BranchCatalog", "CatalogError", "etag"]
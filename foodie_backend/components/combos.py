@@ -0,0 +1,116 @@
+# combos.py
+# Server-side combo generator: main (or swallow + soup) + protein + drink within a budget.
+import heapq
+from bisect import bisect_right
+
+MAIN_CATEGORY = "main_menu"
+SWALLOW_CATEGORY = "swallows"
+SOUP_CATEGORY = "soups"
+PROTEIN_CATEGORY = "proteins"
+DRINK_CATEGORY = "drinks"
+CATEGORIES = (MAIN_CATEGORY, SWALLOW_CATEGORY, SOUP_CATEGORY, PROTEIN_CATEGORY, DRINK_CATEGORY)
+
+EPSILON = 1e-6
+
+
+def _discounted(price, discount):
+    return round(price * (1 - discount / 100), 2)
+
+
+class ComboIndex:
+    """
+    Precomputed, price-sorted slots for combo enumeration.
+    Each slot is a list of (price, parts) sorted by price, where parts is a tuple of
+    (name, category, unit_price, discount) entries. The base slot holds every main dish
+    plus every swallow + soup pairing, so it is a single sorted list like the others.
+    `menu` is a MenuCatalog (components/catalog.py).
+    """
+
+    def __init__(self, menu, discounts=None):
+        discounts = discounts or {}
+
+        def entries(category):
+            out = []
+            for name, regular_price in menu.category_items(category):
+                discount = discounts.get(name, 0)
+                price = _discounted(regular_price, discount)
+                out.append((price, ((name, category, regular_price, discount),)))
+            return out
+
+        swallows = entries(SWALLOW_CATEGORY)
+        soups = entries(SOUP_CATEGORY)
+        base = entries(MAIN_CATEGORY)
+        base += [
+            (round(swallow_price + soup_price, 2), swallow_parts + soup_parts)
+            for swallow_price, swallow_parts in swallows
+            for soup_price, soup_parts in soups
+        ]
+
+        self.base = sorted(base)
+        self.proteins = sorted(entries(PROTEIN_CATEGORY))
+        self.drinks = sorted(entries(DRINK_CATEGORY))
+
+        self.base_prices = [price for price, _ in self.base]
+        self.protein_prices = [price for price, _ in self.proteins]
+        self.drink_prices = [price for price, _ in self.drinks]
+
+    def cheapest(self):
+        if not (self.base and self.proteins and self.drinks):
+            return None
+        return round(self.base_prices[0] + self.protein_prices[0] + self.drink_prices[0], 2)
+
+    def top_k(self, budget, k=3):
+        """
+        Return up to k combos with the highest totals that do not exceed budget.
+        Every (base, protein) pair is seeded with its best-fitting drink (found by bisect),
+        then a max-heap walks each pair down the drink list until k combos are produced.
+        """
+        cheapest = self.cheapest()
+        if k <= 0 or cheapest is None or cheapest > budget + EPSILON:
+            return []
+
+        min_protein, min_drink = self.protein_prices[0], self.drink_prices[0]
+        heap = []
+        for bi, base_price in enumerate(self.base_prices):
+            if base_price + min_protein + min_drink > budget + EPSILON:
+                break
+            for pi, protein_price in enumerate(self.protein_prices):
+                remaining = budget - base_price - protein_price
+                if remaining + EPSILON < min_drink:
+                    break
+                di = bisect_right(self.drink_prices, remaining + EPSILON) - 1
+                heap.append((-(base_price + protein_price + self.drink_prices[di]), bi, pi, di))
+        heapq.heapify(heap)
+
+        combos = []
+        while heap and len(combos) < k:
+            neg_total, bi, pi, di = heapq.heappop(heap)
+            combos.append(self._describe(bi, pi, di))
+            if di > 0:
+                total = self.base_prices[bi] + self.protein_prices[pi] + self.drink_prices[di - 1]
+                heapq.heappush(heap, (-total, bi, pi, di - 1))
+        return combos
+
+    def _describe(self, bi, pi, di):
+        parts = self.base[bi][1] + self.proteins[pi][1] + self.drinks[di][1]
+        items = []
+        regular_total = 0
+        total = 0
+        for name, category, unit_price, discount in parts:
+            price = _discounted(unit_price, discount)
+            regular_total += unit_price
+            total += price
+            items.append({
+                "name": name,
+                "category": category,
+                "price": price,
+                "discount": discount,
+            })
+        return {
+            "items": items,
+            "total": round(total, 2),
+            "savings": round(regular_total - total, 2),
+        }
+
+
+__all__ = ["ComboIndex", "CATEGORIES"]
@@ -0,0 +1,46 @@
+# encoding.py
+# One JSON encoder for responses and documents on disk: orjson when it is installed, the
+# standard library otherwise, plus a cache of encoded bodies for documents that did not change.
+import json
+
+try:
+    import orjson
+except ImportError:  # same bytes, just slower
+    orjson = None
+
+
+def dumps(data, default=None):
+    """Compact UTF-8 JSON bytes. `default` converts anything the encoder does not know."""
+    if orjson is not None:
+        return orjson.dumps(data, default=default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, default=default, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class EncodedCache:
+    """
+    Encoded bodies of read-only views, each stored with the revision of the documents it was
+    built from (see JsonStore.revisions). A view is rebuilt and re-encoded only after one of
+    those documents changes; until then every request gets the same bytes.
+    """
+
+    def __init__(self, encode=dumps):
+        self.encode = encode
+        self.entries = {}  # view -> (revision, body)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, view, revision, build):
+        entry = self.entries.get(view)
+        if entry is not None and entry[0] == revision:
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        body = self.encode(build())
+        self.entries[view] = (revision, body)
+        return body
+
+    def clear(self):
+        self.entries.clear()
+
+
+__all__ = ["dumps", "EncodedCache", "orjson"]
@@ -0,0 +1,89 @@
+# idempotency.py
+# Bounded TTL store of request fingerprints and responses for Idempotency-Key replays.
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+MAX_ENTRIES = 2048
+TTL_SECONDS = 24 * 60 * 60
+
+
+class IdempotencyConflict(Exception):
+    def __init__(self, status_code, detail):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def fingerprint(scope, payload):
+    body = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(f"{scope}\n{body}".encode("utf-8")).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    Maps Idempotency-Key -> (fingerprint, expires_at, response).
+    Entries are evicted oldest-first once MAX_ENTRIES is reached, and lazily when they expire.
+    A key is reserved while its request runs, so a concurrent duplicate gets a 409 instead of
+    charging twice. Only successful responses are stored; failures release the key for retries.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES, ttl_seconds=TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()
+        self.in_flight = {}
+        self.lock = threading.Lock()
+
+    def _expire(self, now):
+        while self.entries:
+            key, (_, expires_at, _) = next(iter(self.entries.items()))
+            if expires_at > now:
+                break
+            del self.entries[key]
+
+    def begin(self, key, request_fingerprint):
+        """Return the stored response for a duplicate request, or None after reserving the key."""
+        now = time.time()
+        with self.lock:
+            self._expire(now)
+            if key in self.entries:
+                stored_fingerprint, _, response = self.entries[key]
+                if stored_fingerprint != request_fingerprint:
+                    raise IdempotencyConflict(422, "Idempotency-Key was already used for a different request.")
+                return response
+            if key in self.in_flight:
+                raise IdempotencyConflict(409, "A request with this Idempotency-Key is still being processed.")
+            self.in_flight[key] = request_fingerprint
+            return None
+
+    def complete(self, key, request_fingerprint, response):
+        with self.lock:
+            self.in_flight.pop(key, None)
+            self.entries[key] = (request_fingerprint, time.time() + self.ttl_seconds, response)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def release(self, key):
+        with self.lock:
+            self.in_flight.pop(key, None)
+
+    def dump(self):
+        with self.lock:
+            return [[key, *entry] for key, entry in self.entries.items()]
+
+    def load(self, rows):
+        with self.lock:
+            self.entries = OrderedDict((key, (request_fingerprint, expires_at, response))
+                                       for key, request_fingerprint, expires_at, response in rows)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.in_flight.clear()
+
+
+__all__ = ["IdempotencyStore", "IdempotencyConflict", "fingerprint"]
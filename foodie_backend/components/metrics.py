@@ -0,0 +1,164 @@
+# metrics.py
+# In-process counters and histograms rendered in the Prometheus text exposition format.
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+SNAPSHOT_INTERVAL_SECONDS = 5
+SCRAPE_ACTIVE_SECONDS = 60
+
+HELP = {
+    "foodie_http_request_duration_seconds": ("histogram", "Request latency by route template."),
+    "foodie_http_requests_total": ("counter", "Requests by route template and status code."),
+    "foodie_storage_write_duration_seconds": ("histogram", "Time to write a JSON document to shared storage."),
+    "foodie_store_lock_wait_seconds": ("histogram", "Time spent waiting for the shared store lock."),
+    "foodie_store_lock_contended_total": ("counter", "Store lock acquisitions that had to wait for another holder."),
+    "foodie_wallet_rejections_total": ("counter", "Charges refused for insufficient wallet balance."),
+    "foodie_booking_conflicts_total": ("counter", "Table holds or bookings refused because the slot was full."),
+    "foodie_idempotent_replays_total": ("counter", "Duplicate requests answered from the idempotency store."),
+    "foodie_batch_operation_duration_seconds": ("histogram", "Time per operation inside a /batch request, by op and status."),
+    "foodie_catalog_changes_total": ("counter", "Menu items and branch tables changed through the admin endpoints."),
+}
+
+
+def _key(name, labels):
+    return (name, tuple(sorted(labels.items())))
+
+
+class Registry:
+    """
+    Cheap enough to leave on: an observation is a bisect and three additions under a lock.
+    With several workers, each one writes a snapshot next to the data files every few seconds,
+    but only while someone is scraping; `/metrics` then merges all live workers' snapshots.
+    """
+
+    def __init__(self, snapshot_dir=None):
+        self.histograms = {}
+        self.counters = {}
+        self.lock = threading.Lock()
+        self.snapshot_dir = snapshot_dir
+        self.last_check = 0.0
+
+    def observe(self, name, value, **labels):
+        key = _key(name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [[0] * (len(LATENCY_BUCKETS) + 1), 0.0, 0]
+            histogram[0][bisect_left(LATENCY_BUCKETS, value)] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def inc(self, name, amount=1, **labels):
+        key = _key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    # ---- Multi-worker snapshots ----
+    def _snapshot_path(self, pid=None):
+        return os.path.join(self.snapshot_dir, f"{pid or os.getpid()}.json")
+
+    def _marker_path(self):
+        return os.path.join(self.snapshot_dir, "last_scrape")
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "histograms": [[name, list(labels), counts[:], total, count]
+                               for (name, labels), (counts, total, count) in self.histograms.items()],
+                "counters": [[name, list(labels), value] for (name, labels), value in self.counters.items()],
+            }
+
+    def maybe_write_snapshot(self):
+        # Called per request; costs one clock read unless a snapshot is due
+        if self.snapshot_dir is None:
+            return
+        now = time.time()
+        if now - self.last_check < SNAPSHOT_INTERVAL_SECONDS:
+            return
+        self.last_check = now
+        try:
+            if now - os.path.getmtime(self._marker_path()) > SCRAPE_ACTIVE_SECONDS:
+                return
+        except OSError:
+            return
+        tmp_path = self._snapshot_path() + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, self._snapshot_path())
+
+    def collect(self):
+        # Merge this worker's live data with the latest snapshots of every other live worker
+        snapshots = [self.snapshot()]
+        if self.snapshot_dir is not None:
+            os.makedirs(self.snapshot_dir, exist_ok=True)
+            with open(self._marker_path(), "w") as f:
+                f.write(str(time.time()))
+            for filename in os.listdir(self.snapshot_dir):
+                if not filename.endswith(".json") or filename == f"{os.getpid()}.json":
+                    continue
+                pid = int(filename[:-5])
+                try:
+                    os.kill(pid, 0)
+                except ProcessLookupError:
+                    os.remove(self._snapshot_path(pid))
+                    continue
+                except (PermissionError, OSError):
+                    pass
+                try:
+                    with open(self._snapshot_path(pid), "r", encoding="utf-8") as f:
+                        snapshots.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+
+        histograms, counters = {}, {}
+        for snapshot in snapshots:
+            for name, labels, counts, total, count in snapshot["histograms"]:
+                key = (name, tuple(tuple(pair) for pair in labels))
+                merged = histograms.setdefault(key, [[0] * len(counts), 0.0, 0])
+                merged[0] = [a + b for a, b in zip(merged[0], counts)]
+                merged[1] += total
+                merged[2] += count
+            for name, labels, value in snapshot["counters"]:
+                key = (name, tuple(tuple(pair) for pair in labels))
+                counters[key] = counters.get(key, 0) + value
+        return histograms, counters
+
+    def render(self):
+        histograms, counters = self.collect()
+        lines = []
+        for metric, (kind, help_text) in HELP.items():
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {kind}")
+            if kind == "histogram":
+                for (name, labels), (counts, total, count) in sorted(histograms.items()):
+                    if name != metric:
+                        continue
+                    cumulative = 0
+                    for bound, bucket_count in zip(LATENCY_BUCKETS + ("+Inf",), counts):
+                        cumulative += bucket_count
+                        lines.append(f"{name}_bucket{_labels(labels, le=bound)} {cumulative}")
+                    lines.append(f"{name}_sum{_labels(labels)} {total:.6f}")
+                    lines.append(f"{name}_count{_labels(labels)} {count}")
+            else:
+                for (name, labels), value in sorted(counters.items()):
+                    if name == metric:
+                        lines.append(f"{name}{_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels, **extra):
+    pairs = list(labels) + [(key, value) for key, value in extra.items()]
+    if not pairs:
+        return ""
+    escaped = (
+        f'{key}="' + str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for key, value in pairs
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+__all__ = ["Registry"]
@@ -0,0 +1,349 @@
+# reservations.py
+# Time-slot table inventory: per (branch, table type, date) occupancy over 30-minute slots.
+import heapq
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+SLOT_MINUTES = 30
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+DEFAULT_DURATION_MINUTES = 120
+HOLD_SECONDS = 10 * 60
+
+
+class ReservationError(Exception):
+    def __init__(self, status_code, detail):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class SlotTree:
+    """Segment tree with lazy range-add and range-max over one day's slots."""
+
+    def __init__(self, size=SLOTS_PER_DAY):
+        self.size = size
+        self.max = [0] * (4 * size)
+        self.lazy = [0] * (4 * size)
+
+    def add(self, lo, hi, value, node=1, left=0, right=None):
+        # Add value to every slot in [lo, hi)
+        if right is None:
+            right = self.size
+        if hi <= left or right <= lo:
+            return
+        if lo <= left and right <= hi:
+            self.max[node] += value
+            self.lazy[node] += value
+            return
+        mid = (left + right) // 2
+        self.add(lo, hi, value, 2 * node, left, mid)
+        self.add(lo, hi, value, 2 * node + 1, mid, right)
+        self.max[node] = self.lazy[node] + max(self.max[2 * node], self.max[2 * node + 1])
+
+    def peak(self, lo, hi, node=1, left=0, right=None):
+        # Highest occupancy of any slot in [lo, hi)
+        if right is None:
+            right = self.size
+        if hi <= left or right <= lo:
+            return 0
+        if lo <= left and right <= hi:
+            return self.max[node]
+        mid = (left + right) // 2
+        return self.lazy[node] + max(
+            self.peak(lo, hi, 2 * node, left, mid),
+            self.peak(lo, hi, 2 * node + 1, mid, right),
+        )
+
+
+def parse_slot(value):
+    try:
+        hour, minute = (int(part) for part in value.strip().split(":"))
+    except (AttributeError, ValueError):
+        raise ReservationError(400, f"Invalid time '{value}'. Use HH:MM, e.g. 19:00.")
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        raise ReservationError(400, f"Invalid time '{value}'. Use HH:MM, e.g. 19:00.")
+    return (hour * 60 + minute) // SLOT_MINUTES
+
+
+def format_slot(slot):
+    minutes = slot * SLOT_MINUTES
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def parse_date(value):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        raise ReservationError(400, f"Invalid date '{value}'. Use YYYY-MM-DD.")
+
+
+def next_slot(now=None):
+    now = now or datetime.now()
+    minutes = now.hour * 60 + now.minute
+    slot = -(-minutes // SLOT_MINUTES)  # round up to the next slot boundary
+    if slot >= SLOTS_PER_DAY:
+        return (now + timedelta(days=1)).date(), 0
+    return now.date(), slot
+
+
+def normalize_table_type(table_type, tables):
+    if table_type in tables:
+        return table_type
+    wanted = table_type.lower().replace(" ", "_").replace("table", "").strip("_")
+    for name in tables:
+        if name.lower().replace("table", "").strip("_") == wanted:
+            return name
+    raise ReservationError(404, "Table type not available at this branch.")
+
+
+def _expired(record, now):
+    return record["status"] == "held" and record["expires_at"] <= now
+
+
+class ReservationBook:
+    """
+    Reservations for every branch, backed by a list of plain records that is persisted as-is.
+    Occupancy trees are rebuilt lazily from the records per (branch, table type, date), so
+    availability queries are O(log slots). Holds expire after HOLD_SECONDS: reads skip expired
+    holds, and the next write releases them (the caller persists that). Every method runs under
+    the book's own lock, so reads need no store lock and never see a write half-done.
+    """
+
+    def __init__(self, get_branches, records):
+        self.get_branches = get_branches
+        self.lock = threading.RLock()
+        self.load(records)
+
+    def load(self, records):
+        records = {record["id"]: record for record in records}
+        expiries = [(record["expires_at"], record["id"]) for record in records.values() if record["status"] == "held"]
+        heapq.heapify(expiries)
+        with self.lock:
+            self.records = records
+            self.trees = {}
+            self.expiries = expiries
+
+    def dump(self):
+        with self.lock:
+            return list(self.records.values())
+
+    def active(self, now=None):
+        """Held and confirmed reservations, without holds that expired but are not purged yet."""
+        now = now or time.time()
+        with self.lock:
+            return [record for record in self.records.values() if not _expired(record, now)]
+
+    # ---- Inventory ----
+    def _tree(self, location, table_type, date):
+        key = (location, table_type, date)
+        if key not in self.trees:
+            tree = SlotTree()
+            for record in self.records.values():
+                if (record["location"], record["table_type"], record["date"]) == key:
+                    tree.add(record["start_slot"], record["end_slot"], 1)
+            self.trees[key] = tree
+        return self.trees[key]
+
+    def _occupy(self, record, value):
+        key = (record["location"], record["table_type"], record["date"])
+        if key in self.trees:
+            self.trees[key].add(record["start_slot"], record["end_slot"], value)
+
+    def purge_expired(self, now=None):
+        # Write path only; the caller saves reservations.json afterwards
+        now = now or time.time()
+        released = False
+        with self.lock:
+            while self.expiries and self.expiries[0][0] <= now:
+                _, reservation_id = heapq.heappop(self.expiries)
+                record = self.records.get(reservation_id)
+                if record and _expired(record, now):
+                    self._occupy(record, -1)
+                    del self.records[reservation_id]
+                    released = True
+        return released
+
+    def _busy(self, location, table_type, date, start_slot, end_slot, now):
+        # Peak occupancy over [start_slot, end_slot). The tree still counts expired holds that
+        # were not purged; only when one may exist (the earliest expiry has passed) is the
+        # window counted from the live records instead.
+        peak = self._tree(location, table_type, date).peak(start_slot, end_slot)
+        if not self.expiries or self.expiries[0][0] > now:
+            return peak
+        counts = [0] * (end_slot - start_slot)
+        for record in self.records.values():
+            if (record["location"], record["table_type"], record["date"]) != (location, table_type, date) or _expired(record, now):
+                continue
+            for slot in range(max(start_slot, record["start_slot"]), min(end_slot, record["end_slot"])):
+                counts[slot - start_slot] += 1
+        return max(counts, default=0)
+
+    def _branch_tables(self, location):
+        branches = self.get_branches()
+        if location not in branches:
+            raise ReservationError(404, f"Foodie doesn't have a branch in {location}")
+        return branches[location]["available_tables"]
+
+    def _window(self, location, date, start_slot, duration_minutes):
+        # Bookings must start within opening hours; the seating is cut short at closing time
+        end_slot = min(SLOTS_PER_DAY, start_slot + max(1, -(-duration_minutes // SLOT_MINUTES)))
+        hours_key = "weekend" if date.weekday() >= 5 else "weekday"
+        hours = self.get_branches()[location].get("opening_hours", {}).get(hours_key)
+        if hours:
+            opens, closes = (parse_slot(part) for part in hours.split("-"))
+            if start_slot < opens or start_slot >= closes:
+                raise ReservationError(
+                    400, f"The branch is open {hours} on {date.strftime('%A')}s; please pick a time that fits."
+                )
+            end_slot = min(end_slot, closes)
+        return end_slot
+
+    def _first_open_slot(self, location, duration_minutes, day=None):
+        # Earliest start inside opening hours: from now on over the next week, or on `day` only
+        now_day, now_slot = next_slot()
+        if day is None:
+            day, slot, days = now_day, now_slot, 8
+        elif day == datetime.now().date():
+            slot, days = (now_slot if now_day == day else SLOTS_PER_DAY), 1
+        else:
+            slot, days = 0, 1
+        for _ in range(days):
+            for start_slot in range(slot, SLOTS_PER_DAY):
+                try:
+                    self._window(location, day, start_slot, duration_minutes)
+                    return day, start_slot
+                except ReservationError:
+                    continue
+            day, slot = day + timedelta(days=1), 0
+        if days == 1:
+            raise ReservationError(400, f"The branch has no opening time left on {(day - timedelta(days=1)).isoformat()}; please pick another date.")
+        raise ReservationError(400, "This branch has no opening hours configured.")
+
+    def _resolve(self, location, table_type, date=None, time_of_day=None, duration_minutes=DEFAULT_DURATION_MINUTES):
+        tables = self._branch_tables(location)
+        table_type = normalize_table_type(table_type, tables) if table_type else None
+        if time_of_day is None:
+            day, start_slot = self._first_open_slot(location, duration_minutes, parse_date(date) if date else None)
+        else:
+            day = parse_date(date) if date else datetime.now().date()
+            start_slot = parse_slot(time_of_day)
+        if datetime.combine(day, datetime.min.time()) + timedelta(minutes=start_slot * SLOT_MINUTES) < datetime.now() - timedelta(minutes=SLOT_MINUTES):
+            raise ReservationError(400, "That time has already passed; please pick a future time.")
+        end_slot = self._window(location, day, start_slot, duration_minutes)
+        return tables, table_type, day.isoformat(), start_slot, end_slot
+
+    def _free(self, tables, location, table_type, date, start_slot, end_slot):
+        capacity = tables[table_type]["number"]
+        return capacity - self._busy(location, table_type, date, start_slot, end_slot, time.time())
+
+    def availability(self, location, table_type=None, date=None, time_of_day=None, duration_minutes=DEFAULT_DURATION_MINUTES):
+        with self.lock:
+            tables, table_type, date, start_slot, end_slot = self._resolve(location, table_type, date, time_of_day, duration_minutes)
+            types = [table_type] if table_type else list(tables)
+            return {
+                "location": location,
+                "date": date,
+                "time": format_slot(start_slot),
+                "until": format_slot(end_slot),
+                "tables": {
+                    name: {
+                        "available": max(0, self._free(tables, location, name, date, start_slot, end_slot)),
+                        "unit_price": tables[name]["unit_price"],
+                    }
+                    for name in types
+                },
+            }
+
+    def next_available(self, location, table_type, date, start_slot, end_slot, limit=3):
+        tables = self._branch_tables(location)
+        duration_minutes = (end_slot - start_slot) * SLOT_MINUTES
+        day = parse_date(date)
+        suggestions = []
+        with self.lock:
+            for slot in range(start_slot + 1, SLOTS_PER_DAY):
+                try:
+                    slot_end = self._window(location, day, slot, duration_minutes)
+                except ReservationError:
+                    continue
+                if self._free(tables, location, table_type, date, slot, slot_end) > 0:
+                    suggestions.append(format_slot(slot))
+                    if len(suggestions) == limit:
+                        break
+        return suggestions
+
+    # ---- Reservations ----
+    def hold(self, location, table_type, date=None, time_of_day=None, duration_minutes=DEFAULT_DURATION_MINUTES, status="held"):
+        with self.lock:
+            self.purge_expired()
+            tables, table_type, date, start_slot, end_slot = self._resolve(location, table_type, date, time_of_day, duration_minutes)
+            if table_type is None:
+                raise ReservationError(400, "Please choose a table type.")
+            if self._free(tables, location, table_type, date, start_slot, end_slot) <= 0:
+                alternatives = self.next_available(location, table_type, date, start_slot, end_slot)
+                detail = f"No {table_type} tables free at {format_slot(start_slot)} on {date}."
+                if alternatives:
+                    detail += f" Next free times: {', '.join(alternatives)}."
+                raise ReservationError(409, detail)
+
+            tree = self._tree(location, table_type, date)  # build before the new record is added
+            record = {
+                "id": uuid.uuid4().hex[:10],
+                "location": location,
+                "table_type": table_type,
+                "date": date,
+                "time": format_slot(start_slot),
+                "start_slot": start_slot,
+                "end_slot": end_slot,
+                "unit_price": tables[table_type]["unit_price"],
+                "status": status,
+                "expires_at": time.time() + HOLD_SECONDS if status == "held" else None,
+                "paid": 0,
+            }
+            self.records[record["id"]] = record
+            tree.add(start_slot, end_slot, 1)
+            if status == "held":
+                heapq.heappush(self.expiries, (record["expires_at"], record["id"]))
+            return record
+
+    def get(self, reservation_id):
+        with self.lock:
+            self.purge_expired()
+            if reservation_id not in self.records:
+                raise ReservationError(404, "Reservation not found or its hold has expired.")
+            return self.records[reservation_id]
+
+    def confirm(self, reservation_id, paid):
+        with self.lock:
+            record = self.get(reservation_id)
+            record["status"] = "confirmed"
+            record["expires_at"] = None
+            record["paid"] = paid
+            return record
+
+    def cancel(self, reservation_id):
+        with self.lock:
+            record = self.get(reservation_id)
+            starts = datetime.combine(parse_date(record["date"]), datetime.min.time()) + timedelta(minutes=record["start_slot"] * SLOT_MINUTES)
+            if datetime.now() >= starts:
+                raise ReservationError(400, "This reservation has already started, so it can no longer be cancelled.")
+            self._occupy(record, -1)
+            del self.records[reservation_id]
+            return record
+
+    def upcoming(self, location, table_type):
+        """Held or confirmed reservations of a table type from today on."""
+        today = datetime.now().date().isoformat()
+        return [
+            record for record in self.active()
+            if record["location"] == location and record["table_type"] == table_type and record["date"] >= today
+        ]
+
+    def remaining(self, record):
+        tables = self._branch_tables(record["location"])
+        with self.lock:
+            return self._free(tables, record["location"], record["table_type"], record["date"], record["start_slot"], record["end_slot"])
+
+
+__all__ = ["ReservationBook", "ReservationError", "format_slot", "HOLD_SECONDS"]
@@ -0,0 +1,58 @@
+# specials.py
+# Day-aware index over branch specials: (branch, weekday) -> {food: discount}.
+from datetime import datetime
+
+
+def today():
+    return datetime.now().strftime("%A")
+
+
+class SpecialsIndex:
+    """
+    Lazily built view of every branch's `specials` list.
+    `get_branches` returns the live branches document; call `invalidate()` whenever it changes
+    and the index is rebuilt on the next lookup.
+    """
+
+    def __init__(self, get_branches):
+        self.get_branches = get_branches
+        self._by_branch_day = None
+        self._by_day = None
+
+    def invalidate(self):
+        self._by_branch_day = None
+        self._by_day = None
+
+    def _build(self):
+        by_branch_day = {}
+        by_day = {}
+        for location, branch in self.get_branches().items():
+            for special in branch.get("specials", []):
+                day = special["day"].title()
+                discounts = by_branch_day.setdefault((location, day), {})
+                for food in special["food"]:
+                    discounts[food] = special["discount"]
+                by_day.setdefault(day, {})[location] = discounts
+        self._by_branch_day = by_branch_day
+        self._by_day = by_day
+
+    def remove_foods(self, foods):
+        # Items left the menu: drop their discounts in place instead of rebuilding
+        if self._by_branch_day is None:
+            return
+        for discounts in self._by_branch_day.values():
+            for food in foods:
+                discounts.pop(food, None)
+
+    def discounts(self, location, day=None):
+        if self._by_branch_day is None:
+            self._build()
+        return self._by_branch_day.get((location, (day or today()).title()), {})
+
+    def for_day(self, day=None):
+        if self._by_day is None:
+            self._build()
+        return self._by_day.get((day or today()).title(), {})
+
+
+__all__ = ["SpecialsIndex", "today"]
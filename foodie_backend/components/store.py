@@ -0,0 +1,114 @@
+# store.py
+# JSON documents on disk shared by every backend worker process.
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from time import perf_counter
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+
+class JsonStore:
+    """
+    The files in `data_dir` are the source of truth; each worker keeps parsed copies in memory.
+    Writes are atomic (temp file + os.replace) and every read or write records the file's
+    revision (inode, mtime, size), so `changed()` tells a worker which documents another
+    worker rewrote since it last looked, and which ones it has not loaded yet. `locked()` serialises read-modify-write sections
+    across threads and processes. The optional hooks receive write and lock-wait timings.
+    `dumps` turns a document into the bytes written (compact JSON by default).
+    """
+
+    def __init__(self, data_dir, dumps=None, on_write=None, on_lock_wait=None):
+        self.data_dir = data_dir
+        self.dumps = dumps or (lambda data: json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        self.on_write = on_write
+        self.on_lock_wait = on_lock_wait
+        self.revisions = {}
+        self.thread_lock = threading.RLock()
+        self.depth = 0
+        self.lock_file = None
+        os.makedirs(data_dir, exist_ok=True)
+
+    def path(self, filename):
+        return os.path.join(self.data_dir, filename)
+
+    def exists(self, filename):
+        return os.path.exists(self.path(filename))
+
+    def _revision(self, filename):
+        try:
+            stat = os.stat(self.path(filename))
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def read(self, filename):
+        with open(self.path(filename), "r", encoding="utf-8") as f:
+            revision = os.fstat(f.fileno())
+            data = json.load(f)
+        self.revisions[filename] = (revision.st_ino, revision.st_mtime_ns, revision.st_size)
+        return data
+
+    def write(self, filename, data):
+        # Encoded in one pass, then written in one call
+        self.write_encoded(filename, self.dumps(data))
+
+    def write_encoded(self, filename, payload):
+        """Write bytes that are already the document's JSON."""
+        started = perf_counter()
+        fd, tmp_path = tempfile.mkstemp(dir=self.data_dir, prefix=f".{filename}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, self.path(filename))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.revisions[filename] = self._revision(filename)
+        if self.on_write:
+            self.on_write(filename, perf_counter() - started)
+
+    def changed(self, filenames):
+        # A document this worker never read or wrote counts as changed, even when its file is missing
+        return [name for name in filenames if name not in self.revisions or self._revision(name) != self.revisions[name]]
+
+    def forget(self):
+        self.revisions.clear()
+
+    @contextmanager
+    def locked(self, scope="store"):
+        started = perf_counter()
+        contended = not self.thread_lock.acquire(blocking=False)
+        if contended:
+            self.thread_lock.acquire()
+        try:
+            outermost = self.depth == 0
+            if outermost and fcntl is not None:
+                self.lock_file = open(self.path(".store.lock"), "a")
+                try:
+                    fcntl.flock(self.lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    contended = True
+                    fcntl.flock(self.lock_file, fcntl.LOCK_EX)
+            if outermost and self.on_lock_wait:
+                self.on_lock_wait(scope, perf_counter() - started, contended)
+            self.depth += 1
+            try:
+                yield
+            finally:
+                self.depth -= 1
+                if self.depth == 0 and self.lock_file is not None:
+                    fcntl.flock(self.lock_file, fcntl.LOCK_UN)
+                    self.lock_file.close()
+                    self.lock_file = None
+        finally:
+            self.thread_lock.release()
+
+
+__all__ = ["JsonStore"]
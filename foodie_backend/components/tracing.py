@@ -0,0 +1,44 @@
+# tracing.py
+# Server-side spans that join the frontend's trace via the W3C traceparent header.
+import json
+import re
+import secrets
+import threading
+
+SERVICE_NAME = "foodie-backend"
+TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+
+def parse_traceparent(value):
+    """Return (trace_id, parent_span_id), or a fresh trace id when the header is missing or malformed."""
+    match = TRACEPARENT.match((value or "").strip().lower())
+    if match:
+        return match.group(1), match.group(2)
+    return secrets.token_hex(16), None
+
+
+class SpanWriter:
+    """Appends finished spans as JSON lines, in the same shape as the frontend's trace file."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def write(self, name, trace_id, parent_id, started_at, duration_ms, **attributes):
+        if not self.path:
+            return
+        item = {
+            "trace_id": trace_id,
+            "span_id": secrets.token_hex(8),
+            "parent_id": parent_id,
+            "service": SERVICE_NAME,
+            "name": name,
+            "start": started_at,
+            "duration_ms": round(duration_ms, 2),
+            "attributes": attributes,
+        }
+        with self.lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(item, default=str) + "\n")
+
+
+__all__ = ["SpanWriter", "parse_traceparent"]
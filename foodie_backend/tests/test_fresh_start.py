@@ -0,0 +1,41 @@
+# test_fresh_start.py
+# Boots the backend on an empty data directory: the first request must seed and load every document.
+import importlib
+import os
+import sys
+
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def boot(data_dir, monkeypatch):
+    monkeypatch.setenv("FOODIE_DATA_DIR", str(data_dir))
+    monkeypatch.setenv("FOODIE_METRICS", "0")
+    sys.modules.pop("backend", None)
+    return importlib.import_module("backend")
+
+
+def test_first_request_seeds_an_empty_data_directory(tmp_path, monkeypatch):
+    backend = boot(tmp_path, monkeypatch)
+    client = TestClient(backend.app)
+
+    assert client.get("/").status_code == 200
+    wallet = client.get("/user/wallet")
+    assert wallet.status_code == 200
+    assert wallet.json()["wallet_balance"] == backend.current_user["wallet_balance"]
+    assert client.get("/menu").json().keys() == backend.seed_menu_db.keys()
+    assert client.get("/branches").json() == list(backend.seed_branches_db)
+    assert client.get("/reservations").json() == []
+    for filename in backend.DOCUMENTS:
+        assert (tmp_path / filename).exists(), filename
+
+
+def test_deleted_document_is_seeded_again(tmp_path, monkeypatch):
+    backend = boot(tmp_path, monkeypatch)
+    client = TestClient(backend.app)
+    assert client.get("/reservations").status_code == 200
+
+    (tmp_path / "reservations.json").unlink()
+    assert client.get("/reservations").json() == []
+    assert (tmp_path / "reservations.json").exists()
@@ -0,0 +1,177 @@
+# admission.py
+# Process-wide admission control shared by every Streamlit session: token buckets in front of
+# Gemini and the backend, a priority wait queue (transactional turns first), backpressure
+# numbers for the UI, and coalescing of identical in-flight reads.
+import heapq
+import itertools
+import os
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import monotonic
+
+# Priorities: lower is served first
+TRANSACTIONAL = 0   # ordering, paying, booking, or confirming one of those
+INTERACTIVE = 1     # every other chat turn
+BACKGROUND = 2      # welcome messages and anything the user is not waiting on
+
+GEMINI_RATE = float(os.getenv("FOODIE_GEMINI_RPS", "1.0"))      # sustained calls per second
+GEMINI_BURST = int(os.getenv("FOODIE_GEMINI_BURST", "4"))
+BACKEND_RATE = float(os.getenv("FOODIE_BACKEND_RPS", "10"))
+BACKEND_BURST = int(os.getenv("FOODIE_BACKEND_BURST", "20"))
+MAX_WAIT_SECONDS = {TRANSACTIONAL: 30.0, INTERACTIVE: 15.0, BACKGROUND: 3.0}
+
+_priority = ContextVar("turn_priority", default=INTERACTIVE)
+
+
+class Overloaded(Exception):
+    """Raised instead of queueing when the wait would be longer than the caller allows."""
+
+    def __init__(self, name, retry_after):
+        super().__init__(f"{name} is busy; retry in {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+@contextmanager
+def turn_priority(level):
+    # Calls made inside (Gemini and backend) queue at this priority
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority():
+    return _priority.get()
+
+
+class Limiter:
+    """
+    Token bucket (rate per second, up to burst saved) with a priority-ordered wait queue.
+    A caller whose estimated wait exceeds its limit is rejected straight away with
+    Overloaded, so a spike sheds low-priority work instead of timing everyone out.
+    """
+
+    def __init__(self, name, rate, burst):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = monotonic()
+        self.blocked_until = 0.0   # set by penalize() after an upstream 429
+        self.waiting = []          # heap of (priority, sequence)
+        self.sequence = itertools.count()
+        self.cond = threading.Condition()
+        self.admitted = 0
+        self.rejected = 0
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _estimated_wait(self, priority, now):
+        ahead = sum(1 for waiting_priority, _ in self.waiting if waiting_priority <= priority)
+        shortfall = ahead + 1 - self.tokens
+        return max(0.0, self.blocked_until - now) + max(0.0, shortfall / self.rate)
+
+    def acquire(self, priority=None, max_wait=None):
+        """Take one token, waiting behind higher-priority callers. Returns seconds waited."""
+        priority = current_priority() if priority is None else priority
+        max_wait = MAX_WAIT_SECONDS.get(priority, 15.0) if max_wait is None else max_wait
+        with self.cond:
+            started = monotonic()
+            self._refill(started)
+            wait = self._estimated_wait(priority, started)
+            if wait > max_wait:
+                self.rejected += 1
+                raise Overloaded(self.name, wait)
+            entry = (priority, next(self.sequence))
+            heapq.heappush(self.waiting, entry)
+            try:
+                while True:
+                    now = monotonic()
+                    self._refill(now)
+                    if self.waiting[0] == entry and self.tokens >= 1 and now >= self.blocked_until:
+                        self.tokens -= 1
+                        self.admitted += 1
+                        return now - started
+                    if now - started >= max_wait:
+                        self.rejected += 1
+                        raise Overloaded(self.name, self._estimated_wait(priority, now))
+                    next_token = max(self.blocked_until - now, (1 - self.tokens) / self.rate, 0.01)
+                    self.cond.wait(min(next_token, max_wait - (now - started)))
+            finally:
+                self.waiting.remove(entry)
+                heapq.heapify(self.waiting)
+                self.cond.notify_all()
+
+    def penalize(self, seconds):
+        # Upstream said 429: stop admitting for a while instead of hammering it
+        with self.cond:
+            self.blocked_until = max(self.blocked_until, monotonic() + seconds)
+            self.tokens = 0.0
+            self.cond.notify_all()
+
+    def pressure(self):
+        """Backpressure numbers for the UI."""
+        with self.cond:
+            now = monotonic()
+            self._refill(now)
+            return {
+                "queued": len(self.waiting),
+                "wait_seconds": round(self._estimated_wait(INTERACTIVE, now), 1),
+                "blocked_seconds": round(max(0.0, self.blocked_until - now), 1),
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+            }
+
+
+class SingleFlight:
+    """Identical calls that overlap share one execution and its result (or exception)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.coalesced = 0
+
+    def do(self, key, func):
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = {"done": threading.Event(), "result": None, "error": None}
+            else:
+                self.coalesced += 1
+        if not leader:
+            call["done"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["result"]
+        try:
+            call["result"] = func()
+            return call["result"]
+        except Exception as e:
+            call["error"] = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call["done"].set()
+
+
+gemini_limiter = Limiter("Gemini", GEMINI_RATE, GEMINI_BURST)
+backend_limiter = Limiter("backend", BACKEND_RATE, BACKEND_BURST)
+backend_reads = SingleFlight()
+
+
+def is_busy():
+    pressure = gemini_limiter.pressure()
+    return pressure["queued"] > 0 or pressure["blocked_seconds"] > 0
+
+
+__all__ = [
+    "TRANSACTIONAL", "INTERACTIVE", "BACKGROUND", "Overloaded", "turn_priority", "current_priority",
+    "Limiter", "SingleFlight", "gemini_limiter", "backend_limiter", "backend_reads", "is_busy",
+]
@@ -0,0 +1,140 @@
+# food_match.py
+# On-CPU fast path for "What food is this?": perceptual-hash nearest neighbour over
+# reference photos of our own dishes, so confident matches skip the Gemini image call.
+import io
+import json
+import os
+import re
+import threading
+
+REFERENCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "assets", "reference_dishes")
+FAST_PATH_ENABLED = os.getenv("FOODIE_IMAGE_FAST_PATH", "1") != "0"
+MAX_DISTANCE = 10   # of 128 bits; beyond this the photo is treated as unknown
+MIN_MARGIN = 6      # the best dish must beat the runner-up dish by this many bits
+
+# Only plain identification questions take the fast path; anything else needs Gemini's reading
+GENERIC_QUESTION = re.compile(r"^\s*(what(('| i)s| food is)? (this|that|it)( food| dish| meal)?|identify( this| the)?( food| dish)?|name this( food| dish)?)\s*[?.!]*\s*$", re.I)
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def _hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+def image_hash(image):
+    """
+    128-bit fingerprint: a 64-bit difference hash of the brightness layout plus a 64-bit
+    colour layout (which of R/G/B dominates each cell of a 4x4 grid, and how strongly).
+    """
+    from PIL import Image
+
+    gray = image.convert("L").resize((9, 8), Image.Resampling.LANCZOS)
+    pixels = list(gray.getdata())
+    dhash = 0
+    for row in range(8):
+        for col in range(8):
+            dhash = (dhash << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+
+    colour = 0
+    for r, g, b in image.convert("RGB").resize((4, 4), Image.Resampling.BOX).getdata():
+        dominant = max((r, 0), (g, 1), (b, 2))[1]
+        strength = min(3, (max(r, g, b) - min(r, g, b)) // 32)
+        colour = (colour << 4) | (dominant << 2) | strength
+    return (dhash << 64) | colour
+
+
+def _hashes(image):
+    # Mirrored copies too, so a photo taken from the other side of the plate still matches
+    from PIL import ImageOps
+    return [image_hash(image), image_hash(ImageOps.mirror(image))]
+
+
+def load_index(reference_dir=REFERENCE_DIR):
+    """Hash every photo listed in reference_dir/index.json: {"photo.jpg": {"label", "items"}}."""
+    from PIL import Image
+
+    manifest_path = os.path.join(reference_dir, "index.json")
+    if not os.path.exists(manifest_path):
+        return []
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    entries = []
+    for filename, dish in manifest.items():
+        try:
+            with Image.open(os.path.join(reference_dir, filename)) as image:
+                for value in _hashes(image):
+                    entries.append((value, dish["label"], dish["items"]))
+        except OSError as e:
+            print(f"Skipping reference image {filename}:", e)
+    return entries
+
+
+def get_index():
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = load_index()
+        return _index
+
+
+def is_generic_question(user_text):
+    return not user_text or not user_text.strip() or bool(GENERIC_QUESTION.match(user_text))
+
+
+def match_dish(image_bytes):
+    """Return {"label", "items", "distance"} for a confident match, else None."""
+    from PIL import Image
+
+    index = get_index()
+    if not index:
+        return None
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        query = image_hash(image)
+
+    best = {}
+    for value, label, items in index:
+        distance = _hamming(query, value)
+        if label not in best or distance < best[label][0]:
+            best[label] = (distance, items)
+    ranked = sorted(best.items(), key=lambda item: item[1][0])
+    label, (distance, items) = ranked[0]
+    runner_up = ranked[1][1][0] if len(ranked) > 1 else 128
+    if distance > MAX_DISTANCE or runner_up - distance < MIN_MARGIN:
+        return None
+    return {"label": label, "items": items, "distance": distance}
+
+
+def price_items(items, menu):
+    # Look the matched items up in the live menu so prices are never hard-coded here
+    prices = {}
+    for category, entries in menu.items():
+        if isinstance(entries, list):
+            for entry in entries:
+                prices[entry["name"].lower()] = entry["price"]
+    priced = [(name, prices.get(name.lower())) for name in items]
+    if any(price is None for _, price in priced):
+        return None
+    return priced
+
+
+def describe_matches(matches):
+    # matches: [(dish, priced_items)], one per photo
+    if len(matches) == 1:
+        lines = [f"That looks like our {matches[0][0]['label']}! 😋 Here's what it would cost at Foodie:"]
+    else:
+        labels = [dish["label"] for dish, _ in matches]
+        lines = [f"What a table! I can see our {', '.join(labels[:-1])} and {labels[-1]} 😋 Here's what they would cost at Foodie:"]
+    total = 0
+    for dish, priced in matches:
+        if len(matches) > 1:
+            lines.append(f"{dish['label']}:")
+        lines += [f"- {name}: ₦{price:,.2f}" for name, price in priced]
+        total += sum(price for _, price in priced)
+    lines.append(f"Total: ₦{total:,.2f} (before VAT and packaging).")
+    lines.append("Want me to place an order for " + ("it" if len(matches) == 1 else "all of it") + ", or build a combo around it?")
+    return "<br>".join(lines)
+
+
+__all__ = ["FAST_PATH_ENABLED", "is_generic_question", "match_dish", "price_items", "describe_matches", "image_hash", "load_index"]
@@ -1,38 +1,134 @@
 import os
 import json
-import requests # Make sure 'requests' library is installed (pip install requests)
-from google import genai
-from google.genai.types import FunctionDeclaration
+import time
+import uuid
+from components.tracing import span, trace_headers
+from components.admission import backend_limiter, backend_reads
+from components.resilience import CircuitBreaker, StaleCache, PROBE_TIMEOUT_SECONDS
+from time import monotonic
 
 
 # === CONFIGURATION ===
 FASTAPI_BASE_URL = "https://foodie-backend-mq80.onrender.com" # Your FastAPI backend
+MAX_RETRIES = 2                 # Retries on connection errors and 5xx responses
+RETRY_BACKOFF_SECONDS = 0.5     # Doubles after every attempt
+REQUEST_TIMEOUT = (3.05, 20)    # (connect, read) seconds; a dead backend must not hang the turn
+
+# Catalog reads are served from the last good copy when fresh, and while the backend is down
+CATALOG_TOOLS = {"get_full_menu_api", "pre_order_api", "get_menu_category_api", "list_all_branches_api",
+                 "get_branch_details_api", "get_todays_specials_api"}
+SPECULATIVE_SECONDS = 30        # a prefetched live read (e.g. the user's profile) is used once within this
 
 
 # === TOOL DISPATCHER ===
 def call_fastapi_endpoint(function_name: str, **kwargs):
     """
     Dispatches function calls to the appropriate FastAPI backend endpoint.
+    Charging calls carry one Idempotency-Key for all their retries, so the backend
+    replays the first result instead of charging the wallet again.
+    """
+    with span("backend.request", tool=function_name) as current:
+        if function_name in WRITE_TOOLS:
+            backend_limiter.acquire()
+            result = _call_fastapi_endpoint(current, function_name, **kwargs)
+            speculative.clear()  # prefetched wallet/profile/cart reads predate this write
+            return result
+
+        # Identical reads already in flight (e.g. many sessions opening the menu) share one request
+        if function_name in CATALOG_TOOLS and kwargs.get("location"):
+            kwargs["location"] = kwargs["location"].lower()  # the backend lowercases it too; one cache entry
+        key = _read_key(function_name, kwargs)
+
+        def read(target=current):
+            target.set(queued_ms=round(backend_limiter.acquire() * 1000, 2))
+            return _call_fastapi_endpoint(target, function_name, **kwargs)
+
+        if function_name not in CATALOG_TOOLS:
+            prefetched = speculative.pop(key, None)
+            if prefetched is not None and monotonic() - prefetched[1] < SPECULATIVE_SECONDS:
+                current.set(cache="prefetched")
+                return prefetched[0]
+            return backend_reads.do(key, read)
+
+        def fetch():
+            # Own span, since a background revalidation outlives this request's span
+            with span("backend.fetch", tool=function_name) as target:
+                return backend_reads.do(key, lambda: read(target))
+        result, freshness = catalog.get(key, fetch, backend_down=breaker.is_open())
+        current.set(cache=freshness, circuit=breaker.state)
+        return result
+
+
+def _read_key(function_name, kwargs):
+    return (function_name, json.dumps(kwargs, sort_keys=True, default=str))
+
+
+def prefetch_reads(calls):
+    """
+    Fetch [(tool, args)] reads in one batch ahead of need. Catalog answers go into the catalog
+    cache; live ones (the user's profile) are kept for the next identical call within
+    SPECULATIVE_SECONDS. Returns the batch outcomes.
     """
+    outcomes = call_fastapi_batch(calls)
+    for (function_name, args), outcome in zip(calls, outcomes):
+        if outcome["status"] != 200:
+            continue
+        if function_name in CATALOG_TOOLS:
+            catalog.put(_read_key(function_name, args), outcome["result"])
+        else:
+            speculative[_read_key(function_name, args)] = (outcome["result"], monotonic())
+    return outcomes
+
+
+def _call_fastapi_endpoint(current, function_name, **kwargs):
+    import requests # Make sure 'requests' library is installed (pip install requests)
+
+    # traceparent joins the backend's spans to this turn's trace
+    headers = {"Idempotency-Key": uuid.uuid4().hex, **trace_headers()}
     routes = {
-        "get_current_user_info_api": lambda: requests.get(f"{FASTAPI_BASE_URL}/user"),
-        "get_user_wallet_balance_api": lambda: requests.get(f"{FASTAPI_BASE_URL}/user/wallet"),
-        "get_user_last_orders_api": lambda: requests.get(f"{FASTAPI_BASE_URL}/user/orders"),
-        "get_full_menu_api": lambda: requests.get(f"{FASTAPI_BASE_URL}/menu"),
-        "get_menu_category_api": lambda: requests.get(f"{FASTAPI_BASE_URL}/menu/{kwargs['category']}"),
-        "list_all_branches_api": lambda: requests.get(f"{FASTAPI_BASE_URL}/branches"),
-        "get_branch_details_api": lambda: requests.get(f"{FASTAPI_BASE_URL}/branches/{kwargs['location']}"),
-        "pre_booking_api": lambda: requests.get(f"{FASTAPI_BASE_URL}/pre_book/{kwargs['location']}/{kwargs['table_type']}"), 
-        "book_table_api": lambda: requests.post(f"{FASTAPI_BASE_URL}/book_table/", params={
-            "location": kwargs["location"],
-            "table_type": kwargs["table_type"]
+        "get_current_user_info_api": lambda: requests.get(f"{FASTAPI_BASE_URL}/user", headers=headers, timeout=REQUEST_TIMEOUT),
+        "get_user_wallet_balance_api": lambda: requests.get(f"{FASTAPI_BASE_URL}/user/wallet", headers=headers, timeout=REQUEST_TIMEOUT),
+        "get_user_last_orders_api": lambda: requests.get(f"{FASTAPI_BASE_URL}/user/orders", headers=headers, timeout=REQUEST_TIMEOUT),
+        "get_full_menu_api": lambda: requests.get(f"{FASTAPI_BASE_URL}/menu", headers=headers, timeout=REQUEST_TIMEOUT),
+        "get_menu_category_api": lambda: requests.get(f"{FASTAPI_BASE_URL}/menu/{kwargs['category']}", headers=headers, timeout=REQUEST_TIMEOUT),
+        "list_all_branches_api": lambda: requests.get(f"{FASTAPI_BASE_URL}/branches", headers=headers, timeout=REQUEST_TIMEOUT),
+        "get_branch_details_api": lambda: requests.get(f"{FASTAPI_BASE_URL}/branches/{kwargs['location']}", headers=headers, timeout=REQUEST_TIMEOUT),
+        "get_todays_specials_api": lambda: requests.get(f"{FASTAPI_BASE_URL}/specials/today", headers=headers, timeout=REQUEST_TIMEOUT),
+        "get_combo_suggestions_api": lambda: requests.get(f"{FASTAPI_BASE_URL}/combos", headers=headers, timeout=REQUEST_TIMEOUT, params={
+            key: kwargs[key] for key in ("budget", "location") if kwargs.get(key) is not None
         }),
-        "pre_order_api": lambda: requests.get(f"{FASTAPI_BASE_URL}/menu"),
+        "check_table_availability_api": lambda: requests.get(f"{FASTAPI_BASE_URL}/availability/{kwargs['location']}", headers=headers, timeout=REQUEST_TIMEOUT, params={
+            key: kwargs[key] for key in ("table_type", "date", "time") if kwargs.get(key)
+        }),
+        "pre_booking_api": lambda: requests.get(f"{FASTAPI_BASE_URL}/pre_book/{kwargs['location']}/{kwargs['table_type']}", headers=headers, timeout=REQUEST_TIMEOUT, params={
+            key: kwargs[key] for key in ("date", "time") if kwargs.get(key)
+        }),
+        "book_table_api": lambda: requests.post(f"{FASTAPI_BASE_URL}/book_table/", headers=headers, timeout=REQUEST_TIMEOUT, params={
+            key: kwargs[key] for key in ("location", "table_type", "date", "time", "reservation_id") if kwargs.get(key)
+        }),
+        "cancel_booking_api": lambda: requests.delete(f"{FASTAPI_BASE_URL}/reservations/{kwargs['reservation_id']}", headers=headers, timeout=REQUEST_TIMEOUT),
+        "pre_order_api": lambda: requests.get(f"{FASTAPI_BASE_URL}/menu", headers=headers, timeout=REQUEST_TIMEOUT),
         #"pre_order_api": lambda **kwargs: requests.post(f"{FASTAPI_BASE_URL}/pre_order/", json={"items": kwargs.get("items", [])}),
 
-        "place_order_api": lambda: requests.post(f"{FASTAPI_BASE_URL}/place_order/", json={
-            "items": kwargs["items"],            # Same structure as pre_order
-            "total_cost": kwargs["total_cost"]   # float value
+        "create_cart_api": lambda: requests.post(f"{FASTAPI_BASE_URL}/carts", headers=headers, timeout=REQUEST_TIMEOUT, json={
+            "location": kwargs.get("location"),
+            "items": kwargs.get("items", [])
+        }),
+        "add_to_cart_api": lambda: requests.post(f"{FASTAPI_BASE_URL}/carts/{kwargs['cart_id']}/items", headers=headers, timeout=REQUEST_TIMEOUT, json={
+            "name": kwargs["name"],
+            "quantity": kwargs.get("quantity", 1)
+        }),
+        "update_cart_item_api": lambda: requests.put(f"{FASTAPI_BASE_URL}/carts/{kwargs['cart_id']}/items/{kwargs['name']}", headers=headers, timeout=REQUEST_TIMEOUT, params={
+            "quantity": kwargs["quantity"]
+        }),
+        "remove_from_cart_api": lambda: requests.delete(f"{FASTAPI_BASE_URL}/carts/{kwargs['cart_id']}/items/{kwargs['name']}", headers=headers, timeout=REQUEST_TIMEOUT),
+        "view_cart_api": lambda: requests.get(f"{FASTAPI_BASE_URL}/carts/{kwargs['cart_id']}", headers=headers, timeout=REQUEST_TIMEOUT),
+
+        "place_order_api": lambda: requests.post(f"{FASTAPI_BASE_URL}/place_order/", headers=headers, timeout=REQUEST_TIMEOUT, json={
+            "items": kwargs.get("items", []),        # Same structure as pre_order
+            "total_cost": kwargs.get("total_cost"),  # float value
+            "location": kwargs.get("location"),      # applies today's branch specials
+            "cart_id": kwargs.get("cart_id")         # or commit a cart as priced by the backend
         }),
 
     }
@@ -40,36 +136,172 @@ def call_fastapi_endpoint(function_name: str, **kwargs):
     if function_name not in routes:
         raise ValueError(f"Unknown function: {function_name}")
 
-    response = routes[function_name]()
+    response, attempts = _send(routes[function_name])
+    current.set(status=response.status_code, attempts=attempts, path=response.request.path_url)
     response.raise_for_status() # Raises an HTTPError for bad responses (4xx or 5xx)
     return response.json()
 
 
+# === BATCHING ===
+# Tool name -> (backend batch operation, its args). Writes go one per batch, see plan_batches()
+def _pick(*names):
+    return lambda kwargs: {name: kwargs[name] for name in names if kwargs.get(name) is not None}
+
+BATCH_OPS = {
+    "get_current_user_info_api": ("get_current_user", _pick()),
+    "get_user_wallet_balance_api": ("get_wallet_balance", _pick()),
+    "get_user_last_orders_api": ("get_last_orders", _pick()),
+    "get_full_menu_api": ("get_full_menu", _pick()),
+    "pre_order_api": ("get_full_menu", _pick()),
+    "get_menu_category_api": ("get_menu_category", _pick("category")),
+    "list_all_branches_api": ("list_all_branches", _pick()),
+    "get_branch_details_api": ("get_branch_details", _pick("location")),
+    "get_todays_specials_api": ("get_todays_specials", _pick()),
+    "get_combo_suggestions_api": ("get_combo_suggestions", _pick("budget", "location")),
+    "check_table_availability_api": ("table_availability", _pick("location", "table_type", "date", "time")),
+    "pre_booking_api": ("pre_booking", _pick("location", "table_type", "date", "time")),
+    "view_cart_api": ("view_cart", _pick("cart_id")),
+    "book_table_api": ("book_table", _pick("location", "table_type", "date", "time", "reservation_id")),
+    "cancel_booking_api": ("cancel_reservation", _pick("reservation_id")),
+    "place_order_api": ("place_order", _pick("items", "total_cost", "location", "cart_id")),
+    "create_cart_api": ("create_cart", _pick("location", "items")),
+    "add_to_cart_api": ("add_to_cart", _pick("cart_id", "name", "quantity")),
+    "update_cart_item_api": ("set_cart_quantity", _pick("cart_id", "name", "quantity")),
+    "remove_from_cart_api": ("remove_from_cart", _pick("cart_id", "name")),
+}
+WRITE_TOOLS = {"book_table_api", "cancel_booking_api", "place_order_api", "create_cart_api",
+               "add_to_cart_api", "update_cart_item_api", "remove_from_cart_api"}
+
+
+def plan_batches(calls):
+    """Split [(tool, args)] into as few in-order batches as possible with at most one write each."""
+    batches, current, has_write = [], [], False
+    for call in calls:
+        is_write = call[0] in WRITE_TOOLS
+        if is_write and has_write:
+            batches.append(current)
+            current, has_write = [], False
+        current.append(call)
+        has_write = has_write or is_write
+    if current:
+        batches.append(current)
+    return batches
+
+
+def call_fastapi_batch(calls):
+    """
+    Run several tool calls from one model turn in as few round trips as possible.
+    Returns one dict per call: {"tool", "status", "result"} or {"tool", "status", "detail"}.
+    A single call, or a backend without /batch, falls back to call_fastapi_endpoint per call.
+    """
+    if len(calls) == 1 or any(name not in BATCH_OPS for name, _ in calls):
+        return [_call_one(name, args) for name, args in calls]
+    outcomes = []
+    for batch in plan_batches(calls):
+        with span("backend.batch", tools=",".join(name for name, _ in batch)) as current:
+            backend_limiter.acquire()
+            results = _call_batch(current, batch)
+        if any(outcome["tool"] in WRITE_TOOLS and outcome["status"] == 200 for outcome in results):
+            speculative.clear()
+        outcomes += results
+    return outcomes
+
+
+def _call_one(function_name, args):
+    import requests
+    try:
+        return {"tool": function_name, "status": 200, "result": call_fastapi_endpoint(function_name, **args)}
+    except requests.exceptions.HTTPError as e:
+        try:
+            detail = e.response.json().get("detail")
+        except ValueError:
+            detail = e.response.text
+        return {"tool": function_name, "status": e.response.status_code, "detail": detail}
+
+
+def _call_batch(current, batch):
+    import requests
+
+    headers = {"Idempotency-Key": uuid.uuid4().hex, **trace_headers()}
+    operations = [{"op": BATCH_OPS[name][0], "args": BATCH_OPS[name][1](args)} for name, args in batch]
+    response, attempts = _send(lambda: requests.post(
+        f"{FASTAPI_BASE_URL}/batch", headers=headers, json={"operations": operations}, timeout=REQUEST_TIMEOUT
+    ))
+    current.set(status=response.status_code, attempts=attempts, operations=len(operations))
+    if response.status_code == 404:
+        # Backend predates /batch: one request per call as before
+        return [_call_one(name, args) for name, args in batch]
+    response.raise_for_status()
+    return [{"tool": name, **outcome} for (name, _), outcome in zip(batch, response.json()["results"])]
+
+
+# === CIRCUIT BREAKER ===
+def _send(send):
+    """Run send() with retries on connection errors and 5xx; every attempt feeds the breaker."""
+    import requests
+
+    for attempt in range(MAX_RETRIES + 1):
+        breaker.check()  # fail fast while the backend is known to be down
+        try:
+            response = send()
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            breaker.record_failure(e)
+            if attempt == MAX_RETRIES or breaker.is_open():
+                raise
+        else:
+            if response.status_code < 500:
+                breaker.record_success()
+                return response, attempt + 1
+            breaker.record_failure(f"HTTP {response.status_code}")
+            if attempt == MAX_RETRIES or breaker.is_open():
+                return response, attempt + 1
+        time.sleep(RETRY_BACKOFF_SECONDS * 2 ** attempt)
+
+
+def _probe_backend():
+    import requests
+    r = requests.get(f"{FASTAPI_BASE_URL}/health", timeout=PROBE_TIMEOUT_SECONDS)
+    if r.status_code == 200:
+        print("Backend online ✅", r.json().get("cold_start"))
+    return r.status_code == 200
+
+
+breaker = CircuitBreaker(_probe_backend)
+catalog = StaleCache()
+speculative = {}  # read key -> (result, fetched_at), see prefetch_reads()
+
+
+def probe_backend():
+    # Wakes a cold backend without blocking; until it answers, the circuit stays open
+    return breaker.start_probe()
+
+
 # === GEMINI TOOL DECLARATIONS ===
+# Plain dicts so importing this module doesn't pull in google.genai; see get_function_declarations()
 restaurant_tools = [
-    FunctionDeclaration(
+    dict(
         name="get_current_user_info_api",
         description="Get current user's profile info (ID, wallet balance in naira, last orders).",
         parameters={},
     ),
-    FunctionDeclaration(
+    dict(
         name="get_user_wallet_balance_api",
         description="Get current user's wallet balance in naira.",
         parameters={},
     ),
-    FunctionDeclaration(
+    dict(
         name="get_user_last_orders_api",
         description="Get last food orders by the user.",
         parameters={},
     ),
-    FunctionDeclaration(
+    dict(
         name="get_full_menu_api",
         description= ("**Retrieves the entire, categorized menu with all available food items and their prices in Naira.** "
         "Use this tool ONLY when the user explicitly asks to see the complete menu or wants to browse food options."
         "**Do NOT use this tool for requests for specific menu categories (e.g., 'show me soups') or any intent to place or summarize an order (e.g., I want to order/buy ...)**"),
         parameters={},
     ),
-    FunctionDeclaration(
+    dict(
         name="get_menu_category_api",
         description="Briefly list with their prices in naira all menu item in the given category (e.g., 'soups', 'sides')",
         parameters={
@@ -83,12 +315,12 @@ restaurant_tools = [
             "required": ["category"],
         },
     ),
-    FunctionDeclaration(
+    dict(
         name="list_all_branches_api",
         description="List all restaurant branches.",
         parameters={},
     ),
-    FunctionDeclaration(
+    dict(
         name="get_branch_details_api",
         description="Get details of a branch (available tables, specials, hours, manager, contact, delivery availability, operating hours.",
         parameters={
@@ -103,7 +335,57 @@ restaurant_tools = [
         },
     ),
     
-    FunctionDeclaration(
+    dict(
+        name="get_todays_specials_api",
+        description="Get today's specials and their discount percentages across all Foodie branches. Use this for any question about today's specials, deals or discounts.",
+        parameters={},
+    ),
+    dict(
+        name="get_combo_suggestions_api",
+        description=("Suggest complete meal combos (main or swallow with soup, a protein and a drink) with exact prices in naira, "
+                     "including today's branch specials discounts. **Use this tool whenever the user asks for a combo, a recommendation, "
+                     "or what they can buy with their money/budget.** Defaults to the user's wallet balance when no budget is given."),
+        parameters={
+            "type": "object",
+            "properties": {
+                "budget": {
+                    "type": "number",
+                    "description": "Maximum amount in naira the combo (including VAT) may cost. Omit to use the user's wallet balance."
+                },
+                "location": {
+                    "type": "string",
+                    "description": "Optional branch location (e.g., 'Ikeja') whose specials discounts for today should be applied."
+                }
+            },
+        },
+    ),
+    dict(
+        name="check_table_availability_api",
+        description="Check how many tables of each type (or one type) are free at a Foodie branch at a given date and time, e.g. 'any VIP table in Ikeja at 19:00?'.",
+        parameters={
+            "type": "object",
+            "properties": {
+                "location": {
+                    "type": "string",
+                    "description": "The location name of the branch (e.g., 'Ikeja', 'Victoria Island')."
+                },
+                "table_type": {
+                    "type": "string",
+                    "description": "Optional table type, e.g., 'table_for_2', 'vip'. Omit to check every table type."
+                },
+                "date": {
+                    "type": "string",
+                    "description": "Optional booking date in YYYY-MM-DD format. Omit for today."
+                },
+                "time": {
+                    "type": "string",
+                    "description": "Optional booking time in 24-hour HH:MM format, e.g. '19:00'. Omit for the next available opening time."
+                }
+            },
+            "required": ["location"],
+        },
+    ),
+    dict(
         name="pre_booking_api",
         description=(
             "**BEFORE USER'S CONFIRMATION** Provides a provisional summary or invoice for a requested table booking. **It returns a summary/provisional invoice for user review and does not process booking or deduct wallet**"
@@ -118,16 +400,24 @@ restaurant_tools = [
                 "table_type": {
                     "type": "string",
                     "description": "The type of table to book, e.g., 'table_for_2', 'table_for_3', 'VIP table', etc."
+                },
+                "date": {
+                    "type": "string",
+                    "description": "Optional booking date in YYYY-MM-DD format. Omit for today."
+                },
+                "time": {
+                    "type": "string",
+                    "description": "Optional booking time in 24-hour HH:MM format, e.g. '19:00'. Omit for the next available opening time."
                 }
             },
             "required": ["location", "table_type"],
         },
     ),
-    FunctionDeclaration(
+    dict(
         name="book_table_api",
         description=(
-            """**AFTER USER'S CONFIRMATION**, Book a table at a Foodie branch, remove the amount from wallet, and subtract that table from available tables. 
-            This tool finalizes a table booking and processes payment **based solely on the provided branch location and table type**. """
+            """**AFTER USER'S CONFIRMATION**, Book a table at a Foodie branch for a date and time, remove the amount from wallet, and reserve that table for the time slot. 
+            This tool finalizes a table booking and processes payment **based on the provided branch location, table type, date and time**. """
         ),
         parameters={
             "type": "object",
@@ -139,12 +429,38 @@ restaurant_tools = [
                 "table_type": {
                     "type": "string",
                     "description": "The type of table to book, e.g., 'table_for_2', 'table_for_3', 'VIP table', etc."
+                },
+                "date": {
+                    "type": "string",
+                    "description": "Optional booking date in YYYY-MM-DD format. Omit for today."
+                },
+                "time": {
+                    "type": "string",
+                    "description": "Optional booking time in 24-hour HH:MM format, e.g. '19:00'. Omit for the next available opening time."
+                },
+                "reservation_id": {
+                    "type": "string",
+                    "description": "Optional reservation_id of a table hold to confirm and pay for."
                 }
             },
             "required": ["location", "table_type"],
         },
     ),
-    FunctionDeclaration(
+    dict(
+        name="cancel_booking_api",
+        description="**AFTER USER'S CONFIRMATION**, cancel a table booking by its reservation_id and refund the amount paid to the wallet.",
+        parameters={
+            "type": "object",
+            "properties": {
+                "reservation_id": {
+                    "type": "string",
+                    "description": "The reservation_id returned when the table was booked."
+                }
+            },
+            "required": ["reservation_id"],
+        },
+    ),
+    dict(
         name="pre_order_api",
         description=("""Give a provisional and updatable **invoice for all the requested food items and updated invoices with quantities and prices**. This does NOT place the order or deduct money."
                      **Crucially, use this tool for any user intent related to building a food order (e.g. 'I want to buy/order/place order for/get', etc) , adding or removing items, 
@@ -173,9 +489,85 @@ restaurant_tools = [
     #        "required": ["items"],
     #    },
     #),
-    FunctionDeclaration(
+    dict(
+        name="create_cart_api",
+        description=("Start the user's food order as a server-side cart, optionally with the first items. The backend prices it "
+                     "(specials, VAT, grand total) and returns a cart_id; use the cart tools for every later change to the order."),
+        parameters={
+            "type": "object",
+            "properties": {
+                "location": {
+                    "type": "string",
+                    "description": "Optional branch location (e.g., 'Ikeja'); today's specials at that branch are applied."
+                },
+                "items": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "name": {"type": "string"},
+                            "quantity": {"type": "integer", "minimum": 1}
+                        },
+                        "required": ["name", "quantity"]
+                    },
+                    "description": "Optional first items, e.g., [{\"name\": \"Jollof Rice\", \"quantity\": 2}]"
+                }
+            },
+        },
+    ),
+    dict(
+        name="add_to_cart_api",
+        description="Add a menu item to the user's cart (adds to the quantity if it is already there) and return the updated invoice.",
+        parameters={
+            "type": "object",
+            "properties": {
+                "cart_id": {"type": "string", "description": "The cart_id returned by create_cart_api."},
+                "name": {"type": "string", "description": "Menu item name, e.g. 'Jollof Rice'."},
+                "quantity": {"type": "integer", "minimum": 1, "description": "How many to add. Defaults to 1."}
+            },
+            "required": ["cart_id", "name"],
+        },
+    ),
+    dict(
+        name="update_cart_item_api",
+        description="Set the quantity of an item in the user's cart (0 removes it) and return the updated invoice.",
+        parameters={
+            "type": "object",
+            "properties": {
+                "cart_id": {"type": "string", "description": "The cart_id returned by create_cart_api."},
+                "name": {"type": "string", "description": "Menu item name."},
+                "quantity": {"type": "integer", "minimum": 0, "description": "The new quantity."}
+            },
+            "required": ["cart_id", "name", "quantity"],
+        },
+    ),
+    dict(
+        name="remove_from_cart_api",
+        description="Remove an item from the user's cart and return the updated invoice.",
+        parameters={
+            "type": "object",
+            "properties": {
+                "cart_id": {"type": "string", "description": "The cart_id returned by create_cart_api."},
+                "name": {"type": "string", "description": "Menu item name."}
+            },
+            "required": ["cart_id", "name"],
+        },
+    ),
+    dict(
+        name="view_cart_api",
+        description="Show the current invoice of the user's cart: items, quantities, specials savings, VAT and grand total.",
+        parameters={
+            "type": "object",
+            "properties": {
+                "cart_id": {"type": "string", "description": "The cart_id returned by create_cart_api."}
+            },
+            "required": ["cart_id"],
+        },
+    ),
+    dict(
         name="place_order_api",
-        description="**AFTER USER'S CONFIRMATION**, Place a food order (deducts total from wallet), adds order to last orders, generates receipt.",
+        description=("**AFTER USER'S CONFIRMATION**, Place a food order (deducts total from wallet), adds order to last orders, generates receipt. "
+                     "Pass the cart_id to order exactly what is in the cart; items and total_cost are only needed without a cart."),
         parameters={
             "type": "object",
             "properties": {
@@ -194,12 +586,25 @@ restaurant_tools = [
                 "total_cost": { 
                     "type": "number",
                     "description": "The final total cost of the order to be deducted from the user's wallet. Must match the confirmed pre_order value."
+                },
+                "location": {
+                    "type": "string",
+                    "description": "Optional branch location the order is placed from (e.g., 'Ikeja'); today's specials discounts at that branch are applied."
+                },
+                "cart_id": {
+                    "type": "string",
+                    "description": "The cart_id of the confirmed cart. When given, the cart's items and totals are used."
                 }
             },
-            "required": ["items", "total_cost"], 
         },
     )
 ]
 
 
-__all__ = ["restaurant_tools", "call_fastapi_endpoint"]
+def get_function_declarations():
+    from google.genai.types import FunctionDeclaration
+    return [FunctionDeclaration(**declaration) for declaration in restaurant_tools]
+
+
+__all__ = ["restaurant_tools", "call_fastapi_endpoint", "call_fastapi_batch", "WRITE_TOOLS", "get_function_declarations",
+           "probe_backend", "prefetch_reads", "breaker", "catalog"]
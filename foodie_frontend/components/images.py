@@ -0,0 +1,108 @@
+# images.py
+# Shrinks uploaded food photos before they are sent to Gemini.
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+# Gemini bills images in 768x768 tiles, so detail beyond ~768 px on the long edge only adds
+# upload time and tokens without helping the model recognise the dish.
+MAX_EDGE = 768
+JPEG_QUALITY = 85
+CACHE_SIZE = 64
+MAX_WORKERS = 4
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+class PreparedImage:
+    def __init__(self, data, mime_type, original_bytes, width=None, height=None, cached=False, elapsed_ms=0.0):
+        self.data = data
+        self.mime_type = mime_type
+        self.original_bytes = original_bytes
+        self.width = width
+        self.height = height
+        self.cached = cached
+        self.elapsed_ms = elapsed_ms
+
+    def stats(self):
+        return {
+            "bytes_in": self.original_bytes,
+            "bytes_out": len(self.data),
+            "size": f"{self.width}x{self.height}" if self.width else None,
+            "cached": self.cached,
+            "ms": round(self.elapsed_ms, 2),
+        }
+
+
+def _process(data, mime_type):
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as image:
+        source_format = image.format
+        has_metadata = bool(image.getexif()) or "icc_profile" in image.info
+        if source_format == "JPEG":
+            # Let libjpeg decode at 1/2, 1/4 or 1/8 scale instead of decoding all 12 MP
+            image.draft("RGB", (MAX_EDGE, MAX_EDGE))
+        needs_resize = max(image.size) > MAX_EDGE
+        image = ImageOps.exif_transpose(image)  # phones store rotation in EXIF; bake it in
+        image.thumbnail((MAX_EDGE, MAX_EDGE), Image.Resampling.LANCZOS)
+        if image.mode != "RGB":
+            # Flatten transparency onto white rather than black
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            rgba = image.convert("RGBA")
+            background.paste(rgba, mask=rgba.getchannel("A"))
+            image = background
+        out = io.BytesIO()
+        # Re-encoding without exif/icc arguments drops GPS, camera and other metadata
+        image.save(out, format="JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+        if not (needs_resize or has_metadata) and out.tell() >= len(data) and source_format in ("JPEG", "PNG", "WEBP"):
+            # Already small and clean: recompressing would only cost quality
+            return data, mime_type, image.width, image.height
+        return out.getvalue(), "image/jpeg", image.width, image.height
+
+
+def prepare_image(data, mime_type="image/jpeg"):
+    """
+    Decode, EXIF-rotate, downsize to MAX_EDGE, strip metadata and recompress as JPEG.
+    Results are cached by content hash, so re-sending the same photo costs one sha256.
+    Anything Pillow cannot decode is passed through unchanged and left to Gemini.
+    """
+    started = perf_counter()
+    key = hashlib.sha256(data).hexdigest()
+    with _cache_lock:
+        hit = _cache.get(key)
+        if hit is not None:
+            _cache.move_to_end(key)
+    if hit is not None:
+        prepared_data, prepared_type, width, height = hit
+        return PreparedImage(prepared_data, prepared_type, len(data), width, height,
+                             cached=True, elapsed_ms=(perf_counter() - started) * 1000)
+
+    try:
+        result = _process(data, mime_type)
+    except Exception as e:
+        print("Image pre-processing failed, sending original:", e)
+        result = (data, mime_type, None, None)
+
+    with _cache_lock:
+        _cache[key] = result
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    prepared_data, prepared_type, width, height = result
+    return PreparedImage(prepared_data, prepared_type, len(data), width, height,
+                         elapsed_ms=(perf_counter() - started) * 1000)
+
+
+def prepare_images(uploads):
+    """Prepare several (bytes, mime_type) uploads at once; Pillow releases the GIL while decoding and resizing."""
+    if len(uploads) <= 1:
+        return [prepare_image(data, mime_type) for data, mime_type in uploads]
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(uploads))) as pool:
+        return list(pool.map(lambda upload: prepare_image(*upload), uploads))
+
+
+__all__ = ["prepare_image", "prepare_images", "PreparedImage", "MAX_EDGE"]
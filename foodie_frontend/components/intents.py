@@ -0,0 +1,257 @@
+# intents.py
+# On-CPU fast path for trivial text turns ("how much is in my wallet", "list your branches",
+# "show me soups"): weighted keyword rules in English, Pidgin, Yoruba, Hausa and Igbo pick the
+# tool directly, so the first Gemini call (the one that only chooses a tool) is skipped.
+import os
+import re
+import sys
+import threading
+import unicodedata
+from collections import Counter
+
+ROUTER_ENABLED = os.getenv("FOODIE_INTENT_ROUTER", "1") != "0"
+MIN_SCORE = 1.0      # evidence needed before a turn is routed
+MIN_MARGIN = 0.5     # the best intent must beat the runner-up by this much
+MAX_WORDS = 12       # longer messages usually carry more than one request
+
+# Rules are matched against lowercase text with tone marks and dots removed (see normalize),
+# so "Ẹ̀ka yín" and "eka yin" look the same. Each hit adds its weight to the intent's score.
+INTENT_RULES = {
+    "wallet": [
+        (r"\bwallet\b", 1.0), (r"\b(account )?balance\b", 1.0), (r"\bhow much (money )?(do i have|i get|i have|dey|is (in|on|left))\b", 0.8),
+        (r"\bmy (money|funds)\b", 0.6),
+        (r"\bapo owo\b", 1.0), (r"\bowo (mi|to ku)\b", 0.8), (r"\belo (lo|ni) (wa|ku)\b", 0.5),                   # Yoruba
+        (r"\bwal(l)?at\b", 1.0), (r"\bkudi(na)?\b", 0.8), (r"\bnawa (ne|ya) (rage|saura)\b", 0.5),           # Hausa
+        (r"\bakpa ego\b", 1.0), (r"\bego (m|fodu)\b", 0.8), (r"\bole ka (fodu|m nwere)\b", 0.5),              # Igbo
+    ],
+    "branches": [
+        (r"\bbranch(es)?\b", 1.0), (r"\b(locations|outlets)\b", 1.0), (r"\bwhere (are you|una dey|you dey)( located)?\b", 1.0),
+        (r"\beka\b", 1.0), (r"\bibo ni (e|yin) wa\b", 1.0),                                                 # Yoruba
+        (r"\brass(a|an)\b", 1.0), (r"\breshe\b", 1.0), (r"\bina (kuke|kuka) (ke )?nan\b", 1.0),              # Hausa
+        (r"\balaka\b", 1.0), (r"\bebee ka unu (no|di)\b", 1.0),                                               # Igbo
+    ],
+    "last_orders": [
+        (r"\b(last|previous|past|recent) orders?\b", 1.2), (r"\border history\b", 1.2), (r"\bwetin i (order|chop) last\b", 1.2),
+        (r"\bounje ti mo (ra|je) (kehin|tele)\b", 1.2),                                                    # Yoruba
+        (r"\b(odar|oda) (da na yi|ta karshe)\b", 1.2),                                                       # Hausa
+        (r"\bnri m (zutara|nyere iwu) (ikpeazu|gara aga)\b", 1.2),                                           # Igbo
+    ],
+    "specials": [
+        (r"\bspecials?\b", 1.0), (r"\b(promo|promos|deals?|discounts?)\b", 0.8), (r"\btoday\b|\boni\b|\byau\b|\btaa\b", 0.3),
+    ],
+    "menu_category": [
+        (r"\b(show|list|see|what|which)\b", 0.3), (r"\bmenu\b", 0.3), (r"\bwetin\b|\bkini\b|\bmenene\b|\bgini\b", 0.3),
+    ],
+}
+
+# Category names and how people say them; a category mention is what makes a menu_category turn
+CATEGORY_WORDS = {
+    "soups": r"\b(soups?|obe|miya|ofe)\b",
+    "drinks": r"\b(drinks?|beverages?|ohun mimu|abin sha|ihe onunu)\b",
+    "swallows": r"\b(swallows?|okele|tuwo|nri ilo)\b",
+    "proteins": r"\b(proteins?|meats?|eran|nama|anu)\b",
+    "sides": r"\b(sides?|side dish(es)?)\b",
+    "extras": r"\b(extras?)\b",
+    "main_menu": r"\b(main (menu|meals?|dish(es)?)|mains)\b",
+}
+
+# Anything that starts or changes a transaction, needs explanation, asks about one dish or one
+# branch, or carries a follow-up clause is left to the model
+NEEDS_MODEL = re.compile(
+    r"\b(order(ing)? (for|some|a)|i want|i wan|i go like|i'?d like|can i (get|have)|give me|add|remove|buy(ing)?|book|reserve|cancel|"
+    r"deposit|fund|top ?up|pay|closest|nearest|near|deliver(y)?|distance|how long|recipe|cook|how (to|do i) make|why|"
+    r"after|before|if|enough|afford|left over|"
+    r"best|spicy|sweet|healthy|recommend|suggest|good for|ingredients?|contain|sell|"
+    r"hours?|open(ing)?|clos(e|ed|es|ing)|manager|tables?|contact|phone|address|rating|about|"
+    r"mo fe|ina so|ina son|achoro m|a choro m)\b"
+)
+
+# A named branch ("the Yaba branch", "branch in Lekki") is a question about that branch
+NAMED_BRANCH = re.compile(
+    r"\b(?!(?:your|the|a|an|any|all|one|each|every|which|what|una|my|foodie|of|get|have|has|got|another|other|new|main)\b)[a-z]+ branch\b|\bbranch (in|at|for) (?!where\b)[a-z]+"
+)
+
+# Wallet and menu turns are routed only when they ask to see something
+REQUEST_WORDS = re.compile(
+    r"\b(show|list|see|check|view|display|tell me|what('?s| is| are| do)?|which|how much|"
+    r"wetin|kini|elo|fi han|menene|nawa|nuna|gini|ole|gosi)\b"
+)
+NEEDS_REQUEST = {"wallet", "menu_category"}
+
+# Turns that move money or a booking forward get served first under load (components/admission.py)
+TRANSACTIONAL = re.compile(
+    r"\b(order|buy|book|reserve|reservation|pay|cancel|deposit|checkout|confirm|add|remove|cart|"
+    r"mo fe ra|ina son saya|achoro m izu)\b"
+)
+CONFIRMATION = re.compile(r"^(yes|yeah|yep|ok(ay)?|sure|go ahead|proceed|confirm|na so|oya|bee ni|beeni|ehn?|ee)\b")
+
+TOOLS = {
+    "wallet": "get_user_wallet_balance_api",
+    "branches": "list_all_branches_api",
+    "last_orders": "get_user_last_orders_api",
+    "specials": "get_todays_specials_api",
+    "menu_category": "get_menu_category_api",
+}
+
+_compiled = {intent: [(re.compile(pattern), weight) for pattern, weight in rules] for intent, rules in INTENT_RULES.items()}
+_categories = {category: re.compile(pattern) for category, pattern in CATEGORY_WORDS.items()}
+
+
+def normalize(text):
+    # Drop Yoruba/Igbo tone marks and under-dots: "Ẹ̀lọ́" -> "elo"
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return " ".join("".join(ch for ch in decomposed if not unicodedata.combining(ch)).split())
+
+
+def classify(user_text):
+    """
+    Return (intent, tool, args, score) for a confident single-intent turn, else None.
+    The scores are sums of rule weights; a turn is routed only when one intent clears
+    MIN_SCORE and leads the others by MIN_MARGIN.
+    """
+    if not user_text:
+        return None
+    text = normalize(user_text)
+    if len(text.split()) > MAX_WORDS or NEEDS_MODEL.search(text) or NAMED_BRANCH.search(text):
+        return None
+
+    scores = {intent: sum(weight for pattern, weight in rules if pattern.search(text)) for intent, rules in _compiled.items()}
+    categories = [category for category, pattern in _categories.items() if pattern.search(text)]
+    if len(categories) == 1:
+        scores["menu_category"] += 1.0
+    else:
+        scores["menu_category"] = 0.0  # no category, or several (leave those to the model)
+
+    ranked = sorted(scores.items(), key=lambda item: -item[1])
+    (intent, score), runner_up = ranked[0], ranked[1][1]
+    if score < MIN_SCORE or score - runner_up < MIN_MARGIN:
+        return None
+    if intent in NEEDS_REQUEST and not REQUEST_WORDS.search(text):
+        return None
+    args = {"category": categories[0]} if intent == "menu_category" else {}
+    return intent, TOOLS[intent], args, round(score, 2)
+
+
+def is_transactional(user_text, memory=None):
+    """True for order/booking/payment turns, and for "yes" while an order or booking is pending."""
+    if not user_text:
+        return False
+    text = normalize(user_text)
+    if TRANSACTIONAL.search(text):
+        return True
+    pending = memory is not None and (memory.order_draft or memory.booking_draft or memory.facts.get("cart_id"))
+    return bool(pending and CONFIRMATION.match(text))
+
+
+class RouterStats:
+    """Running share of text turns answered without the tool-choosing Gemini call."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.turns = 0
+        self.served = Counter()
+
+    def record(self, intent):
+        with self.lock:
+            self.turns += 1
+            if intent:
+                self.served[intent] += 1
+
+    def fraction_served(self):
+        return sum(self.served.values()) / self.turns if self.turns else 0.0
+
+    def summary(self):
+        with self.lock:
+            return {"turns": self.turns, "served": sum(self.served.values()),
+                    "fraction": round(self.fraction_served(), 3), "by_intent": dict(self.served)}
+
+
+stats = RouterStats()
+
+
+# ==== Templated replies (no LLM at all) ====
+WALLET_REPLIES = {
+    "English": "Your Foodie wallet balance is ₦{balance:,.2f} 💳 Want me to suggest something tasty within that?",
+    "Pidgin": "Your Foodie wallet get ₦{balance:,.2f} 💳 You wan make I show you wetin fit your pocket?",
+    "Yoruba": "Owó tó wà nínú àpò owó Foodie yín jẹ́ ₦{balance:,.2f} 💳 Ṣé kí n dábàá oúnjẹ aládùn fún yín?",
+    "Hausa": "Kuɗin da ke cikin walat ɗinka na Foodie ₦{balance:,.2f} ne 💳 Kana so in ba ka shawarar abinci mai daɗi?",
+    "Igbo": "Ego dị n'akpa ego Foodie gị bụ ₦{balance:,.2f} 💳 Ị chọrọ ka m tụọ aro nri dị ụtọ?",
+}
+BRANCH_REPLIES = {
+    "English": "We have {count} Foodie branches: {branches} 📍 Tell me where you are and I'll point you to the nearest one.",
+    "Pidgin": "We get {count} Foodie branches: {branches} 📍 Tell me where you dey make I show you the one wey near you.",
+    "Yoruba": "A ní ẹ̀ka Foodie {count}: {branches} 📍 Ẹ sọ ibi tí ẹ wà fún mi, màá fi èyí tó sún mọ́ yín jù hàn yín.",
+    "Hausa": "Muna da rassan Foodie {count}: {branches} 📍 Faɗa min inda kake, zan nuna maka mafi kusa.",
+    "Igbo": "Anyị nwere alaka Foodie {count}: {branches} 📍 Gwa m ebe ị nọ, m ga-egosi gị nke kacha nso.",
+}
+
+
+def render_reply(intent, result, language="English"):
+    """Reply text for intents that need no phrasing help, else None."""
+    if intent == "wallet" and isinstance(result, dict) and "wallet_balance" in result:
+        template = WALLET_REPLIES.get(language, WALLET_REPLIES["English"])
+        return template.format(balance=result["wallet_balance"])
+    if intent == "branches" and isinstance(result, list):
+        template = BRANCH_REPLIES.get(language, BRANCH_REPLIES["English"])
+        return template.format(count=len(result), branches=", ".join(name.replace("_", " ").title() for name in result))
+    return None
+
+
+# ==== Regression phrases (python -m components.intents --check) ====
+# Each must stay with the model: routing it would answer a different question
+NOT_ROUTED = [
+    "Tell me about Ikeja branch",
+    "what are the opening hours of the yaba branch",
+    "Is the Lekki branch open?",
+    "Who is the manager at the epe branch",
+    "How many tables does your Badagry branch have",
+    "do you have a branch in lekki",
+    "Is egusi soup spicy?",
+    "what is the best soup for a cold?",
+    "Do you sell goat meat?",
+    "What is my balance after buying jollof?",
+    "my wallet is empty lol",
+    "is my balance enough for two plates of jollof",
+    "which drinks are healthy",
+]
+ROUTED = {
+    "what's my wallet balance": "wallet",
+    "check my balance": "wallet",
+    "elo lo wa ninu apo owo mi": "wallet",
+    "list your branches": "branches",
+    "where are you located": "branches",
+    "una get branch for where?": "branches",
+    "show me soups": "menu_category",
+    "what drinks do you have": "menu_category",
+    "wetin dey your soup menu": "menu_category",
+    "what are today's specials": "specials",
+    "my last orders": "last_orders",
+}
+
+
+def check():
+    failures = [(text, classify(text)) for text in NOT_ROUTED if classify(text)]
+    for text, intent in ROUTED.items():
+        routed = classify(text)
+        if not routed or routed[0] != intent:
+            failures.append((text, routed))
+    for text, routed in failures:
+        print("FAIL", routed, "|", text)
+    print(f"{len(NOT_ROUTED) + len(ROUTED) - len(failures)}/{len(NOT_ROUTED) + len(ROUTED)} regression phrases ok")
+    return not failures
+
+
+if __name__ == "__main__" and sys.argv[1:2] == ["--check"]:
+    sys.exit(0 if check() else 1)
+
+elif __name__ == "__main__":
+    # python -m components.intents < turns.txt : route one user message per line and report coverage
+    for line in sys.stdin:
+        if line.strip():
+            routed = classify(line)
+            stats.record(routed[0] if routed else None)
+            print(f"{routed[0] if routed else '-':<14} {line.strip()}")
+    print(stats.summary())
+
+
+__all__ = ["ROUTER_ENABLED", "classify", "render_reply", "stats", "RouterStats", "normalize", "is_transactional"]
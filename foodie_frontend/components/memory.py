@@ -0,0 +1,163 @@
+# memory.py
+# Rolling conversation state so prompts stay under a fixed size without losing the order being built.
+import html
+import re
+from collections import deque
+
+MEMORY_TOKEN_BUDGET = 450    # for everything memory adds to a prompt (~4 characters per token)
+RECENT_TURNS = 4             # newest messages kept verbatim (budget permitting)
+MAX_SUMMARY_LINES = 30       # one compact line per older message
+SUMMARY_LINE_CHARS = 110
+RECENT_TURN_CHARS = 400
+DRAFT_CHARS = 700
+CART_TOOLS = ("create_cart_api", "add_to_cart_api", "update_cart_item_api", "remove_from_cart_api", "view_cart_api")
+
+TAG = re.compile(r"<[^>]+>")
+INVOICE = re.compile(
+    r"((?:Provisional Order Summary|Booking Invoice|Provisional Booking|Booking Summary)[^\n]*\n.*?(?:Grand Total|Amount)[^\n]*)",
+    re.S | re.I,
+)
+
+
+def estimate_tokens(text):
+    return len(text) // 4 + 1
+
+
+def plain_text(content):
+    # Bot replies are HTML with <br> line breaks; prompts only need the words
+    text = TAG.sub("", content.replace("<br>", "\n"))
+    return html.unescape(text).strip()
+
+
+def _clip(text, limit):
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 1].rstrip() + "…"
+
+
+class ConversationMemory:
+    """
+    Kept in st.session_state and fed the chat history every turn; only messages it has not
+    seen yet are processed. Holds:
+    - facts: structured state from tool calls (location, reservation, last order, ...)
+    - order_draft / booking_draft: the latest provisional invoice shown to the user
+    - summary: one clipped line per message that has scrolled out of the recent window
+    - recent: the newest messages, verbatim
+    """
+
+    def __init__(self):
+        self.seen = 0
+        self.facts = {}
+        self.order_draft = None
+        self.booking_draft = None
+        self.summary = deque(maxlen=MAX_SUMMARY_LINES)
+        self.recent = deque()
+
+    # ---- Updates ----
+    def sync(self, chat_history):
+        if chat_history is None:
+            return
+        if len(chat_history) < self.seen:  # history was cleared
+            self.__init__()
+        for message in chat_history[self.seen:]:
+            if isinstance(message.get("content"), str) and message.get("role") in ("user", "bot"):
+                self._add(message["role"], plain_text(message["content"]))
+        self.seen = len(chat_history)
+
+    def _add(self, role, text):
+        if role == "bot":
+            invoice = INVOICE.search(text)
+            if invoice:
+                block = invoice.group(1).strip()
+                if "book" in block[:40].lower():
+                    self.booking_draft = block
+                else:
+                    self.order_draft = block
+        self.recent.append((role, text))
+        while len(self.recent) > RECENT_TURNS:
+            self.summary.append(self._summarize(*self.recent.popleft()))
+
+    def _summarize(self, role, text):
+        speaker = "User" if role == "user" else "Bot"
+        if role == "bot" and INVOICE.search(text):
+            return f"{speaker}: showed an invoice (latest draft kept below)"
+        first_sentence = re.split(r"(?<=[.!?])\s", text, maxsplit=1)[0]
+        return f"{speaker}: {_clip(first_sentence, SUMMARY_LINE_CHARS)}"
+
+    def note_tool(self, name, args, result):
+        """Record what a successful tool call changed."""
+        args = dict(args or {})
+        result = result if isinstance(result, dict) else {}
+        if args.get("location"):
+            self.facts["location"] = args["location"]
+        if name in ("pre_booking_api", "check_table_availability_api"):
+            self.facts["booking_enquiry"] = {key: args.get(key) for key in ("location", "table_type", "date", "time") if args.get(key)}
+        elif name == "book_table_api":
+            self.facts["reservation"] = {
+                key: result.get(key) for key in ("reservation_id", "location", "table_type", "date", "time") if result.get(key)
+            } or {key: args.get(key) for key in ("location", "table_type", "date", "time") if args.get(key)}
+            self.booking_draft = None
+            self.facts.pop("booking_enquiry", None)
+        elif name == "cancel_booking_api":
+            self.facts.pop("reservation", None)
+        elif name in CART_TOOLS:
+            if result.get("cart_id"):
+                self.facts["cart_id"] = result["cart_id"]
+        elif name == "place_order_api":
+            ordered = result.get("ordered_items") or args.get("items", [])
+            items = ", ".join(f"{item.get('name')} x{item.get('quantity', 1)}" for item in ordered)
+            self.facts["last_order"] = f"{items} (₦{result.get('grand_total') or args.get('total_cost') or 0:,.2f})"
+            self.facts.pop("cart_id", None)
+            self.order_draft = None
+        elif name == "get_combo_suggestions_api" and args.get("budget"):
+            self.facts["budget"] = args["budget"]
+
+    # ---- Rendering ----
+    def render(self, budget_tokens=MEMORY_TOKEN_BUDGET):
+        """
+        Compact context within budget_tokens. Facts and drafts always go in (they are what
+        the user is in the middle of); then the newest verbatim turns, then older summary
+        lines, newest first, until the budget is used up.
+        """
+        pinned = []
+        if self.facts:
+            pinned.append("Known so far: " + "; ".join(f"{key.replace('_', ' ')}: {value}" for key, value in self.facts.items()))
+        if self.order_draft:
+            pinned.append("Current order draft (keep building on it unless the user changes it):\n" + self.order_draft[:DRAFT_CHARS])
+        if self.booking_draft:
+            pinned.append("Current booking draft:\n" + self.booking_draft[:DRAFT_CHARS])
+        remaining = budget_tokens - sum(estimate_tokens(part) for part in pinned)
+
+        recent = []
+        for role, text in reversed(self.recent):
+            line = f"{'User' if role == 'user' else 'Bot'}: {_clip(text, RECENT_TURN_CHARS)}"
+            cost = estimate_tokens(line)
+            if cost > remaining:
+                line = _clip(line, max(40, remaining * 4))
+                cost = estimate_tokens(line)
+                if cost > remaining:
+                    break
+            recent.append(line)
+            remaining -= cost
+
+        earlier = []
+        for line in reversed(self.summary):
+            cost = estimate_tokens(line)
+            if cost > remaining:
+                break
+            earlier.append(line)
+            remaining -= cost
+
+        parts = []
+        if earlier:
+            parts.append("Earlier in this chat:\n" + "\n".join(reversed(earlier)))
+        parts.extend(pinned)
+        if recent:
+            parts.append("\n".join(reversed(recent)))
+        return "\n".join(parts) + "\n" if parts else ""
+
+    def recent_history(self):
+        # Name-usage check only needs the newest messages
+        return [{"role": role, "content": text} for role, text in self.recent]
+
+
+__all__ = ["ConversationMemory", "MEMORY_TOKEN_BUDGET", "estimate_tokens", "plain_text"]
@@ -0,0 +1,75 @@
+# prefetch.py
+# Keeps the Render backend awake and the catalog cache full from a background thread, so the
+# first tool-using turn of a session pays neither the cold start nor the catalog fetch.
+import os
+import threading
+
+from components.admission import turn_priority, BACKGROUND
+from components.foodie_tool import prefetch_reads, probe_backend, breaker
+from components.tracing import span
+
+PREFETCH_ENABLED = os.getenv("FOODIE_PREFETCH", "1") != "0"
+# Render's free instances sleep after 15 idle minutes; refreshing well inside that keeps it
+# awake, and the stale-while-revalidate catalog covers the time in between
+REFRESH_SECONDS = int(os.getenv("FOODIE_PREFETCH_SECONDS", "240"))
+CATALOG_READS = [("get_full_menu_api", {}), ("pre_order_api", {}), ("list_all_branches_api", {}), ("get_todays_specials_api", {})]
+
+
+class Prefetcher:
+    def __init__(self):
+        self.thread = None
+        self.wake = threading.Event()
+        self.lock = threading.Lock()
+        self.runs = 0
+        self.failures = 0
+
+    def start(self):
+        """Start the refresh loop once per process; later calls are no-ops."""
+        with self.lock:
+            if PREFETCH_ENABLED and (self.thread is None or not self.thread.is_alive()):
+                self.thread = threading.Thread(target=self._loop, daemon=True)
+                self.thread.start()
+        return self.thread
+
+    def _loop(self):
+        # Wake the backend first (a cold start takes ~50 s); if it stays down the breaker keeps probing
+        probe_backend().join()
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                self.failures += 1
+                print("Prefetch failed:", e)
+            self.wake.wait(REFRESH_SECONDS)
+            self.wake.clear()
+
+    def refresh(self):
+        # While the circuit is open the breaker's own probe is waking the backend
+        if breaker.is_open():
+            return
+        with span("prefetch.catalog") as current, turn_priority(BACKGROUND):
+            # Two round trips: the catalog, then every branch's details
+            outcomes = prefetch_reads(CATALOG_READS)
+            branches = next((outcome.get("result") for outcome in outcomes if outcome["tool"] == "list_all_branches_api"), None) or []
+            if branches:
+                outcomes += prefetch_reads([("get_branch_details_api", {"location": branch}) for branch in branches])
+            current.set(reads=len(outcomes), failed=sum(outcome["status"] != 200 for outcome in outcomes))
+        self.runs += 1
+
+    def prefetch_session(self):
+        """A session just started: fetch the user's profile while the welcome message is generated."""
+        def fetch():
+            with span("prefetch.session"), turn_priority(BACKGROUND):
+                try:
+                    prefetch_reads([("get_current_user_info_api", {})])
+                except Exception as e:
+                    print("Profile prefetch failed:", e)
+
+        if PREFETCH_ENABLED and not breaker.is_open():
+            threading.Thread(target=fetch, daemon=True).start()
+
+
+prefetcher = Prefetcher()
+
+
+__all__ = ["prefetcher", "Prefetcher", "PREFETCH_ENABLED", "REFRESH_SECONDS"]
@@ -0,0 +1,136 @@
+# profiler.py
+# Opt-in timing of each Streamlit rerun: wall time per script phase and per style helper.
+import cProfile
+import functools
+import html
+import os
+from contextvars import ContextVar
+from time import perf_counter, strftime
+
+PROFILE_ENABLED = os.getenv("FOODIE_PROFILE", "0") == "1"  # or the "Profile reruns" sidebar toggle
+CPROFILE_DIR = os.getenv("FOODIE_PROFILE_DIR")              # also dump cProfile stats per rerun here
+HISTORY_SIZE = 20
+
+_active = ContextVar("active_profile", default=None)
+
+
+class RerunProfile:
+    """
+    One script run split into phases by `phase(name)` checkpoints: a phase lasts until the next
+    checkpoint. Calls to @timed helpers are attributed to whichever phase is running.
+    """
+
+    def __init__(self, run_number):
+        self.run_number = run_number
+        self.started = perf_counter()
+        self.phases = []
+        self.total_ms = None
+        self.stats_path = None
+        self.cprofile = None
+        if CPROFILE_DIR:
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+
+    def _elapsed_ms(self, at=None):
+        return ((at or perf_counter()) - self.started) * 1000
+
+    def _close_phase(self, now):
+        if self.phases and self.phases[-1]["duration_ms"] is None:
+            phase = self.phases[-1]
+            phase["duration_ms"] = now - phase["start_ms"]
+
+    def phase(self, name):
+        now = self._elapsed_ms()
+        self._close_phase(now)
+        self.phases.append({"name": name, "start_ms": now, "duration_ms": None, "calls": {}})
+
+    def record(self, name, started, finished):
+        if not self.phases:
+            self.phase("startup")
+        calls = self.phases[-1]["calls"]
+        count, total = calls.get(name, (0, 0.0))
+        calls[name] = (count + 1, total + (finished - started) * 1000)
+
+    def finish(self):
+        if self.total_ms is not None:
+            return self
+        self.total_ms = self._elapsed_ms()
+        self._close_phase(self.total_ms)
+        _active.set(None)
+        if self.cprofile is not None:
+            self.cprofile.disable()
+            os.makedirs(CPROFILE_DIR, exist_ok=True)
+            self.stats_path = os.path.join(CPROFILE_DIR, f"rerun-{strftime('%Y%m%d-%H%M%S')}-{self.run_number}.prof")
+            self.cprofile.dump_stats(self.stats_path)
+            self.cprofile = None
+        return self
+
+
+def start_profile(enabled, run_number=0):
+    """Begin profiling this rerun, or return None when profiling is off."""
+    if not enabled:
+        _active.set(None)
+        return None
+    profile = RerunProfile(run_number)
+    _active.set(profile)
+    return profile
+
+
+def timed(func):
+    # Costs one context-variable lookup per call while profiling is off
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        profile = _active.get()
+        if profile is None:
+            return func(*args, **kwargs)
+        started = perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.record(func.__name__, started, perf_counter())
+    return wrapper
+
+
+# ==== Rendering ====
+COLOURS = ("#f4a261", "#e76f51", "#2a9d8f", "#e9c46a", "#8ab17d", "#b56576", "#6d597a", "#457b9d")
+
+
+def _bar(label, left, width, colour, title):
+    return (
+        f'<div title="{html.escape(title)}" style="position:absolute;left:{left:.2f}%;width:{max(width, 0.3):.2f}%;'
+        f'height:100%;background:{colour};border-right:1px solid #fff;overflow:hidden;white-space:nowrap;'
+        f'font-size:10px;line-height:18px;color:#222;padding-left:2px;">{html.escape(label)}</div>'
+    )
+
+
+def flame_html(profile):
+    """Icicle-style breakdown: phases on the top row, the style helpers they called underneath."""
+    total = profile.total_ms or 1.0
+    phase_row, helper_row = [], []
+    for index, phase in enumerate(profile.phases):
+        left = phase["start_ms"] / total * 100
+        width = phase["duration_ms"] / total * 100
+        colour = COLOURS[index % len(COLOURS)]
+        phase_row.append(_bar(phase["name"], left, width, colour, f"{phase['name']}: {phase['duration_ms']:.1f} ms"))
+        offset = left
+        for name, (count, spent) in sorted(phase["calls"].items(), key=lambda item: -item[1][1]):
+            helper_width = spent / total * 100
+            helper_row.append(_bar(name, offset, helper_width, colour + "99", f"{name} x{count}: {spent:.1f} ms"))
+            offset += helper_width
+    row = '<div style="position:relative;height:18px;margin-bottom:2px;">{}</div>'
+    return (
+        f'<div style="font-size:12px;margin-bottom:4px;">Rerun #{profile.run_number}: {profile.total_ms:.1f} ms</div>'
+        + row.format("".join(phase_row)) + row.format("".join(helper_row))
+    )
+
+
+def breakdown_rows(profile):
+    rows = []
+    for phase in profile.phases:
+        rows.append({"phase": phase["name"], "helper": "", "calls": None, "ms": round(phase["duration_ms"], 2)})
+        for name, (count, spent) in sorted(phase["calls"].items(), key=lambda item: -item[1][1]):
+            rows.append({"phase": "", "helper": name, "calls": count, "ms": round(spent, 2)})
+    return rows
+
+
+__all__ = ["PROFILE_ENABLED", "RerunProfile", "start_profile", "timed", "flame_html", "breakdown_rows", "HISTORY_SIZE"]
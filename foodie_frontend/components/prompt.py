@@ -1,25 +1,67 @@
 # prompt.py
 import os
-from dotenv import load_dotenv
-from google import genai
-from google.genai import types
-from google.genai.types import Part
+import threading
+import time
 from components.foodie_tool import *
+from components.tracing import span, export_metrics
+from components.memory import estimate_tokens
+from components.food_match import FAST_PATH_ENABLED, is_generic_question, match_dish, price_items, describe_matches
+from components.intents import ROUTER_ENABLED, classify, render_reply, stats as intent_stats
+from components.routing import router, Route, is_rate_limited
+from components.admission import gemini_limiter, Overloaded
+from components.resilience import BackendUnavailable
+from components.prefetch import prefetcher
 import json
 import random
-import requests
+from datetime import datetime
 
 # === Configure Client and Tools ===
-load_dotenv(os.path.join(os.path.dirname(__file__), "..", "env.txt"))
-api_key = os.getenv("GEMINI_API_KEY")
-client = genai.Client(api_key=api_key)
-tools = types.Tool(function_declarations=restaurant_tools)
+# google.genai is slow to import, so the client and tools are built on first use
+# (normally by start_warm_up() while the page renders) instead of at import time.
+_client = None
+_tools = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            from dotenv import load_dotenv
+            from google import genai
+            load_dotenv(os.path.join(os.path.dirname(__file__), "..", "env.txt"))
+            _client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+    return _client
+
+
+def get_tools():
+    global _tools
+    with _client_lock:
+        if _tools is None:
+            from google.genai import types
+            _tools = types.Tool(function_declarations=get_function_declarations())
+    return _tools
+
+
+def start_warm_up():
+    # Build the Gemini client and tools, and wake the backend and fill the catalog cache
+    # (components/prefetch.py), without blocking the UI
+    def warm_up():
+        for step in (get_client, get_tools, prefetcher.start):
+            try:
+                step()
+            except Exception as e:
+                print(f"Warm-up step {step.__name__} failed:", e)
+
+    thread = threading.Thread(target=warm_up, daemon=True)
+    thread.start()
+    return thread
 
 
 
 # --- Persona Prompt (Initial System Instruction) ---
-def build_persona(name=None, language="English"):
-    persona_prompt = f"""
+# Compiled per (language, named/anonymous) by the template registry at the bottom of this file
+PERSONA_TEMPLATE = """
     You are 'Foodie' 🧑‍🍳, the jovial and customer-centric AI assistant for the **Foodie Restaurant Chain** in Lagos, Nigeria.
     Your main mission is to assist customers with all their food-related queries and enthusiastically promote the Foodie brand to encourage orders and reservations! 🥳
 
@@ -30,13 +72,14 @@ def build_persona(name=None, language="English"):
     - To check a customer's wallet or orders, **use your user tools**.
     - To find menu items or categories, **use your menu tools**.
     - To get branch details, specials, or book a table, **use your branch tools**.
+    - To suggest a meal combo or what their budget can buy, **use your combo tool**.
     - To place an order, **use your order tool**.
 
     Your responses should be:
     - Friendly, jovial, and efficient. 😊
     - Concise: Keep responses under 5 sentences.
     - Precise: Especially for information like pricing, allergens, and availability.
-    - Personal: Address the user as **{name if name else 'Foodie-Lover'}**, occasionally (but not excessively) using their name in {language}.
+    - Personal: Address the user as **{address}**, occasionally (but not excessively) using their name in {language}.
     - Warm: Use random food emojis 🍔🍕🍣 for a friendly touch.
     - Action-Oriented: Guide and perform tasks to aid the user ordering, finding information, or making reservations.
     - Clarifying: If a request is unclear or ambiguous, ask precise polite clarifying questions.
@@ -49,11 +92,14 @@ def build_persona(name=None, language="English"):
 
     ---
     **First Introduction:**
-    If you understand all these instructions, please introduce yourself to **{name if name else 'our valued customer'}**.
+    If you understand all these instructions, please introduce yourself to **{intro_name}**.
     Make your introduction funny and in **2 short sentences**, using 1 or 2 emojis to make it warming and converse in {language}.
     Ask how you can assist them today, mentioning they can ask food questions or even upload food images for identification in {language}.
     """
-    return persona_prompt
+
+
+def build_persona(name=None, language="English"):
+    return render_template("persona", language, "named" if name else "anonymous", name)
 
 
 persona = """You are Foodie, the friendly, concise (3-4 sentences) and sometimes funny AI assistant😊 for the Foodie Restaurant 
@@ -64,8 +110,8 @@ persona = """You are Foodie, the friendly, concise (3-4 sentences) and sometimes
              4. answering questions about foodie on based on the data and knowledge you have
              5. subtly push the foodie brand to encourage them to patronize us
              6. performing customer transactions all in naira currency based on the data you have
-             7. **generate and update provisional invoices for all provisional ordering or bookings**
-             8. If the user **asks to add or remove food items from their invoice in whatever language, update the previous invoice based on their request**.
+             7. **keep the user's food order in a cart with the cart tools (create_cart_api, add_to_cart_api, update_cart_item_api, remove_from_cart_api) and show the invoice they return; generate provisional invoices for bookings**
+             8. If the user **asks to add or remove food items from their order in whatever language, change the cart with the cart tools instead of recalculating the invoice yourself**.
              9. generate reciept for all transactions completed
              10. **If server is down in the previous chat, reset the server and never loop in the server is down context**
              11. Help users locate the nearest branch to them and calculate the estimated time to reach the branch or dispatch from the branch to the user.
@@ -77,6 +123,38 @@ persona = """You are Foodie, the friendly, concise (3-4 sentences) and sometimes
              Remember, keep the chat lively as you help them discover the world of foods and Foodie in their selected language."""
 
 
+# --- Shown when generation fails ---
+FALLBACK_MESSAGES = {
+    "English": "Oops! Looks like I couldn't quite cook up a response for that. Could you try rephrasing your question, please? 🥺",
+    "Yoruba": "Ah, oya! Ó dàbí pé mi ò lè dáhùn ìyẹn. Jọ̀wọ́, ẹ tún ìbéèrè yín ṣe? 🥺",
+    "Igbo": "Chai! O dị ka enweghị m ike ịza ajụjụ ahụ. Biko, gbanwee ụzọ ị jụrụ ya? 🥺",
+    "Hausa": "Kash! Da alama ban samu damar ba da amsa ba. Don Allah, sake faɗin tambayar taka? 🥺",
+    "Pidgin": "Ah-ahn! E be like say I no fit answer dat one. Abeg, try ask am anoda way? 🥺",
+}
+DEFAULT_FALLBACK_MESSAGE = "🤖 FoodieBot couldn’t generate a reply. Try rephrasing your input."
+
+# --- Shown when the turn was shed under load or Gemini rate-limited us ---
+RATE_LIMIT_PAUSE_SECONDS = 5  # no Gemini calls at all for this long after a 429
+BUSY_MESSAGES = {
+    "English": "The kitchen is packed right now 🍳 Please send that again in about {seconds} seconds and I'll be right with you!",
+    "Yoruba": "Ilé ìdáná kún fọ́fọ́ báyìí 🍳 Ẹ jọ̀wọ́, ẹ tún un fi ránṣẹ́ lẹ́yìn ìṣẹ́jú-àáyá {seconds}, màá dá yín lóhùn!",
+    "Igbo": "Kichin juputara ugbu a 🍳 Biko, zitegharịa ya n'ime sekọnd {seconds}, m ga-aza gị ozugbo!",
+    "Hausa": "Kicin ya cika yanzu 🍳 Don Allah, sake turawa bayan daƙiƙa {seconds}, zan amsa maka nan take!",
+    "Pidgin": "Kitchen full well well now 🍳 Abeg send am again for like {seconds} seconds, I go answer you sharp sharp!",
+}
+
+
+def fallback_message(language="English", error=None):
+    # Shed or rate-limited turns get "try again shortly" rather than "rephrase your question"
+    if isinstance(error, Overloaded):
+        seconds = max(1, round(error.retry_after))
+    elif error is not None and is_rate_limited(error):
+        seconds = RATE_LIMIT_PAUSE_SECONDS
+    else:
+        return FALLBACK_MESSAGES.get(language, DEFAULT_FALLBACK_MESSAGE)
+    return BUSY_MESSAGES.get(language, BUSY_MESSAGES["English"]).format(seconds=seconds)
+
+
 # --- Use name in prompt ---------
 def should_use_name(name: str, recent_messages) -> str:
     if not name:
@@ -98,83 +176,206 @@ def should_use_name(name: str, recent_messages) -> str:
 
 
 
+# --- Current date and time, formatted once per minute (strftime dominated prompt assembly) ---
+_clock = [None, ""]
+
+def clock_line():
+    minute = int(time.time() // 60)
+    if _clock[0] != minute:
+        now = datetime.now()
+        _clock[:] = [minute, f"\nToday is {now:%A %Y-%m-%d}, and the time is {now:%H:%M}."]
+    return _clock[1]
+
+
 # --- User Turn Prompt (Instruction for each turn) ---
-def build_prompt(user_text, name=None, image_count=0, language="English", chat_history=None):
-    prompt = ""
+def build_prompt(user_text, name=None, image_count=0, language="English", chat_history=None, memory=None):
+    with span("build_prompt", language=language, image_count=image_count) as current:
+        prompt = _build_prompt(user_text, name, image_count, language, chat_history, memory)
+        current.set(prompt_chars=len(prompt), prompt_tokens_estimate=estimate_tokens(prompt))
+        return prompt
+
+
+def _build_prompt(user_text, name=None, image_count=0, language="English", chat_history=None, memory=None):
+    parts = []
 
-    if chat_history:
-        recent_history = chat_history[-3:]  # Add last 3 turns
+    if memory is not None:
+        # Bounded summary + order/booking drafts instead of raw HTML turns
+        memory.sync(chat_history)
+        recent_history = memory.recent_history()[-3:]
+        parts.append(memory.render())
+    else:
+        recent_history = chat_history[-3:] if chat_history else []  # Add last 3 turns
         for chat in recent_history:
             role = "User" if chat["role"] == "user" else "Bot"
-            prompt += f"{role}: {chat['content']}\n"
-        use_name = should_use_name(name, recent_history)
-
-    prompt += f"User: {user_text}\n"
-    prompt += f"You are chatting with {name} in {language}, and {use_name} in this chat."
-    if image_count > 0:
-        prompt += f"\nUser uploaded {image_count} image, Identify the food in the image sent.\n"
+            parts.append(f"{role}: {chat['content']}\n")
+    use_name = should_use_name(name, recent_history)
+
+    parts.append(f"User: {user_text}\n")
+    parts.append(render_template("turn", language, use_name, name))
+    parts.append(clock_line())
+    if image_count == 1:
+        parts.append(f"\nUser uploaded {image_count} image, Identify the food in the image sent.\n")
+    elif image_count > 1:
+        parts.append(
+            f"\nUser uploaded {image_count} images, likely one table. Identify the food in each image (Image 1, Image 2, ...), "
+            "then match all of them against the menu together and give one combined answer with each item's price and the total.\n"
+        )
     #print(prompt)
-    prompt += persona
-    return prompt
+    parts.append(persona)
+    return "".join(parts)
 
 
 
-def generate_content(model="gemini-2.5-flash", prompt_parts=None, language="English", chat_history=None):
+def record_usage(current, response):
+    usage = getattr(response, "usage_metadata", None)
+    if usage is not None:
+        thinking_tokens = getattr(usage, "thoughts_token_count", None)
+        current.set(
+            prompt_tokens=usage.prompt_token_count,
+            output_tokens=usage.candidates_token_count,
+            thinking_tokens=thinking_tokens,
+            total_tokens=usage.total_token_count,
+        )
+        # Thinking is billed as output
+        return usage.prompt_token_count, (usage.candidates_token_count or 0) + (thinking_tokens or 0)
+    return None
+
+
+def call_model(stage, route, contents, **config):
+    """
+    One Gemini call on a route from components/routing.py. A rate-limited or failing call is
+    retried once on the next faster model; latency, tokens and cost are fed back to the router.
+    """
+    from google.genai import types
+
+    while True:
+        if route.thinking_budget is not None:
+            config["thinking_config"] = types.ThinkingConfig(thinking_budget=route.thinking_budget)
+        else:
+            config.pop("thinking_config", None)
+        with span("gemini.generate", stage=stage, **route.attributes()) as current:
+            # Waits its turn (by the turn's priority) or raises Overloaded when the queue is too long
+            current.set(queued_ms=round(gemini_limiter.acquire() * 1000, 2))
+            router.started(route)
+            started = time.perf_counter()
+            try:
+                response = get_client().models.generate_content(
+                    model=route.model,
+                    contents=contents,
+                    config=types.GenerateContentConfig(maxOutputTokens=route.output_limit(), **config),
+                )
+            except Exception as e:
+                router.finished(route, (time.perf_counter() - started) * 1000, error=e)
+                export_route_metrics()
+                if is_rate_limited(e):
+                    gemini_limiter.penalize(RATE_LIMIT_PAUSE_SECONDS)
+                fallback = router.downgrade(route, "rate_limited" if is_rate_limited(e) else "error")
+                if fallback is None:
+                    raise
+                print(f"{route.model} failed ({e}), retrying on {fallback.model}")
+                route = fallback
+                continue
+            usage = record_usage(current, response)
+            current.set(cost_usd=router.finished(route, (time.perf_counter() - started) * 1000, usage))
+            export_route_metrics()
+            return response
+
+
+def export_route_metrics():
+    # Per-route latency and cost, periodically, to the trace file/collector (FOODIE_TRACE_FILE)
+    if router.export_due():
+        export_metrics("gemini.routes", router.metrics())
+
+
+def pinned_route(model, max_output_tokens):
+    # An explicit model= skips the policy but still reports through the router
+    return Route("pinned", model, max_output_tokens)
+
+
+def format_tool_result(func_name, api_result, language="English", chat_history=None, memory=None, model=None):
+    """The follow-up Gemini call: phrase a tool's data for the user in the tool's response format."""
+    new_prompt = ""
+    if memory is not None:
+        new_prompt += memory.render()
+    else:
+        for chat in chat_history or []:
+            role = "User" if chat["role"] == "user" else "Bot"
+            new_prompt += f"{role}: {chat['content']}\n"
+    new_prompt += "\nData: " + json.dumps(api_result, indent=2)
+    new_prompt += render_template(func_name, language)
+
+    # Data echoes get a small budget on the fast model, invoices a careful one (routing.TOOL_ROUTES)
+    route = pinned_route(model, 2500) if model else router.choose("follow_up", tool=func_name)
+    final_response = call_model(
+        "follow_up", route, new_prompt,
+        system_instruction="With the knowledge of this data provided, respond to the user",
+        temperature=0.7,
+        topP=1,
+        topK=1,
+    )
+    return final_response.text.strip().replace("\n", "<br>")
+
+
+def generate_content(model=None, prompt_parts=None, language="English", chat_history=None, memory=None):
+    # model=None lets the router pick per call; pass a model name to pin every call of the turn
+    with span("generate_content", model=model, language=language) as current:
+        return _generate_content(current, model, prompt_parts, language, chat_history, memory)
+
+
+def _generate_content(turn_span, model=None, prompt_parts=None, language="English", chat_history=None, memory=None):
+    import requests
+
     try:
         # Initial generation
-        response = client.models.generate_content(
-            model=model,
-            contents=prompt_parts,
-            config=types.GenerateContentConfig(
-                tools=[tools],
-                system_instruction=persona,
-                temperature=0.7,
-                topP=1,
-                topK=1,
-                maxOutputTokens=512
-            )
+        image_count = sum(not isinstance(part, str) for part in prompt_parts) if isinstance(prompt_parts, list) else 0
+        route = pinned_route(model, 512) if model else router.choose("initial", image_count=image_count)
+        turn_span.set(route=route.name, model=route.model)
+        response = call_model(
+            "initial", route, prompt_parts,
+            tools=[get_tools()],
+            system_instruction=persona,
+            temperature=0.7,
+            topP=1,
+            topK=1,
         )
 
-        # Check if a function was called
-        if response.candidates[0].content.parts[0].function_call:
-            func_name = response.candidates[0].content.parts[0].function_call.name
-            func_args = response.candidates[0].content.parts[0].function_call.args
-            print(func_name)
+        # Check if a function was called; the model may ask for several at once
+        calls = [
+            (part.function_call.name, dict(part.function_call.args or {}))
+            for part in response.candidates[0].content.parts if part.function_call
+        ]
+        if calls:
+            func_name, func_args = calls[-1]
+            print(", ".join(name for name, _ in calls))
+            turn_span.set(tool=func_name, tool_calls=len(calls))
 
             # Handle server failure during API call
             try:
-                api_result = call_fastapi_endpoint(func_name, **func_args)
-            except requests.exceptions.RequestException as e:
+                if len(calls) == 1:
+                    with span("tool.call", tool=func_name):
+                        api_result = call_fastapi_endpoint(func_name, **func_args)
+                else:
+                    # One round trip for all of them instead of one each
+                    with span("tool.call", tool=",".join(name for name, _ in calls)):
+                        outcomes = call_fastapi_batch(calls)
+                    api_result = {outcome["tool"]: outcome.get("result", {"error": outcome.get("detail")}) for outcome in outcomes}
+                    # Answer in the format of the write, if any, since that is what the user asked for
+                    func_name = next((name for name, _ in reversed(calls) if name in WRITE_TOOLS), func_name)
+            except (requests.exceptions.RequestException, BackendUnavailable) as e:
+                # BackendUnavailable: the circuit is open, so this failed without waiting on the network
                 print(f"FastAPI Error: {e}")
                 return "🖥️ Server is temporarily down. 🔧 We'll reset this second ✨"
-
-            # Optional: get function description for logging
-            description = next(
-                (tool.description for tool in restaurant_tools if tool.name == func_name),
-                "Function role not found"
-            )
+            if memory is not None:
+                if len(calls) == 1:
+                    memory.note_tool(func_name, func_args, api_result)
+                else:
+                    for (name, args), outcome in zip(calls, outcomes):
+                        if outcome["status"] == 200:
+                            memory.note_tool(name, args, outcome["result"])
 
             # Regenerate response with API data
-            new_prompt = ""
-            for chat in chat_history:
-                role = "User" if chat["role"] == "user" else "Bot"
-                new_prompt += f"{role}: {chat['content']}\n"
-            new_prompt += "\nData: " + json.dumps(api_result, indent=2)
-            new_prompt += f"\nChatting in {language}, {tool_response_format(func_name)}"
-
             try:
-                final_response = client.models.generate_content(
-                    model=model,
-                    contents=new_prompt,
-                    config=types.GenerateContentConfig(
-                        system_instruction="With the knowledge of this data provided, respond to the user",
-                        temperature=0.7,
-                        topP=1,
-                        topK=1,
-                        maxOutputTokens=2500
-                    )
-                )
-                return final_response.text.strip().replace("\n", "<br>")
+                return format_tool_result(func_name, api_result, language, chat_history, memory, model)
             except requests.exceptions.RequestException as e:
                 print(f"Final response error: {e}")
                 return "🖥️⚙️ Server is temporarily down. We'll reset this second ✨"
@@ -184,31 +385,103 @@ def generate_content(model="gemini-2.5-flash", prompt_parts=None, language="Engl
 
     except Exception as e:
         print("Error:", str(e))
-        fallback_messages = {
-            "English": "Oops! Looks like I couldn't quite cook up a response for that. Could you try rephrasing your question, please? 🥺",
-            "Yoruba": "Ah, oya! Ó dàbí pé mi ò lè dáhùn ìyẹn. Jọ̀wọ́, ẹ tún ìbéèrè yín ṣe? 🥺",
-            "Igbo": "Chai! O dị ka enweghị m ike ịza ajụjụ ahụ. Biko, gbanwee ụzọ ị jụrụ ya? 🥺",
-            "Hausa": "Kash! Da alama ban samu damar ba da amsa ba. Don Allah, sake faɗin tambayar taka? 🥺",
-            "Pidgin": "Ah-ahn! E be like say I no fit answer dat one. Abeg, try ask am anoda way? 🥺",
-        }
-        return fallback_messages.get(language, "🤖 FoodieBot couldn’t generate a reply. Try rephrasing your input.")
+        turn_span.set(error=type(e).__name__, fallback=True)
+        return fallback_message(language, e)
 
 
 
-def tool_response_format(tool_called="Unknown function"):
-    context = "**Never repeat user's query back to them** and creatively answer in this format: "
+# ==== Local dish recognition (skips the Gemini image call for our own dishes) ====
+def identify_dishes_locally(images, user_text=None, name=None, language="English", chat_history=None, memory=None):
+    """
+    Match each photo against the reference-photo index and price all matches with one menu
+    request. Returns (reply, matches): reply is set only when every photo was recognised;
+    otherwise matches maps photo index -> {"label", "prices"} for the ones that were.
+    """
+    if not FAST_PATH_ENABLED or not is_generic_question(user_text):
+        return None, {}
+    with span("image.match", images=len(images)) as current:
+        dishes = {index: dish for index, dish in enumerate(match_dish(data) for data in images) if dish}
+        current.set(matched=len(dishes))
+    if not dishes:
+        return None, {}
+
+    try:
+        menu = call_fastapi_endpoint("get_full_menu_api")
+    except Exception as e:
+        print("Menu lookup failed, asking Gemini instead:", e)
+        return None, {}
+    priced = {index: price_items(dish["items"], menu) for index, dish in dishes.items()}
+    matches = {index: {"label": dishes[index]["label"], "prices": dict(items)} for index, items in priced.items() if items}
+    if len(matches) < len(images):
+        return None, matches
+    if language == "English":
+        return describe_matches([(dishes[index], priced[index]) for index in sorted(matches)]), matches
+
+    # Other languages still need Gemini to phrase the reply, but a short text prompt is
+    # much cheaper and faster than uploading the photos
+    labels = ", ".join(match["label"] for match in matches.values())
+    prompt_text = build_prompt(
+        user_text=f"I sent photos of {labels}. What are they and how much do they cost?",
+        name=name,
+        language=language,
+        chat_history=chat_history,
+        memory=memory,
+    )
+    prompt_text += "\nData: " + json.dumps(list(matches.values()))
+    prompt_text += f"\nChatting in {language}, name each dish, list each item's exact price in ₦ from the data and the total, then offer to order."
+    reply = generate_content(prompt_parts=prompt_text, language=language, chat_history=chat_history[-2:] if chat_history else None, memory=memory)
+    return reply, matches
+
+
+def answer_intent_locally(user_text, language="English", chat_history=None, memory=None):
+    """
+    Send trivial text turns straight to their tool (components/intents.py) instead of asking
+    Gemini which tool to call. Wallet and branch answers are templated; the others get the
+    usual follow-up formatting call only. Returns None when the turn needs the model.
+    """
+    if not ROUTER_ENABLED:
+        return None
+    with span("intent.route") as current:
+        routed = classify(user_text)
+        current.set(routed=routed is not None, intent=routed[0] if routed else None)
+    if routed is None:
+        intent_stats.record(None)
+        return None
+    intent, tool, args, score = routed
 
-    if tool_called == "get_current_user_info_api":
-        context += "Provide general user profile information. Politely suggest Foodie items and ask if they've tried them, subtly promoting the brand. You can also make suggestions based on their order history and wallet balance."
+    try:
+        with span("tool.call", tool=tool):
+            api_result = call_fastapi_endpoint(tool, **args)
+    except Exception as e:
+        print("Routed tool call failed, asking Gemini instead:", e)
+        intent_stats.record(None)
+        return None
+    intent_stats.record(intent)
+    if memory is not None:
+        memory.sync(chat_history)
+        memory.note_tool(tool, args, api_result)
+
+    reply = render_reply(intent, api_result, language)
+    if reply is not None:
+        return reply
+    try:
+        return format_tool_result(tool, api_result, language, chat_history[-2:] if chat_history else None, memory)
+    except Exception as e:
+        print("Error:", str(e))
+        return fallback_message(language, e)
 
-    elif tool_called == "get_user_wallet_balance_api":
-        context += "Return the exact wallet balance in ₦. in .2dp **On the immediate next line, offer further assistance and conclude with an engaging, encouraging phrase to prompt a food purchase, similar to 'Ready to treat yourself to something tasty? Pick anything your naira can buy! 💳😋' but rephrased.**"
 
-    elif tool_called == "get_user_last_orders_api":
-         context += "Return the last order: food, day, and date (no year). On the immediate next line, generate an engaging question about reordering or trying new items, also prompting for a review. **Rephrase this question in their language.** Do NOT copy the example directly. **Example tone/purpose:** 'Hope you left a review! Feeling like a repeat day or something new from our menu today? 😋'"
-    
-    elif tool_called == "get_full_menu_api":
-        context += """converse in the language, provide menu item categories with **few unique sample item per category starting from Main Menu based on the prompt**. **DO NOT copy these category examples directly, and don't bolden anything, and don't leave empty lines where unnecessary. Example format for categories:**
+# --- Follow-up instructions after a tool call, one entry per tool ---
+TOOL_RESPONSE_PREFIX = "**Never repeat user's query back to them** and creatively answer in this format: "
+
+TOOL_RESPONSE_FORMATS = {
+    "get_current_user_info_api": "Provide general user profile information. Politely suggest Foodie items and ask if they've tried them, subtly promoting the brand. You can also make suggestions based on their order history and wallet balance.",
+
+    "get_user_wallet_balance_api": "Return the exact wallet balance in ₦. in .2dp **On the immediate next line, offer further assistance and conclude with an engaging, encouraging phrase to prompt a food purchase, similar to 'Ready to treat yourself to something tasty? Pick anything your naira can buy! 💳😋' but rephrased.**",
+
+    "get_user_last_orders_api": "Return the last order: food, day, and date (no year). On the immediate next line, generate an engaging question about reordering or trying new items, also prompting for a review. **Rephrase this question in their language.** Do NOT copy the example directly. **Example tone/purpose:** 'Hope you left a review! Feeling like a repeat day or something new from our menu today? 😋'",
+
+    "get_full_menu_api": """converse in the language, provide menu item categories with **few unique sample item per category starting from Main Menu based on the prompt**. **DO NOT copy these category examples directly, and don't bolden anything, and don't leave empty lines where unnecessary. Example format for categories:**
                     - Main dishes: Sample Main Dishes, e.g., Jollof Rice, Coconut rice
                     - Soups: Sample Soups, e.g., Egusi, Afang
                     - Sides: Sample Sides, e.g., Puff Puff, Small chops
@@ -218,41 +491,45 @@ def tool_response_format(tool_called="Unknown function"):
                     - Drinks: Sample Drinks, e.g., Palmwine
                     (**respond based on the user's prompt and Ensure relevant categories are listed if the full menu is requested**.)
 
-                    After listing categories, **converse in the language and generate a unique, delicious food combination suggestion with a price in 1-2 sentences. DO NOT copy the example combination directly. Example tone/style for combination:** 'Why not try our Pounded Yam with Egusi soup and Titus fish, perfectly paired with a refreshing bottle of Chapman and a side of Plantain, all for just ₦3500? You'll love it!🤗'"""
+                    After listing categories, **converse in the language and suggest a delicious food combination from the listed items in 1-2 sentences, without quoting a total price, and offer to build a combo that fits their budget. DO NOT copy the example combination directly. Example tone/style for combination:** 'Why not try our Pounded Yam with Egusi soup and Titus fish, perfectly paired with a refreshing bottle of Chapman? Tell me your budget and I'll put the perfect combo together for you!🤗'""",
 
-    elif tool_called == "get_menu_category_api":
-        context += "Return items and their prices (in ₦) for the requested menu category. Ensure the response is relevant to user's request, conversational, engaging, **but not awkwardly personal** and creatively includes a fun fact, a short jovial statement about the category/food, or other delightful content. **Converse in the language, don't bolden anything and don't use empty lines where unnecessary**✨"
-    
-    elif tool_called == "list_all_branches_api":
-        context += """Start by identifying and providing Foodie branches relevant to the user's request. If the user's location is known or inferable from their prompt, provide the nearest branch. Otherwise, list all available branches. After providing the branch information, warmly engage the user by asking for their current location (if not already known) and if they'd like to place an order or make a table reservation. Ensure the entire reply maintains a seamless, friendly, and helpful conversational flow. **Chat in the selected language, don't use empty lines where unnecessary and creactively generate the concise response in a natural chat style.**"""
+    "get_todays_specials_api": "List today's specials per branch with their discount percentage, in a short, exciting and conversational way. If the user mentioned a location, start with the branch nearest to them. Then invite them to order a special. Converse in the language, don't bolden anything and don't use empty lines where unnecessary.",
+
+    "get_combo_suggestions_api": "Present the combo suggestions from the data in 1-3 short lines each: the items, the exact grand total in ₦ (VAT included) and any special discount savings. **Only use the prices in the data, never invent or recompute prices.** Then ask which combo they would like to order. Converse in the language, don't bolden anything and don't use empty lines where unnecessary.",
+
+    "get_menu_category_api": "Return items and their prices (in ₦) for the requested menu category. Ensure the response is relevant to user's request, conversational, engaging, **but not awkwardly personal** and creatively includes a fun fact, a short jovial statement about the category/food, or other delightful content. **Converse in the language, don't bolden anything and don't use empty lines where unnecessary**✨",
 
-    elif tool_called == "get_branch_details_api":
-        context += """Return creatively generated answers the user's prompt about the requested Foodie branch.
+    "list_all_branches_api": """Start by identifying and providing Foodie branches relevant to the user's request. If the user's location is known or inferable from their prompt, provide the nearest branch. Otherwise, list all available branches. After providing the branch information, warmly engage the user by asking for their current location (if not already known) and if they'd like to place an order or make a table reservation. Ensure the entire reply maintains a seamless, friendly, and helpful conversational flow. **Chat in the selected language, don't use empty lines where unnecessary and creactively generate the concise response in a natural chat style.**""",
+
+    "get_branch_details_api": """Return creatively generated answers the user's prompt about the requested Foodie branch.
             - If the user asks for **specific details** (e.g., "tables", "hours", "managers", "contact"), provide **only** those requested details, **if the response should be a list, list it instead, also return hours in am and pm**.
             - If the user asks **generally** about the branch (e.g., "Tell me about Ikeja branch"), creatively provide all relevant details (location, managers, available tables, specials, hours).
-            Ensure the response is friendly, conversational, and in the user's selected language. Do not use unnecessary empty lines or bold text in your final response."""
+            Ensure the response is friendly, conversational, and in the user's selected language. Do not use unnecessary empty lines or bold text in your final response.""",
 
-    elif tool_called == "book_table_api": 
-        context += """Assist the user with table inquiries, listing the tables, checking availability and their price.
+    "book_table_api": """Assist the user with table inquiries, listing the tables, checking availability and their price.
                  1. **Generate an invoice of the booking, ask the user if you should go ahead with the booking process**
                  2. If the user gives you the go ahead to book the table at their selected branch, then **Generate a final receipt of the booking and handle the billing
                  
                  **Example of Receipt**
                 Booking Receipt:
                 ---------------------------
+                Reservation ID:   3f9c2a71be
                 Table Type:   Table for 2
                 Branch:   Ikeja
+                Date & Time:   20/10/2026 7:00pm
                 Amount Paid:      ₦7,600.00
                 ---------------------------
 
                 New Wallet Balance: ₦28100.70
-                 """
-        
-    elif tool_called == "location":
-        context += "Based on the user's provided (or inferred) location, estimate the distance to their nearest Foodie branch and the estimated delivery time. Provide this information in a friendly, conversational tone, directly addressing their location-based query. Make sure your response is helpful and clear."
+                 """,
+
+    "check_table_availability_api": "Tell the user which tables are free at the requested branch, date and time with their prices in ₦. If nothing is free, offer the next free times from the data. If they seem ready, show a short booking invoice (table type, branch, date, time, amount) and ask if you should go ahead with the booking. Converse in the language, don't bolden anything and don't use empty lines where unnecessary.",
 
-    elif tool_called == "pre_order_api":
-        context += """You are assisting the user with making a food order in their selected language. Respond in the selected language and follow these instructions:
+    "cancel_booking_api": "Confirm the cancellation (table type, branch, date and time), state the refunded amount and the new wallet balance in ₦, and kindly invite them to book again another time. Converse in the language and don't use empty lines where unnecessary.",
+
+    "location": "Based on the user's provided (or inferred) location, estimate the distance to their nearest Foodie branch and the estimated delivery time. Provide this information in a friendly, conversational tone, directly addressing their location-based query. Make sure your response is helpful and clear.",
+
+    "pre_order_api": """You are assisting the user with making a food order in their selected language. Respond in the selected language and follow these instructions:
             1. Always respond with a neat **updated provisional invoice** showing **all requested Item** names, Quantities, Unit prices, Subtotals, VAT (if applicable), Grand total **If the invoice isn't empty**
             3. After presenting the invoice, creativitively engage the user by asking a "to do" question. For example, you can paraphase: “Would you like to go ahead with this order
             or would you like to make changes to the order?” If the user confirms, the order will be placed in the next step.
@@ -287,11 +564,10 @@ def tool_response_format(tool_called="Unknown function"):
         Grand Total:    ₦2,150.00
 
         **Use the correct name of the items from the menu and Only add Take away packaging to the invoice if the person is ordering anything outside drinks**
-        """
+        """,
 
-    elif tool_called == "place_order_api":
-        context += """Upon the user's explicit confirmation to finalize and submit their order (after they have finished selecting all items and details):
-        Then, proceed to submit the complete order for placement **Using the correct item names from the previous invoice**. Upon successful order submission and deduction from their wallet, provide a clear, friendly, and reassuring order confirmation to the user **with receipt**. 
+    "place_order_api": """Upon the user's explicit confirmation to finalize and submit their order (after they have finished selecting all items and details):
+        Then, proceed to submit the complete order for placement **by passing the cart_id of the user's cart (or the correct item names from the previous invoice if there is no cart)**. Upon successful order submission and deduction from their wallet, provide a clear, friendly, and reassuring order confirmation to the user **with receipt**. 
         **Do not dedcut money from wallet before user's explicit consent. After confirmation generate final invoice details (items ordered, total cost) and deduct the money from wallet**, and the estimated delivery time to their location. Generate the response in a natural chat style in their selected language. Avoid unnecessary empty lines and astericks. 
         
         **Example of Receipt**
@@ -309,9 +585,78 @@ def tool_response_format(tool_called="Unknown function"):
         Status: Paid
 
         **If their location is not already known, politely ask for it**. So you can tell them the nearest branch to get the food or how long it will take to dispatch from that branch
+        """,
+}
+CART_RESPONSE_FORMAT = """Show the user's cart from the data as a neat provisional invoice in their selected language. **Copy every
+        amount (unit prices, subtotals, savings, VAT, grand total) from the data; never recompute or round them differently.** Mention specials
+        savings if there are any. Then ask if they would like to go ahead with the order or make changes. Do not bold the invoice or use asterisks.
+
+        Provisional Order Summary:
+        ---------------------------
+        - Zobo x4:      ₦2,000.00
+        - Moi moi x1:   ₦2,000.00
+        Sub-total:      ₦4,000.00
+        VAT (7.5%):     ₦300.00
+        ---------------------------
+        Grand Total:    ₦4,300.00
         """
+for tool in ("create_cart_api", "add_to_cart_api", "update_cart_item_api", "remove_from_cart_api", "view_cart_api"):
+    TOOL_RESPONSE_FORMATS[tool] = CART_RESPONSE_FORMAT
+TOOL_RESPONSE_FORMATS["pre_booking_api"] = TOOL_RESPONSE_FORMATS["check_table_availability_api"]
+
+DEFAULT_TOOL_RESPONSE = "No specific context. Represent the Foodie Brand well and jovially. Apologize if relevant to the conversation."
+
+
+_TOOL_RESPONSES = {tool: TOOL_RESPONSE_PREFIX + text for tool, text in TOOL_RESPONSE_FORMATS.items()}
+
+
+def tool_response_format(tool_called="Unknown function"):
+    return _TOOL_RESPONSES.get(tool_called, DEFAULT_TOOL_RESPONSE)
+
+
+# ==== Compiled template registry ====
+# Every static piece of prompt text is assembled once per (template, language, name-usage mode)
+# at import and stored pre-split around the user's name, so a turn only does a dict lookup
+# and a join instead of re-running f-strings over kilobytes of text.
+LANGUAGES = ("English", "Yoruba", "Hausa", "Igbo", "Pidgin")
+NAME_MODES = ("don't call user's name", "naturally mention user's name", "don't too personally address them")
+_templates = {}
+
+
+def _compile(template, language, mode):
+    # Returns the text split at each place the user's name goes
+    if template == "persona":
+        if mode == "named":
+            return tuple(PERSONA_TEMPLATE.format(address="\0", intro_name="\0", language=language).split("\0"))
+        return (PERSONA_TEMPLATE.format(address="Foodie-Lover", intro_name="our valued customer", language=language),)
+    if template == "turn":
+        return ("You are chatting with ", f" in {language}, and {mode} in this chat.")
+    # Anything else is a tool name: the follow-up instruction sent with that tool's data
+    return (f"\nChatting in {language}, {tool_response_format(template)}",)
+
+
+def compiled_template(template, language, mode=None):
+    key = (template, language, mode)
+    pieces = _templates.get(key)
+    if pieces is None:  # a language or tool outside the precompiled set
+        pieces = _templates[key] = _compile(template, language, mode)
+    return pieces
+
+
+def render_template(template, language, mode=None, name=None):
+    pieces = compiled_template(template, language, mode)
+    return pieces[0] if len(pieces) == 1 else str(name).join(pieces)
+
+
+def compile_templates():
+    for language in LANGUAGES:
+        for mode in ("named", "anonymous"):
+            compiled_template("persona", language, mode)
+        for mode in NAME_MODES:
+            compiled_template("turn", language, mode)
+        for tool in TOOL_RESPONSE_FORMATS:
+            compiled_template(tool, language)
+        compiled_template("Unknown function", language)
 
-    else:
-        context = "No specific context. Represent the Foodie Brand well and jovially. Apologize if relevant to the conversation."
 
-    return str(context)
+compile_templates()
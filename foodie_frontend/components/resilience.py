@@ -0,0 +1,155 @@
+# resilience.py
+# Keeps the chat usable while the backend is cold or down: a circuit breaker that fails fast
+# and probes /health in the background, and a last-known-good cache for catalog reads.
+import threading
+from time import monotonic
+
+FAILURE_THRESHOLD = 3        # consecutive failures that open the circuit
+PROBE_INTERVAL_SECONDS = 5   # between health probes while open
+PROBE_TIMEOUT_SECONDS = 60   # a Render cold start takes ~50 s; the probe is what wakes it
+FRESH_SECONDS = 60           # catalog answers younger than this are served without a request
+MAX_CACHE_ENTRIES = 256
+
+
+class BackendUnavailable(Exception):
+    """Raised without touching the network while the circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    closed: calls go through; FAILURE_THRESHOLD consecutive failures open it.
+    open: calls fail fast with BackendUnavailable while a background thread probes /health;
+    the first successful probe closes it again.
+    """
+
+    def __init__(self, probe):
+        self.probe = probe                  # () -> bool, e.g. GET /health
+        self.lock = threading.Lock()
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = None
+        self.prober = None
+        self.last_error = None
+
+    def check(self):
+        if self.state == "open":
+            raise BackendUnavailable(f"Backend unavailable ({self.last_error}); retrying in the background")
+
+    def is_open(self):
+        return self.state == "open"
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            if self.state == "open":
+                print(f"Backend back online after {monotonic() - self.opened_at:.0f}s ✅")
+            self.state = "closed"
+
+    def record_failure(self, error):
+        with self.lock:
+            self.failures += 1
+            self.last_error = type(error).__name__ if isinstance(error, Exception) else error
+            if self.state == "closed" and self.failures >= FAILURE_THRESHOLD:
+                self._open()
+
+    def _open(self):
+        self.state = "open"
+        self.opened_at = monotonic()
+        print(f"Backend circuit open after {self.failures} failures ({self.last_error})")
+        if self.prober is None or not self.prober.is_alive():
+            self.prober = threading.Thread(target=self._probe_until_healthy, daemon=True)
+            self.prober.start()
+
+    def _probe_until_healthy(self):
+        while self.state == "open":
+            try:
+                healthy = self.probe()
+            except Exception as e:
+                healthy, self.last_error = False, type(e).__name__
+            if healthy:
+                self.record_success()
+                return
+            threading.Event().wait(PROBE_INTERVAL_SECONDS)
+
+    def start_probe(self):
+        """Probe once in the background (at warm-up); a failure opens the circuit and keeps probing."""
+        def probe_once():
+            try:
+                if self.probe():
+                    self.record_success()
+                    return
+                error = "unhealthy"
+            except Exception as e:
+                error = e
+            with self.lock:
+                self.last_error = type(error).__name__ if isinstance(error, Exception) else error
+                if self.state == "closed":
+                    self._open()
+
+        thread = threading.Thread(target=probe_once, daemon=True)
+        thread.start()
+        return thread
+
+    def status(self):
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "open_for_seconds": round(monotonic() - self.opened_at) if self.state == "open" else 0,
+            "last_error": self.last_error,
+        }
+
+
+class StaleCache:
+    """
+    Last-known-good answers for catalog reads (menu, branches, specials). Fresh entries are
+    served directly; stale ones are served at once and refreshed in the background
+    (stale-while-revalidate); while the backend is down they are served however old they are.
+    """
+
+    def __init__(self, fresh_seconds=FRESH_SECONDS):
+        self.fresh_seconds = fresh_seconds
+        self.lock = threading.Lock()
+        self.entries = {}       # key -> (value, stored_at)
+        self.refreshing = set()
+
+    def get(self, key, fetch, backend_down=False):
+        """Return (value, "fresh" | "stale" | "miss"); fetch() is only called for a miss or a refresh."""
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry is None:
+            value = fetch()
+            self.put(key, value)
+            return value, "miss"
+        value, stored_at = entry
+        if monotonic() - stored_at < self.fresh_seconds:
+            return value, "fresh"
+        if not backend_down:
+            self._refresh(key, fetch)
+        return value, "stale"
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = (value, monotonic())
+            while len(self.entries) > MAX_CACHE_ENTRIES:
+                self.entries.pop(next(iter(self.entries)))
+
+    def _refresh(self, key, fetch):
+        with self.lock:
+            if key in self.refreshing:
+                return
+            self.refreshing.add(key)
+
+        def refresh():
+            try:
+                self.put(key, fetch())
+            except Exception as e:
+                print("Catalog refresh failed, keeping the last good copy:", e)
+            finally:
+                with self.lock:
+                    self.refreshing.discard(key)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+
+__all__ = ["CircuitBreaker", "StaleCache", "BackendUnavailable", "FRESH_SECONDS"]
@@ -0,0 +1,224 @@
+# routing.py
+# Picks the Gemini model and output budget for each call, and steps down to a faster model
+# when the preferred one is rate limited or running slower than the latency SLO.
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+LATENCY_SLO_MS = float(os.getenv("FOODIE_LATENCY_SLO_MS", "6000"))  # for one Gemini call
+MAX_IN_FLIGHT = int(os.getenv("FOODIE_MAX_IN_FLIGHT", "4"))          # concurrent calls per model before stepping down
+RATE_LIMIT_COOLDOWN_SECONDS = 60
+LATENCY_WINDOW = 50
+METRICS_EXPORT_SECONDS = float(os.getenv("FOODIE_METRICS_EXPORT_SECONDS", "60"))  # per-route snapshot to the trace sinks
+
+# Fastest first; downgrade() walks left. USD per million tokens (input, output) at list price.
+MODELS = ["gemini-2.5-flash-lite", "gemini-2.5-flash", "gemini-2.5-pro"]
+PRICES = {
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-pro": (1.25, 10.00),
+}
+# Thinking counts against maxOutputTokens on 2.5 models and is on by default (pro cannot turn it
+# off), so it is bounded and added on top of the reply budget; flash-lite does not think.
+THINKING_BUDGETS = {"gemini-2.5-flash": 256, "gemini-2.5-pro": 512}
+
+# Follow-up calls only phrase tool data, so the budget follows what the data looks like
+TOOL_ROUTES = {
+    # Echo a few numbers or names back
+    "echo": ("gemini-2.5-flash-lite", 300, {
+        "get_user_wallet_balance_api", "list_all_branches_api", "get_current_user_info_api",
+        "cancel_booking_api", "book_table_api", "get_user_last_orders_api",
+    }),
+    # Lists to lay out, but nothing to compute
+    "listing": ("gemini-2.5-flash-lite", 900, {
+        "get_menu_category_api", "get_todays_specials_api", "get_branch_details_api",
+        "check_table_availability_api", "pre_booking_api", "get_combo_suggestions_api",
+    }),
+    # Invoices and receipts: amounts must be copied exactly
+    "invoice": ("gemini-2.5-flash", 1200, {
+        "create_cart_api", "add_to_cart_api", "update_cart_item_api", "remove_from_cart_api",
+        "view_cart_api", "place_order_api",
+    }),
+}
+DEFAULT_FOLLOW_UP = ("follow_up", "gemini-2.5-flash", 2500)  # pre_order_api, full menu, batches
+
+
+class Route:
+    def __init__(self, name, model, max_output_tokens, thinking_budget=None, downgraded=None):
+        self.name = name
+        self.model = model
+        self.max_output_tokens = max_output_tokens  # for the reply itself
+        # 0 turns thinking off where the model allows it; None takes the model's bounded default
+        self.thinking_budget = THINKING_BUDGETS.get(model) if thinking_budget is None else thinking_budget
+        self.downgraded = downgraded                # why a faster model was picked, if it was
+
+    def output_limit(self):
+        """maxOutputTokens for the call: the reply budget plus room for thinking."""
+        return self.max_output_tokens + (self.thinking_budget or 0)
+
+    def attributes(self):
+        return {"route": self.name, "model": self.model, "max_output_tokens": self.max_output_tokens,
+                "thinking_budget": self.thinking_budget, "downgraded": self.downgraded}
+
+
+def is_rate_limited(error):
+    # google.genai raises APIError subclasses with .code; requests-style errors carry the status
+    code = getattr(error, "code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return code == 429 or "RESOURCE_EXHAUSTED" in str(error)
+
+
+def cost_usd(model, prompt_tokens, output_tokens):
+    input_price, output_price = PRICES.get(model, (0.0, 0.0))
+    return ((prompt_tokens or 0) * input_price + (output_tokens or 0) * output_price) / 1_000_000
+
+
+class ModelRouter:
+    """
+    Routing policy plus the feedback it needs: recent latency and in-flight calls per model,
+    and rate-limit cooldowns. One per process, shared by all sessions.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latency = {model: deque(maxlen=LATENCY_WINDOW) for model in MODELS}
+        self.in_flight = {model: 0 for model in MODELS}
+        self.cooling_until = {}
+        self.routes = {}  # route name -> {"calls", "errors", "latency_ms": deque, "cost_usd", tokens}
+        self.next_export = 0.0
+
+    # ---- Policy ----
+    def choose(self, stage, tool=None, image_count=0):
+        if stage == "initial":
+            # Choosing a tool or identifying food: several photos of one table are worth the
+            # heavier model while it is fast enough, one photo or text is not
+            if image_count > 1:
+                route = Route("vision_multi", "gemini-2.5-pro", 1024)
+            elif image_count == 1:
+                route = Route("vision", "gemini-2.5-flash", 768)
+            else:
+                route = Route("chat", "gemini-2.5-flash", 512)
+        else:
+            route = Route(*DEFAULT_FOLLOW_UP)
+            for name, (model, budget, tools) in TOOL_ROUTES.items():
+                if tool in tools:
+                    route = Route(name, model, budget, thinking_budget=0)
+                    break
+        return self.adjust(route)
+
+    def adjust(self, route):
+        # Step down while the model is cooling off after a 429, saturated or missing the SLO
+        while True:
+            reason = self.pressure(route.model)
+            index = MODELS.index(route.model) if route.model in MODELS else 0
+            if reason is None or index == 0:
+                return route
+            route.model = MODELS[index - 1]
+            route.downgraded = route.downgraded or reason
+            if route.model == "gemini-2.5-flash-lite":
+                route.thinking_budget = None  # no thinking to turn off
+
+    def pressure(self, model):
+        with self.lock:
+            if self.cooling_until.get(model, 0) > time.time():
+                return "rate_limited"
+            if self.in_flight.get(model, 0) >= MAX_IN_FLIGHT:
+                return "load"
+            recent = sorted(self.latency.get(model, ()))
+            if len(recent) >= 5 and recent[len(recent) // 2] > LATENCY_SLO_MS:
+                return "slow"
+        return None
+
+    def downgrade(self, route, reason):
+        """A faster route for retrying after route failed with reason, or None at the bottom."""
+        index = MODELS.index(route.model) if route.model in MODELS else 0
+        if index == 0:
+            return None
+        return self.adjust(Route(route.name, MODELS[index - 1], route.max_output_tokens, route.thinking_budget, reason))
+
+    # ---- Feedback ----
+    def started(self, route):
+        with self.lock:
+            self.in_flight[route.model] = self.in_flight.get(route.model, 0) + 1
+
+    def finished(self, route, elapsed_ms, usage=None, error=None):
+        with self.lock:
+            self.in_flight[route.model] -= 1
+            stats = self.routes.setdefault(route.name, {
+                "calls": 0, "errors": 0, "downgraded": 0, "latency_ms": deque(maxlen=LATENCY_WINDOW),
+                "prompt_tokens": 0, "output_tokens": 0, "cost_usd": 0.0,
+            })
+            stats["calls"] += 1
+            stats["downgraded"] += bool(route.downgraded)
+            if error is not None:
+                stats["errors"] += 1
+                if is_rate_limited(error):
+                    self.cooling_until[route.model] = time.time() + RATE_LIMIT_COOLDOWN_SECONDS
+                return 0.0
+            self.latency.setdefault(route.model, deque(maxlen=LATENCY_WINDOW)).append(elapsed_ms)
+            stats["latency_ms"].append(elapsed_ms)
+            prompt_tokens, output_tokens = usage or (0, 0)
+            cost = cost_usd(route.model, prompt_tokens, output_tokens)
+            stats["prompt_tokens"] += prompt_tokens or 0
+            stats["output_tokens"] += output_tokens or 0
+            stats["cost_usd"] += cost
+            return cost
+
+    def export_due(self):
+        """True at most once per METRICS_EXPORT_SECONDS: time to export metrics() again."""
+        now = time.monotonic()
+        with self.lock:
+            if now < self.next_export:
+                return False
+            self.next_export = now + METRICS_EXPORT_SECONDS
+            return True
+
+    def metrics(self):
+        """One row per route: calls, errors, downgrades, p50/p95 latency, tokens and cost."""
+        rows = []
+        with self.lock:
+            for name, stats in sorted(self.routes.items()):
+                latency = sorted(stats["latency_ms"])
+                rows.append({
+                    "route": name,
+                    "calls": stats["calls"],
+                    "errors": stats["errors"],
+                    "downgraded": stats["downgraded"],
+                    "p50_ms": round(latency[len(latency) // 2], 1) if latency else None,
+                    "p95_ms": round(latency[min(len(latency) - 1, int(len(latency) * 0.95))], 1) if latency else None,
+                    "tokens": stats["prompt_tokens"] + stats["output_tokens"],
+                    "cost_usd": round(stats["cost_usd"], 6),
+                })
+        return rows
+
+
+router = ModelRouter()
+
+
+def summarize(paths):
+    # Per-route latency and cost from exported traces (FOODIE_TRACE_FILE)
+    routes = {}
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                item = json.loads(line)
+                attributes = item.get("attributes", {})
+                if item.get("name") == "gemini.generate" and "route" in attributes:
+                    entry = routes.setdefault((attributes["route"], attributes.get("model")), [[], 0.0])
+                    entry[0].append(item["duration_ms"])
+                    entry[1] += attributes.get("cost_usd", 0.0)
+    print(f"{'route':14} {'model':24} {'calls':>6} {'p50 ms':>9} {'p95 ms':>9} {'cost $':>10}")
+    for (name, model), (durations, cost) in sorted(routes.items()):
+        durations.sort()
+        p95 = durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+        print(f"{name:14} {model:24} {len(durations):>6} {durations[len(durations) // 2]:>9.1f} {p95:>9.1f} {cost:>10.5f}")
+
+
+if __name__ == "__main__":
+    # python -m components.routing traces.jsonl
+    summarize(sys.argv[1:])
+
+
+__all__ = ["router", "ModelRouter", "Route", "MODELS", "PRICES", "LATENCY_SLO_MS", "cost_usd", "is_rate_limited"]
@@ -1,9 +1,11 @@
 import os
 import base64
 import sys
+from components.profiler import timed
 sys.dont_write_bytecode = True
 
 
+@timed
 def get_background_css(image_path):
     with open(image_path, "rb") as image_file:
         encoded_string = base64.b64encode(image_file.read()).decode()
@@ -22,6 +24,7 @@ def get_background_css(image_path):
     """
     return css
 
+@timed
 def get_logo_css(image_path, top='15%', left='5%', width='150px'):
     with open(image_path, "rb") as image_file:
         encoded_string = base64.b64encode(image_file.read()).decode()
@@ -47,6 +50,7 @@ def get_logo_css(image_path, top='15%', left='5%', width='150px'):
     return css
 
 
+@timed
 def page_header_css(title_text):
     css = f"""
     <style>
@@ -69,6 +73,7 @@ def page_header_css(title_text):
     return css
 
 
+@timed
 def page_subheader_css(title_text):
     css = f"""
     <style>
@@ -91,6 +96,7 @@ def page_subheader_css(title_text):
     return css
 
 
+@timed
 def custom_chat_input_css():
     return """
     <style>
@@ -186,6 +192,7 @@ def custom_chat_input_css():
     """
 
 
+@timed
 def chat_bubble(sender, message):
     # Get absolute path to the current file's directory
     base_dir = os.path.dirname(os.path.abspath(__file__))
@@ -279,6 +286,7 @@ def chat_bubble(sender, message):
     </div>
     """
 
+@timed
 def custom_sidebar_css():
     return """
     <style>
@@ -327,6 +335,7 @@ def custom_sidebar_css():
     """
 
 
+@timed
 def transparent_header():
     return """
     <style>
@@ -0,0 +1,151 @@
+# tracing.py
+# Span-based tracing of a chat turn: Streamlit -> prompt -> Gemini -> tools -> FastAPI backend.
+import json
+import os
+import secrets
+import statistics
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+SERVICE_NAME = "foodie-frontend"
+TRACE_FILE = os.getenv("FOODIE_TRACE_FILE")            # append finished traces as JSON lines
+TRACE_COLLECTOR = os.getenv("FOODIE_TRACE_COLLECTOR")  # or POST them to a collector URL
+RECENT_TRACES = 50
+
+_current_span = ContextVar("current_span", default=None)
+_export_lock = threading.Lock()
+recent_traces = deque(maxlen=RECENT_TRACES)  # kept in memory for the debug view
+
+
+class Span:
+    def __init__(self, name, trace_id, parent_id=None, attributes=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.start = time.time()
+        self.started = time.perf_counter()
+        self.duration_ms = None
+        self.children = []
+
+    def set(self, **attributes):
+        self.attributes.update({key: value for key, value in attributes.items() if value is not None})
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "service": SERVICE_NAME,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": self.duration_ms,
+            "attributes": self.attributes,
+        }
+
+
+@contextmanager
+def span(name, **attributes):
+    """Open a span under the current one; with no current span this starts a new trace."""
+    parent = _current_span.get()
+    current = Span(
+        name,
+        trace_id=parent.trace_id if parent else secrets.token_hex(16),
+        parent_id=parent.span_id if parent else None,
+        attributes=attributes,
+    )
+    token = _current_span.set(current)
+    try:
+        yield current
+    except Exception as e:
+        current.set(error=type(e).__name__)
+        raise
+    finally:
+        current.duration_ms = round((time.perf_counter() - current.started) * 1000, 2)
+        _current_span.reset(token)
+        if parent:
+            parent.children.append(current)
+        else:
+            _export(current)
+
+
+def current_span():
+    return _current_span.get()
+
+
+def trace_headers():
+    # W3C trace context, so the backend's spans join this trace
+    current = _current_span.get()
+    if current is None:
+        return {}
+    return {"traceparent": f"00-{current.trace_id}-{current.span_id}-01"}
+
+
+def _flatten(root):
+    spans, stack = [], [root]
+    while stack:
+        node = stack.pop()
+        spans.append(node.to_dict())
+        stack.extend(node.children)
+    return spans
+
+
+def _export(root):
+    spans = _flatten(root)
+    recent_traces.append(spans)
+    if TRACE_FILE:
+        with _export_lock, open(TRACE_FILE, "a", encoding="utf-8") as f:
+            for item in spans:
+                f.write(json.dumps(item, default=str) + "\n")
+    if TRACE_COLLECTOR:
+        threading.Thread(target=_post, args=({"spans": spans},), daemon=True).start()
+
+
+def export_metrics(name, rows):
+    """Send a metrics snapshot (one dict per row) to the same file and collector as traces."""
+    record = {"service": SERVICE_NAME, "name": name, "time": time.time(), "rows": rows}
+    if TRACE_FILE:
+        with _export_lock, open(TRACE_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, default=str) + "\n")
+    if TRACE_COLLECTOR:
+        threading.Thread(target=_post, args=({"metrics": [record]},), daemon=True).start()
+
+
+def _post(payload):
+    try:
+        import requests
+        requests.post(TRACE_COLLECTOR, json=payload, timeout=5)
+    except Exception as e:
+        print("Trace export failed:", e)
+
+
+def summarize(paths):
+    # Latency percentiles per span name across one or more trace files (frontend and backend)
+    durations = {}
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                item = json.loads(line)
+                if item.get("duration_ms") is not None:
+                    durations.setdefault(f"{item['service']}:{item['name']}", []).append(item["duration_ms"])
+    rows = []
+    for name, values in durations.items():
+        values.sort()
+        p99 = values[min(len(values) - 1, int(len(values) * 0.99))]
+        rows.append((p99, name, len(values), statistics.median(values)))
+    print(f"{'span':45} {'count':>6} {'p50 ms':>10} {'p99 ms':>10}")
+    for p99, name, count, p50 in sorted(rows, reverse=True):
+        print(f"{name:45} {count:>6} {p50:>10.1f} {p99:>10.1f}")
+
+
+if __name__ == "__main__":
+    # python -m components.tracing traces.jsonl ../foodie_backend/traces.jsonl
+    summarize(sys.argv[1:])
+
+
+__all__ = ["span", "current_span", "trace_headers", "recent_traces", "export_metrics"]
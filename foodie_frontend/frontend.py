@@ -1,31 +1,45 @@
 import streamlit as st
 import os
+import json
 from components.style import *
 from components.prompt import *
-import requests
-from google.genai.types import Part
+from components.tracing import span
+from components.images import prepare_images
+from components.memory import ConversationMemory
+from components.admission import turn_priority, is_busy, TRANSACTIONAL, INTERACTIVE, BACKGROUND
+from components.intents import is_transactional
+from components.profiler import PROFILE_ENABLED, HISTORY_SIZE, start_profile, flame_html, breakdown_rows
 import sys
 sys.dont_write_bytecode = True
 
 
 #model = "gemini-2.5-flash"
 
-# Check if backend is running
-API_BASE = "https://foodie-backend-mq80.onrender.com"
+# Gemini client, tool declarations and the backend connection warm up in the background,
+# once per server process, while the page shell renders
+@st.cache_resource(show_spinner=False)
+def warm_up():
+    return start_warm_up()
 
-def ping_backend():
-    try:
-        r = requests.get(f"{API_BASE}/")
-        if r.status_code == 200:
-            print("Backend online ✅")
-    except Exception as e:
-        print("Backend unavailable ❌", e)
 
-ping_backend()
 
+# Opt-in rerun profiling (FOODIE_PROFILE=1 or the sidebar toggle); None when off
+st.session_state["rerun_count"] = st.session_state.get("rerun_count", 0) + 1
+profile = start_profile(PROFILE_ENABLED or st.session_state.get("profile_reruns", False), st.session_state["rerun_count"])
+
+def checkpoint(name):
+    if profile:
+        profile.phase(name)
+
+def save_profile():
+    if profile:
+        history = st.session_state.setdefault("rerun_profiles", [])
+        history.append(profile.finish())
+        del history[:-HISTORY_SIZE]
 
 
 # === Page config ===
+checkpoint("page_config")
 st.set_page_config(page_title="FoodieApp", page_icon="🍲", layout="wide")
 st.markdown(custom_sidebar_css(), unsafe_allow_html=True)
 
@@ -33,6 +47,7 @@ st.markdown(custom_sidebar_css(), unsafe_allow_html=True)
 def language_changed():
     pass
 
+checkpoint("sidebar")
 with st.sidebar:
     st.header("🛠️ Settings")
     st.write("Adjust profile and language here...")
@@ -40,6 +55,7 @@ with st.sidebar:
     language = st.selectbox(" ", ["English", "Yoruba", "Hausa", "Igbo", "Pidgin"], index=0, key="language_choice", on_change=language_changed)
     st.session_state["language"] = language 
     name = st.text_input(" ", key="name_input", placeholder="Enter your name")   
+    st.toggle("Profile reruns", key="profile_reruns", value=PROFILE_ENABLED)
 
 
 # === Paths ===
@@ -48,18 +64,24 @@ bg_path = os.path.join(current_dir, "assets", "background.png")
 lg_path = os.path.join(current_dir, "assets", "logo.png")
 
 # === Custom CSS and Page Branding ===
+checkpoint("branding_css")
 st.markdown(get_background_css(bg_path), unsafe_allow_html=True)
 st.markdown(get_logo_css(lg_path, top='25%', left='8%', width='400px'), unsafe_allow_html=True)
 st.markdown(page_header_css("Hi, I'm Foodie!👋"), unsafe_allow_html=True)
 st.markdown(page_subheader_css("Let’s find you something delicious — from Naija Jollof to Dodo Gizzard"), unsafe_allow_html=True)
 st.markdown(custom_chat_input_css(), unsafe_allow_html=True)
 st.markdown(transparent_header(), unsafe_allow_html=True)
+checkpoint("warm_up")
+warm_up()
 
 # === Session state for messages ===
 if "messages" not in st.session_state:
     st.session_state.messages = []
+# Rolling summary + order/booking drafts that keep prompts bounded (components/memory.py)
+memory = st.session_state.setdefault("memory", ConversationMemory())
 
 # === Send persona prompt and get first bot response ===
+checkpoint("persona")
 if (
     st.session_state.get("name_input") and
     st.session_state.get("language") and
@@ -70,15 +92,18 @@ if (
         language=st.session_state["language"]
     )
     st.session_state["persona"] = persona_prompt
-    welcome_msg = generate_content(
-        prompt_parts=persona_prompt,
-        language=st.session_state["language"]
-    )
+    prefetcher.prefetch_session()  # the user's profile arrives while the welcome message is written
+    with turn_priority(BACKGROUND):  # first to be shed when Gemini is busy
+        welcome_msg = generate_content(
+            prompt_parts=persona_prompt,
+            language=st.session_state["language"]
+        )
     st.session_state.messages.append({"role": "bot", "content": welcome_msg})
     st.session_state.persona_sent = True
 
 
 # === Display all messages using chat bubbles ===
+checkpoint("history")
 for message in st.session_state.messages:
     role = message.get("role")
     content = message.get("content")
@@ -90,68 +115,126 @@ for message in st.session_state.messages:
 
 
 # === Chat Input ===
+checkpoint("chat_input")
+if is_busy():
+    st.caption("⏳ Foodie is serving a lot of people right now, so replies may take a few extra seconds.")
+if breaker.is_open():
+    st.caption("🔌 Reconnecting to the kitchen… menu and branch answers come from the last saved copy meanwhile.")
 prompt = st.chat_input(
-    "Type here and/or attach a food image...",
-    accept_file=True,
+    "Type here and/or attach food images...",
+    accept_file="multiple",
     file_type=["jpg", "jpeg", "png"],
     key="chat_input_main"
 )
 
 # === Handle input ===
 if prompt:
-    # Handle text input
-    if prompt.text and not prompt.files:
-        st.session_state.messages.append({"role": "user", "content": prompt.text.strip().replace("\n", "<br>")})
-
-        response_text = generate_content(
-            prompt_parts=build_prompt(
-                user_text=prompt.text,
-                name=st.session_state.get("name_input", None),
-                image_count=0,
+    checkpoint("handle_input")
+    # One trace per chat turn; prompt building, Gemini calls and backend requests nest under it
+    # Orders, payments and bookings queue ahead of other turns when Gemini or the backend is busy
+    priority = TRANSACTIONAL if is_transactional(prompt.text, memory) else INTERACTIVE
+    with span("chat_turn", language=st.session_state.get("language_choice", "English"), has_image=bool(prompt.files), priority=priority), \
+            turn_priority(priority):
+        # Handle text input
+        if prompt.text and not prompt.files:
+            st.session_state.messages.append({"role": "user", "content": prompt.text.strip().replace("\n", "<br>")})
+
+            # Wallet, branch and menu-category questions go straight to their tool (components/intents.py)
+            response_text = answer_intent_locally(
+                prompt.text,
                 language=st.session_state.get("language_choice", "English"),
-                chat_history=st.session_state.messages
-            ),
-            language=st.session_state.get("language_choice", "English"),
-            chat_history=st.session_state.messages[-2:]
-        )
-
-        st.session_state.messages.append({"role": "bot", "content": response_text})
-
-    elif prompt.files:
-        if "uploaded_images" not in st.session_state:
-            st.session_state.uploaded_images = []
-
-        image_file = prompt.files[0]
-        st.session_state.uploaded_images.append(image_file)
-
-        st.session_state.messages.append({
-            "role": "user",
-            "content": f"📷 Image uploaded: {image_file.name}<br>" + (f"{prompt.text.strip().replace('\n', '<br>')}" if prompt.text else "")
-        })
-
-        # Read image bytes once
-        image_bytes = image_file.read()
-        image_part = Part.from_bytes(data=image_bytes, mime_type=image_file.type)
-        user_text = build_prompt(
-                user_text=prompt.text.strip() if prompt.text else "What food is this?",
+                chat_history=st.session_state.messages,
+                memory=memory
+            )
+            if response_text is None:
+                response_text = generate_content(
+                    prompt_parts=build_prompt(
+                        user_text=prompt.text,
+                        name=st.session_state.get("name_input", None),
+                        image_count=0,
+                        language=st.session_state.get("language_choice", "English"),
+                        chat_history=st.session_state.messages,
+                        memory=memory
+                    ),
+                    language=st.session_state.get("language_choice", "English"),
+                    chat_history=st.session_state.messages[-2:],
+                    memory=memory
+                )
+
+            st.session_state.messages.append({"role": "bot", "content": response_text})
+
+        elif prompt.files:
+            if "uploaded_images" not in st.session_state:
+                st.session_state.uploaded_images = []
+
+            image_files = prompt.files
+            st.session_state.uploaded_images.extend(image_files)
+
+            st.session_state.messages.append({
+                "role": "user",
+                "content": f"📷 Image{'s' if len(image_files) > 1 else ''} uploaded: {', '.join(image_file.name for image_file in image_files)}<br>"
+                           + (prompt.text.strip().replace("\n", "<br>") if prompt.text else "")
+            })
+
+            # Read each image once, then shrink and strip metadata concurrently before upload
+            with span("image.prepare", images=len(image_files)) as current:
+                prepared = prepare_images([(image_file.read(), image_file.type) for image_file in image_files])
+                current.set(
+                    bytes_in=sum(image.original_bytes for image in prepared),
+                    bytes_out=sum(len(image.data) for image in prepared),
+                )
+
+            # Our own dishes are recognised locally; only unknown photos are sent to Gemini
+            response_text, known_dishes = identify_dishes_locally(
+                [image.data for image in prepared],
+                user_text=prompt.text,
                 name=st.session_state.get("name_input", None),
-                image_count=1,
                 language=st.session_state.get("language_choice", "English"),
-                chat_history=st.session_state.messages
-        )
-        
-        # Compose contents list for Gemini: text + image Part
-        prompt_parts = [
-            user_text,
-            image_part,
-        ]
-
-        response_text = generate_content(
-            prompt_parts=prompt_parts,
-            language=st.session_state.get("language_choice", "English"),
-            chat_history=st.session_state.messages[-2:]
-        )
-
-        st.session_state.messages.append({"role": "bot", "content": response_text})
-
+                chat_history=st.session_state.messages,
+                memory=memory
+            )
+            if response_text is None:
+                from google.genai.types import Part
+                unknown = [image for index, image in enumerate(prepared) if index not in known_dishes]
+                user_text = build_prompt(
+                        user_text=prompt.text.strip() if prompt.text else ("What food is this?" if len(prepared) == 1 else "What foods are these?"),
+                        name=st.session_state.get("name_input", None),
+                        image_count=len(unknown),
+                        language=st.session_state.get("language_choice", "English"),
+                        chat_history=st.session_state.messages,
+                        memory=memory
+                )
+                if known_dishes:
+                    user_text += "\nAlready identified from the other photos (include them in the answer): " + json.dumps(list(known_dishes.values()))
+
+                # Compose one multimodal request for Gemini: text + every unrecognised image
+                prompt_parts = [user_text] + [Part.from_bytes(data=image.data, mime_type=image.mime_type) for image in unknown]
+
+                response_text = generate_content(
+                    prompt_parts=prompt_parts,
+                    language=st.session_state.get("language_choice", "English"),
+                    chat_history=st.session_state.messages[-2:],
+                    memory=memory
+                )
+
+            st.session_state.messages.append({"role": "bot", "content": response_text})
+
+    save_profile()
     st.rerun()
+
+# === Rerun profile (flame-style breakdown of this and recent reruns) ===
+save_profile()
+if st.session_state.get("rerun_profiles") and (PROFILE_ENABLED or st.session_state.get("profile_reruns")):
+    with st.sidebar.expander("⏱️ Rerun profile", expanded=True):
+        history = st.session_state["rerun_profiles"]
+        for recent in history[-2:][::-1]:
+            st.markdown(flame_html(recent), unsafe_allow_html=True)
+        st.dataframe(breakdown_rows(history[-1]), hide_index=True, use_container_width=True)
+        st.caption("Recent reruns (ms): " + ", ".join(f"#{item.run_number} {item.total_ms:.0f}" for item in history))
+        routed = intent_stats.summary()
+        st.caption(f"Intent router: {routed['served']}/{routed['turns']} text turns ({routed['fraction']:.0%}) answered without the tool-choosing Gemini call")
+        if router.metrics():
+            st.caption("Gemini calls per route (latency, tokens, cost)")
+            st.dataframe(router.metrics(), hide_index=True, use_container_width=True)
+        if history[-1].stats_path:
+            st.caption(f"cProfile stats: {history[-1].stats_path}")